@@ -0,0 +1,9 @@
+"""
+Offline benchmark suite for Tapeciarnia.
+
+Run from code/scripts:
+    python -m benchmarks                 # run everything, compare with saved baseline
+    python -m benchmarks --save          # run and store results as the new baseline
+    python -m benchmarks -k scheduler    # only benchmarks whose name contains "scheduler"
+    python -m benchmarks --large         # also run the 100k-file scans
+"""
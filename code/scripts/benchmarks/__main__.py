@@ -0,0 +1,82 @@
+import sys
+import argparse
+import importlib
+import traceback
+
+from benchmarks import harness
+
+MODULES = (
+    "benchmarks.bench_scheduler",
+    "benchmarks.bench_downloads",
+    "benchmarks.bench_images",
+    "benchmarks.bench_validators",
+    "benchmarks.bench_index",
+    "benchmarks.bench_thumbnails",
+    "benchmarks.bench_probe",
+    "benchmarks.bench_import",
+    "benchmarks.bench_favorites",
+    "benchmarks.bench_shuffle",
+    "benchmarks.bench_apply",
+    "benchmarks.bench_events",
+    "benchmarks.bench_tasks",
+    "benchmarks.bench_cancel",
+    "benchmarks.bench_startup",
+    "benchmarks.bench_x11",
+    "benchmarks.bench_limits",
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Tapeciarnia offline benchmarks")
+    parser.add_argument("-k", dest="filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--large", action="store_true", help="include large (slow) benchmarks")
+    parser.add_argument("--save", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=harness.DEFAULT_THRESHOLD,
+                        help="regression threshold as a ratio of the baseline median")
+    args = parser.parse_args(argv)
+
+    for module in MODULES:
+        importlib.import_module(module)
+
+    baseline = harness.load_baseline()
+    results, failed = {}, []
+
+    for bench in harness.registered():
+        if args.filter and args.filter not in bench.name:
+            continue
+        if bench.large and not args.large:
+            continue
+        try:
+            stats = harness.measure(bench)
+        except Exception as e:
+            print(f"{bench.name:<45} ERROR: {e}")
+            traceback.print_exc()
+            failed.append(bench.name)
+            continue
+
+        results[bench.name] = stats
+        line = f"{bench.name:<45} median {stats['median'] * 1000:9.2f} ms  min {stats['min'] * 1000:9.2f} ms"
+        if bench.ops > 1:
+            line += f"  {stats['ops_per_sec']:>12,.0f} ops/s"
+        base = baseline.get(bench.name)
+        if base and base.get("median"):
+            line += f"  ({stats['median'] / base['median']:.2f}x baseline)"
+        if stats.get("info"):
+            line += "  " + ", ".join(f"{k}={v}" for k, v in stats["info"].items())
+        print(line)
+
+    if args.save:
+        merged = dict(baseline)
+        merged.update(results)
+        harness.save_baseline(merged)
+        return 1 if failed else 0
+
+    regressions = harness.compare(results, baseline, args.threshold)
+    for name in regressions:
+        print(f"REGRESSION: {name} is slower than {args.threshold:.2f}x its baseline")
+
+    return 1 if (regressions or failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
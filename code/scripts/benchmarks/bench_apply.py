@@ -0,0 +1,43 @@
+import time
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+BURST = 200
+
+
+def _setup():
+    prepare()
+    from core.apply_arbiter import ApplyArbiter
+
+    arbiter = ApplyArbiter(window_ms=10)
+    dispatched = []
+    arbiter.dispatch.connect(dispatched.append)
+    return {"arbiter": arbiter, "dispatched": dispatched}
+
+
+def _wait_for_dispatch(state, timeout: float = 2.0):
+    from PySide6.QtCore import QCoreApplication
+
+    deadline = time.monotonic() + timeout
+    while not state["dispatched"] and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+@benchmark(f"apply.burst_coalesced[{BURST} submits]", setup=_setup, rounds=5, warmup=1, ops=BURST)
+def bench_burst(state):
+    arbiter, dispatched = state["arbiter"], state["dispatched"]
+    dispatched.clear()
+    # A scheduler tick inside a burst of clicks: the last click must win
+    arbiter.submit("/tmp/scheduled.png", "scheduled", "scheduler")
+    for i in range(BURST - 1):
+        arbiter.submit(f"/tmp/click_{i}.png", "manual", "ui")
+    _wait_for_dispatch(state)
+
+    assert len(dispatched) == 1, dispatched
+    winner = dispatched[0]
+    assert winner.target.endswith(f"click_{BURST - 2}.png")
+    arbiter.complete(winner.generation)
+    return {"dispatched": len(dispatched)}
@@ -0,0 +1,93 @@
+import time
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+CHUNK = 64 * 1024
+ROUNDS = 5
+
+
+class TrickleServer:
+    """Sends one chunk of a huge file, then stalls: a reader blocks until it is cancelled"""
+
+    def __init__(self):
+        self.httpd = None
+        self.stop_event = threading.Event()
+
+    def start(self) -> str:
+        stop_event = self.stop_event
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(1024 * 1024 * 1024))
+                self.end_headers()
+                try:
+                    self.wfile.write(b"\0" * CHUNK)
+                    self.wfile.flush()
+                except OSError:
+                    return
+                stop_event.wait(30)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.stop_event.set()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def _setup():
+    prepare()
+    from core.event_bus import get_event_bus
+
+    # The bus must exist on this (GUI) thread before a worker publishes
+    get_event_bus()
+    server = TrickleServer()
+    return {"server": server, "url": f"{server.start()}/stalled.mp4",
+            "tmp": Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-cancel-")), "round": 0, "latencies": []}
+
+def _teardown(state):
+    state["server"].stop()
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("cancel.stalled_download[time to cancel]", setup=_setup, teardown=_teardown, rounds=ROUNDS, warmup=0)
+def bench_cancel_stalled(state):
+    """The read is blocked on a silent server: cancel must close the socket, not wait for the timeout"""
+    from core.download_manager import DirectDownloadThread
+
+    state["round"] += 1
+    target = state["tmp"] / f"stalled_{state['round']}.mp4"
+    task = DirectDownloadThread(state["url"], str(target))
+    task.start()
+
+    deadline = time.monotonic() + 10
+    while not (target.exists() and target.stat().st_size >= CHUNK) and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert target.exists(), "download never started"
+
+    t0 = time.perf_counter()
+    task.cancel()
+    assert task.wait(5000), "cancelled download did not stop"
+    state["latencies"].append(time.perf_counter() - t0)
+
+    assert not target.exists(), "partial file left behind"
+    return {"time_to_cancel_ms": round(max(state["latencies"]) * 1000, 1)}
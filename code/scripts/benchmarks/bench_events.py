@@ -0,0 +1,91 @@
+import time
+import threading
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+WORKERS = 4
+PER_WORKER = 25_000
+LATENCY_SAMPLES = 200
+
+
+def _setup():
+    prepare()
+    from core.event_bus import EventBus
+
+    # A private bus: the benchmark must not feed subscribers of the app-wide one
+    bus = EventBus()
+    state = {"bus": bus, "delivered": 0, "latencies": []}
+
+    def on_progress(event):
+        state["delivered"] += 1
+
+    def on_applied(event):
+        state["latencies"].append(time.perf_counter() - event.created)
+
+    bus.subscribe("progress", on_progress)
+    bus.subscribe("applied", on_applied)
+    return state
+
+
+def _pump(until, timeout: float = 10.0):
+    from PySide6.QtCore import QCoreApplication
+
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.0005)
+
+
+@benchmark(f"events.flood[{WORKERS}x{PER_WORKER // 1000}k progress]", setup=_setup,
+           rounds=5, warmup=1, ops=WORKERS * PER_WORKER)
+def bench_flood(state):
+    """Workers report progress as fast as they can; the GUI thread sees a few batches"""
+    bus = state["bus"]
+    state["delivered"] = 0
+
+    def worker(n):
+        for i in range(PER_WORKER):
+            bus.publish("progress", {"text": f"{i}", "percent": i}, source="download", key=n)
+
+    from PySide6.QtCore import QCoreApplication
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(WORKERS)]
+    for t in threads:
+        t.start()
+    # The GUI thread keeps delivering while the flood goes on
+    while any(t.is_alive() for t in threads):
+        QCoreApplication.processEvents()
+    for t in threads:
+        t.join()
+    _pump(lambda: bus.pending() == 0)
+    bus.flush()
+
+    # Latest-wins: far fewer deliveries than publishes, but every worker is heard
+    assert WORKERS <= state["delivered"] < WORKERS * PER_WORKER
+    return {"delivered": state["delivered"]}
+
+
+@benchmark(f"events.latency[{LATENCY_SAMPLES} applied]", setup=_setup, rounds=3, warmup=0, ops=LATENCY_SAMPLES)
+def bench_latency(state):
+    """Publish-to-handler delay of single events from a worker thread"""
+    bus = state["bus"]
+    state["latencies"] = []
+
+    def worker():
+        for _ in range(LATENCY_SAMPLES):
+            bus.publish("applied", {"path": "", "status": ""}, source="bench")
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    _pump(lambda: len(state["latencies"]) >= LATENCY_SAMPLES)
+    thread.join()
+
+    latencies = sorted(state["latencies"])
+    assert len(latencies) == LATENCY_SAMPLES
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
@@ -0,0 +1,149 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+FAVORITES = 200
+
+
+def _png_bytes(seed: int) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (16, 16), seed.to_bytes(4, "big") * 192).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FavoritesServer:
+    """Local stand-in for the favorites API: an ETag'd list plus the images it points to"""
+
+    def __init__(self, count: int):
+        self.images = {f"/img/{i}.png": _png_bytes(i) for i in range(count)}
+        self.list_requests = 0
+        self.image_requests = 0
+        self.httpd = None
+
+    def start(self) -> str:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.startswith("/list"):
+                    server.list_requests += 1
+                    body = json.dumps({"wall": {
+                        str(i): {"url": f"{server.base}/img/{i}.png"} for i in range(len(server.images))
+                    }}).encode()
+                    etag = f'"{len(server.images)}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self._send(body, "application/json", etag)
+                elif self.path in server.images:
+                    server.image_requests += 1
+                    self._send(server.images[self.path], "image/png")
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+            def _send(self, body, content_type, etag=None):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address
+        self.base = f"http://{host}:{port}"
+        return f"{self.base}/list"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def _setup():
+    prepare()
+    server = FavoritesServer(FAVORITES)
+    return {"server": server, "url": server.start(), "round": 0,
+            "tmp": Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-favs-"))}
+
+def _teardown(state):
+    state["server"].stop()
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark(f"favorites.sync[{FAVORITES} new, 4 workers]", setup=_setup, teardown=_teardown,
+           rounds=3, warmup=0, ops=FAVORITES)
+def bench_favorites_full_sync(state):
+    from core.favorites_sync import FavoritesSync
+
+    state["round"] += 1
+    sync = FavoritesSync(state["url"], state["tmp"] / f"favs_{state['round']}", max_workers=4, rate_per_second=0)
+    sync.run()
+    assert sync.stats["added"] == FAVORITES, sync.stats
+    return {"mb_s": round(sync.stats["bytes"] / 1024 / 1024 / sync.stats["seconds"], 2)}
+
+
+@benchmark("favorites.sync[unchanged list, conditional GET]", setup=_setup, teardown=_teardown,
+           rounds=5, warmup=1)
+def bench_favorites_resync(state):
+    from core.favorites_sync import FavoritesSync
+
+    dest = state["tmp"] / "favs"
+    if state["round"] == 0:
+        FavoritesSync(state["url"], dest, max_workers=4, rate_per_second=0).run()
+    state["round"] += 1
+
+    server = state["server"]
+    before = server.image_requests
+    sync = FavoritesSync(state["url"], dest, max_workers=4, rate_per_second=0)
+    sync.run()
+    # Unchanged favorites: one 304 for the list, no image traffic
+    assert sync.stats["not_modified"] and server.image_requests == before, sync.stats
+    return {"added": sync.stats["added"]}
+
+
+@benchmark("favorites.rotation[offline pick from indexed mirror]", setup=_setup, teardown=_teardown,
+           rounds=5, warmup=1, ops=1000)
+def bench_favorites_offline_rotation(state):
+    from core.favorites_sync import FavoritesSync
+    from core.collection_index import get_collection_index
+    from core.scheduler import UnifiedWallpaperScheduler
+
+    dest = state["tmp"] / "mirror"
+    if "scheduler" not in state:
+        FavoritesSync(state["url"], dest, max_workers=4, rate_per_second=0).run()
+        # From here on the server is gone: rotation must not need it
+        state["server"].stop()
+        get_collection_index().watch(dest)
+        scheduler = UnifiedWallpaperScheduler()
+        scheduler.source = str(dest)
+        scheduler.set_range("wallpaper")
+        scheduler.set_selection_policy("any")
+        state["scheduler"] = scheduler
+
+    scheduler = state["scheduler"]
+    for _ in range(1000):
+        assert scheduler._get_random_wallpaper() is not None
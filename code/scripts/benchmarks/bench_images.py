@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+def _source_image(width: int, height: int):
+    from PIL import Image
+
+    # Deterministic, non-flat content so resampling does real work
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    return Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+def _monitors(*sizes):
+    monitors, x = [], 0
+    for w, h in sizes:
+        monitors.append(SimpleNamespace(x=x, y=0, width=w, height=h, is_primary=not monitors, name=f"bench{len(monitors)}"))
+        x += w
+    return monitors
+
+
+def _stitch_setup(src_size, monitor_sizes):
+    def setup():
+        prepare()
+        return {"img": _source_image(*src_size), "monitors": _monitors(*monitor_sizes)}
+    return setup
+
+
+@benchmark("image.stitch[6000x4000->1x1080p]", setup=_stitch_setup((6000, 4000), [(1920, 1080)]), rounds=5)
+def bench_stitch_single_1080p(state):
+    from utils.system_utils import render_stitched_wallpaper
+    render_stitched_wallpaper(state["img"], state["monitors"])
+
+
+@benchmark("image.stitch[6000x4000->3x4K]", setup=_stitch_setup((6000, 4000), [(3840, 2160)] * 3), rounds=3)
+def bench_stitch_triple_4k(state):
+    from utils.system_utils import render_stitched_wallpaper
+    render_stitched_wallpaper(state["img"], state["monitors"])
+
+
+@benchmark("image.resize_cover[1280x720->4K]", setup=_stitch_setup((1280, 720), [(3840, 2160)]), rounds=5)
+def bench_resize_cover_upscale(state):
+    from utils.wallpaper_render import resize_cover
+    resize_cover(state["img"], 3840, 2160)
+
+
+@benchmark("image.render_layout[4K landscape + 1440p portrait, per display]",
+           setup=_stitch_setup((6000, 4000), [(3840, 2160), (1440, 2560)]), rounds=3)
+def bench_render_layout_per_display(state):
+    from utils.wallpaper_render import render_layout
+    first, second = state["monitors"]
+    render_layout(state["monitors"], state["img"], per_display={second.name: state["img"].rotate(90, expand=True)})
+
+
+def _psnr(reference, image) -> float:
+    """Peak signal-to-noise ratio in dB against a full LANCZOS reference"""
+    import math
+    from PIL import ImageChops, ImageStat
+
+    diff = ImageChops.difference(reference.convert("RGB"), image.convert("RGB"))
+    mse = sum(v * v for v in ImageStat.Stat(diff).rms) / 3
+    return round(10 * math.log10(255 * 255 / mse), 1) if mse else float("inf")
+
+
+def _mode_setup():
+    from PIL import Image
+
+    state = _stitch_setup((6000, 4000), [(3840, 2160)])()
+    # Reference: the old path, full-source LANCZOS resize then center crop
+    img = state["img"]
+    scale = max(3840 / img.width, 2160 / img.height)
+    full = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+    x1, y1 = (full.width - 3840) // 2, (full.height - 2160) // 2
+    state["reference"] = full.crop((x1, y1, x1 + 3840, y1 + 2160))
+    return state
+
+
+def _register_mode(mode: str):
+    @benchmark(f"image.render_display[6000x4000->4K, {mode}]", setup=_mode_setup, rounds=5)
+    def bench_mode(state):
+        from utils.wallpaper_render import render_display, compute_focus
+        focus = compute_focus(state["img"]) if mode == "smart" else (0.5, 0.5)
+        out = render_display(state["img"], 3840, 2160, mode, focus)
+        return {"psnr_db": _psnr(state["reference"], out)} if mode == "fill" else None
+
+for _mode in ("fill", "fit", "center", "smart"):
+    _register_mode(_mode)
+
+
+@benchmark("image.compute_focus[6000x4000]", setup=_stitch_setup((6000, 4000), []), rounds=5)
+def bench_compute_focus(state):
+    from utils.wallpaper_render import compute_focus
+    compute_focus(state["img"])
+
+
+def _encode_setup():
+    import tempfile
+    from pathlib import Path
+
+    state = _stitch_setup((6000, 4000), [(3840, 2160)] * 3)()
+    from utils.wallpaper_render import render_layout
+    state["canvas"] = render_layout(state["monitors"], state["img"])
+    state["tmp"] = tempfile.TemporaryDirectory(prefix="tapeciarnia-encode-")
+    state["dir"] = Path(state["tmp"].name)
+    return state
+
+
+def _register_encode(fmt: str):
+    @benchmark(f"image.encode[3x4K, {fmt}]", setup=_encode_setup, teardown=lambda state: state["tmp"].cleanup(), rounds=3)
+    def bench_encode(state):
+        from utils.wallpaper_render import write_render
+        written = write_render(state["canvas"], state["dir"] / f"wallpaper_bench.{fmt}", fmt)
+        return {"mb_written": round(written / 1024 / 1024, 1)}
+
+for _fmt in ("bmp", "png", "jpeg"):
+    _register_encode(_fmt)
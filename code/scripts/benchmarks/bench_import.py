@@ -0,0 +1,56 @@
+import io
+import shutil
+import zipfile
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+def _png_bytes(seed: int) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    # 16x16 RGB = 768 bytes: the seed repeated, so every seed is distinct content
+    Image.frombytes("RGB", (16, 16), seed.to_bytes(4, "big") * 192).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _import_setup(count: int, duplicate_every: int = 10):
+    def setup():
+        prepare()
+        tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-import-"))
+        source = tmp / "source"
+        source.mkdir()
+        # Every n-th file repeats earlier content so dedupe has work to do
+        for i in range(count):
+            seed = i - 1 if i % duplicate_every == 0 and i else i
+            (source / f"img_{i:05d}.png").write_bytes(_png_bytes(seed))
+
+        archive = tmp / "pack.zip"
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+            for i in range(count // 10):
+                zf.writestr(f"pack/zip_{i:05d}.png", _png_bytes(count + i))
+        return {"tmp": tmp, "source": source, "archive": archive, "round": 0}
+    return setup
+
+def _teardown(state):
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("import.batch[10k png folder + 1k zip, probe + dedupe]", setup=_import_setup(10_000),
+           teardown=_teardown, rounds=3, warmup=0, ops=11_000)
+def bench_batch_import_10k(state):
+    from core.batch_importer import BatchImporter
+
+    state["round"] += 1
+    dest = state["tmp"] / f"collection_{state['round']}"
+    importer = BatchImporter([state["source"], state["archive"]], dest, [".png", ".jpg"], max_workers=4)
+    importer.run()
+
+    stats = importer.stats
+    expected = 10_000 - 10_000 // 10 + 1 + 1_000
+    assert stats["imported"] == expected, stats
+    return {"imported": stats["imported"], "duplicates": stats["duplicates"],
+            "mb_s": round(stats["bytes"] / 1024 / 1024 / stats["seconds"], 1)}
@@ -0,0 +1,85 @@
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare, make_media_tree
+from benchmarks.harness import benchmark
+
+
+def _wait_for(predicate, timeout: float = 5.0):
+    """Pump the Qt event loop until predicate() holds"""
+    from PySide6.QtCore import QCoreApplication
+
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("collection index did not catch up")
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+def _index_setup(count: int):
+    def setup():
+        prepare()
+        from core.collection_index import get_collection_index
+        from core.scheduler import UnifiedWallpaperScheduler
+
+        tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-index-"))
+        media = make_media_tree(tmp / "media", count)
+
+        index = get_collection_index()
+        index.debounce.setInterval(20)
+        index.watch(media)
+        scheduler = UnifiedWallpaperScheduler()
+        scheduler.source = str(media)
+        scheduler.range_type = "all"
+        return {"tmp": tmp, "media": media, "index": index, "scheduler": scheduler, "round": 0}
+    return setup
+
+def _index_teardown(state):
+    state["index"].unwatch(state["media"])
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("index.get_media_files[10k, watched]", setup=_index_setup(10_000),
+           teardown=_index_teardown, rounds=10)
+def bench_indexed_media_files_10k(state):
+    state["scheduler"]._get_media_files()
+
+
+@benchmark("index.churn[10k +200 -100 ~50 renames]", setup=_index_setup(10_000),
+           teardown=_index_teardown, rounds=5)
+def bench_index_churn(state):
+    """
+    Synthetic yt-dlp style churn: fragment/temp files appear and vanish, finished
+    files are added, removed and renamed. Timed until the index has caught up and
+    checked against a real listing.
+    """
+    from core.collection_index import scan_folder
+
+    index, media = state["index"], state["media"]
+    r = state["round"] = state["round"] + 1
+    deltas = []
+
+    def on_delta(folder, added, removed):
+        deltas.append((len(added), len(removed)))
+    # The index is the process-wide singleton: only ever disconnect our own slot
+    index.delta.connect(on_delta)
+
+    for i in range(200):
+        part = media / f"new_{r}_{i}.f137.mp4.part"
+        part.write_bytes(b"x")
+        part.rename(media / f"new_{r}_{i}.mp4")
+    existing = sorted(p for p in media.iterdir() if p.name.startswith("wallpaper_"))
+    for p in existing[:100]:
+        p.unlink()
+    for p in existing[100:150]:
+        p.rename(media / f"renamed_{r}_{p.name}")
+
+    expected = scan_folder(media)
+    try:
+        _wait_for(lambda: {p.name for p in index.files(media)} == expected)
+    finally:
+        index.delta.disconnect(on_delta)
+    return {"deltas": len(deltas), "files": len(expected)}
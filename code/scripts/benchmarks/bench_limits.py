@@ -0,0 +1,34 @@
+import sys
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+# Stand-in for a player: burns one core until stopped
+BUSY_LOOP = [sys.executable, "-c", "while True: pass"]
+
+
+def _setup():
+    prepare()
+    from utils.process_supervisor import ProcessSupervisor
+    from utils.resource_limits import systemd_scope_available
+
+    systemd_scope_available()  # probe once, outside the measured rounds
+    return {"supervisor": ProcessSupervisor()}
+
+def _teardown(state):
+    state["supervisor"].stop_all()
+
+
+if sys.platform.startswith("linux"):
+    for _profile in ("performance", "balanced", "eco"):
+        def _bench(state, profile=_profile):
+            from utils.resource_limits import get_profile_limits, systemd_scope_available
+
+            supervisor = state["supervisor"]
+            supervisor.spawn("bench-player", BUSY_LOOP, limits=get_profile_limits(profile))
+            supervisor.stop_group("player")
+            return {"systemd_scope": systemd_scope_available()}
+
+        _bench.__doc__ = f"Start a player capped by the '{_profile}' profile and stop it again (cost of the caps at launch)"
+        benchmark(f"limits.spawn[{_profile}]", setup=_setup, teardown=_teardown, rounds=10)(_bench)
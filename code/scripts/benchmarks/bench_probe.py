@@ -0,0 +1,34 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+def _probe_setup():
+    prepare()
+    from benchmarks.bench_images import _source_image
+
+    tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-probe-"))
+    img = _source_image(3840, 2160)
+    img.save(tmp / "wall.jpg", format="JPEG", quality=90)
+    img.save(tmp / "wall.png", format="PNG", compress_level=1)
+    return {"tmp": tmp}
+
+def _teardown(state):
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("probe.image[4K jpeg, header + verify]", setup=_probe_setup, teardown=_teardown, rounds=20)
+def bench_probe_jpeg(state):
+    from utils.media_probe import probe_media
+    info = probe_media(state["tmp"] / "wall.jpg")
+    assert info["ok"] and info["width"] == 3840
+
+
+@benchmark("probe.image[4K png, header + verify]", setup=_probe_setup, teardown=_teardown, rounds=10)
+def bench_probe_png(state):
+    from utils.media_probe import probe_media
+    info = probe_media(state["tmp"] / "wall.png")
+    assert info["ok"] and info["height"] == 2160
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare, make_media_tree
+from benchmarks.harness import benchmark
+
+
+def _scheduler_setup(count: int):
+    def setup():
+        prepare()
+        from core.scheduler import UnifiedWallpaperScheduler
+
+        tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-tree-"))
+        make_media_tree(tmp / "media", count)
+
+        scheduler = UnifiedWallpaperScheduler()
+        scheduler.source = str(tmp / "media")
+        scheduler.range_type = "all"
+        return {"tmp": tmp, "scheduler": scheduler}
+    return setup
+
+def _scheduler_teardown(state):
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("scheduler.get_media_files[10k]", setup=_scheduler_setup(10_000),
+           teardown=_scheduler_teardown, rounds=10)
+def bench_get_media_files_10k(state):
+    state["scheduler"]._get_media_files()
+
+
+@benchmark("scheduler.get_media_files[100k]", setup=_scheduler_setup(100_000),
+           teardown=_scheduler_teardown, rounds=3, large=True)
+def bench_get_media_files_100k(state):
+    state["scheduler"]._get_media_files()
+
+
+@benchmark("scheduler.get_random_wallpaper[10k]", setup=_scheduler_setup(10_000),
+           teardown=_scheduler_teardown, rounds=10)
+def bench_get_random_wallpaper_10k(state):
+    state["scheduler"]._get_random_wallpaper()
+
+
+def _selection_setup(count: int):
+    def setup():
+        state = _scheduler_setup(count)()
+        from utils.catalog import get_catalog
+
+        catalog = get_catalog()
+        sizes = ((800, 600), (1920, 1080), (3840, 2160), (6144, 3456), (1080, 1920))
+        files = [f.resolve() for f in state["scheduler"]._get_media_files()]
+        for i, f in enumerate(files):
+            width, height = sizes[i % len(sizes)]
+            catalog.update(f, media={"ok": True, "kind": "image", "width": width, "height": height})
+        state["files"] = files
+        state["scheduler"].set_selection_policy("prefer")
+        return state
+    return setup
+
+
+@benchmark("scheduler.filter_by_resolution[10k, prefer]", setup=_selection_setup(10_000),
+           teardown=_scheduler_teardown, rounds=10)
+def bench_filter_by_resolution_10k(state):
+    matching = state["scheduler"]._filter_by_resolution(state["files"])
+    return {"matching": len(matching)}
@@ -0,0 +1,54 @@
+import io
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+POOLED = 100
+ROUNDS = 5
+
+
+def _png_bytes(seed: int) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (16, 16), seed.to_bytes(4, "big") * 192).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _setup():
+    prepare()
+    from PySide6.QtCore import QCoreApplication
+    from core.shuffle_pool import ShufflePool
+    from utils.display_layout import get_primary_display
+
+    tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-shuffle-"))
+    display = get_primary_display()
+    static = tmp / "pool" / "static"
+    static.mkdir(parents=True)
+    # Setup runs once: enough warm files for every round
+    for i in range(POOLED * ROUNDS):
+        (static / f"{display.width}x{display.height}_shuffle_{i}.png").write_bytes(_png_bytes(i))
+    # Pool sizes of 0: nothing is refilled, so no network is touched
+    pool = ShufflePool({"static": 0, "animated": 0}, folder=tmp / "pool", dest_folder=tmp / "collection")
+    # Leftovers are probed on the executor; their results arrive through the event loop
+    deadline = time.monotonic() + 30
+    while pool.count(animated=False) < POOLED * ROUNDS and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    return {"tmp": tmp, "pool": pool}
+
+def _teardown(state):
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark(f"shuffle.pool_take[{POOLED} warm static]", setup=_setup, teardown=_teardown,
+           rounds=ROUNDS, warmup=0, ops=POOLED)
+def bench_pool_take(state):
+    pool = state["pool"]
+    taken = [pool.take(animated=False) for _ in range(POOLED)]
+    assert all(path is not None and path.exists() for path in taken)
@@ -0,0 +1,77 @@
+import os
+import sys
+import socket
+import shutil
+import tempfile
+import time
+import threading
+import subprocess
+
+from benchmarks.env import SCRIPTS_DIR
+from benchmarks.harness import benchmark
+
+
+URI = "tapeciarnia:set?url=https://example.com/wallpaper.jpg"
+
+
+class FakePrimary:
+    """Stands in for a running instance: a Unix socket where QLocalServer would listen"""
+
+    def __init__(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix="tapeciarnia-bench-ipc-")
+        self.messages = []
+        self.sock = None
+
+    def start(self):
+        from ipc_forward import SERVER_NAME
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(os.path.join(self.tmp_dir, SERVER_NAME))
+        self.sock.listen(8)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                data = b""
+                while chunk := conn.recv(4096):
+                    data += chunk
+                self.messages.append(data.decode("utf-8"))
+
+    def stop(self):
+        self.sock.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def _setup():
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    primary = FakePrimary()
+    primary.start()
+    env = dict(os.environ, TMPDIR=primary.tmp_dir)
+    return {"primary": primary, "env": env}
+
+def _teardown(state):
+    state["primary"].stop()
+
+
+if sys.platform != "win32":
+    @benchmark("startup.deep_link_forward", setup=_setup, teardown=_teardown, rounds=5)
+    def bench_deep_link_forward(state):
+        """Whole secondary process: interpreter start, forward the URI, exit (no Qt import)"""
+        primary = state["primary"]
+        before = len(primary.messages)
+        result = subprocess.run([sys.executable, str(SCRIPTS_DIR / "main.py"), URI],
+                                cwd=SCRIPTS_DIR, env=state["env"], capture_output=True, timeout=30)
+        assert result.returncode == 0, result.stderr.decode(errors="replace")
+        # The fake primary reads on its own thread: give it a moment to record the message
+        for _ in range(100):
+            if len(primary.messages) > before:
+                break
+            time.sleep(0.01)
+        assert primary.messages[-1] == URI, primary.messages
+        return {"forwarded": len(primary.messages)}
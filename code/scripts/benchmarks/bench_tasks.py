@@ -0,0 +1,44 @@
+import threading
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+TASKS = 1000
+
+
+def _setup():
+    prepare()
+    from core.task_executor import TaskExecutor
+
+    return {"executor": TaskExecutor()}
+
+def _teardown(state):
+    state["executor"].shutdown()
+
+
+def _work(results: list, i: int):
+    results.append(i * i)
+
+
+@benchmark(f"tasks.executor[{TASKS} tasks]", setup=_setup, teardown=_teardown, rounds=5, ops=TASKS)
+def bench_executor(state):
+    """Short tasks on the shared pools: threads are created once and reused"""
+    executor, results = state["executor"], []
+    futures = [executor.submit(_work, results, i, lane="interactive") for i in range(TASKS)]
+    for future in futures:
+        future.result()
+    assert len(results) == TASKS
+    return {"running_after": sum(c["running"] for c in executor.counts().values())}
+
+
+@benchmark(f"tasks.thread_per_task[{TASKS} tasks]", rounds=5, ops=TASKS)
+def bench_thread_per_task(state):
+    """The old pattern for comparison: a new thread for every operation"""
+    results = []
+    threads = [threading.Thread(target=_work, args=(results, i)) for i in range(TASKS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == TASKS
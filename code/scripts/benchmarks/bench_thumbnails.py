@@ -0,0 +1,34 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+def _jpeg_setup(size):
+    def setup():
+        prepare()
+        from benchmarks.bench_images import _source_image
+
+        tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-thumbs-"))
+        source = tmp / "source.jpg"
+        _source_image(*size).save(source, format="JPEG", quality=90)
+        return {"tmp": tmp, "source": source, "round": 0}
+    return setup
+
+def _teardown(state):
+    shutil.rmtree(state["tmp"], ignore_errors=True)
+
+
+@benchmark("thumbnail.image[6000x4000 jpeg, draft]", setup=_jpeg_setup((6000, 4000)), teardown=_teardown, rounds=10)
+def bench_image_thumbnail(state):
+    from utils.thumbnails import make_image_thumbnail
+    state["round"] += 1
+    make_image_thumbnail(str(state["source"]), str(state["tmp"] / f"thumb_{state['round']}.jpg"))
+
+
+@benchmark("thumbnail.content_key[6000x4000 jpeg]", setup=_jpeg_setup((6000, 4000)), teardown=_teardown, rounds=20)
+def bench_content_key(state):
+    from utils.thumbnails import content_key
+    content_key(state["source"])
@@ -0,0 +1,39 @@
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+URIS = [
+    "tapeciarnia:12345",
+    "tapeciarnia:https://tapeciarnia.pl/img.jpg",
+    "tapeciarnia:mp4_url:https://tapeciarnia.pl/v.mp4",
+    "tapeciarnia://setwallpaper?url=https://www.tapeciarnia.pl/image.jpg",
+    "tapeciarnia:https://evil.example.com/img.jpg",
+    "http://not-our-scheme.pl",
+] * 100
+
+INPUTS = [
+    "https://tapeciarnia.pl/program/pobierz_jpeg_v2.php?id=386422",
+    "  'https://www.tapeciarnia.pl/image.jpg'  ",
+    "~/definitely/not/a/file.png",
+    "ftp://tapeciarnia.pl/file.jpg",
+    "",
+    "C:\\Users\\nobody\\Pictures\\x.jpg",
+] * 100
+
+
+def _setup():
+    prepare()
+    return None
+
+
+@benchmark("uri.parse_uri_command[600]", setup=_setup, rounds=10, ops=len(URIS))
+def bench_parse_uri_command(state):
+    from utils.uri_handler import parse_uri_command
+    for uri in URIS:
+        parse_uri_command(uri)
+
+
+@benchmark("validators.validate_url_or_path[600]", setup=_setup, rounds=10, ops=len(INPUTS))
+def bench_validate_url_or_path(state):
+    from utils.validators import validate_url_or_path
+    for s in INPUTS:
+        validate_url_or_path(s)
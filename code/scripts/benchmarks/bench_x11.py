@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+from benchmarks.env import prepare
+from benchmarks.harness import benchmark
+
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+class Xvfb:
+    """Virtual X server on a free display number; DISPLAY points at it while it runs"""
+
+    def __init__(self, width: int = WIDTH, height: int = HEIGHT):
+        self.size = (width, height)
+        self.process = None
+        self._saved_env = {}
+
+    def start(self):
+        read_fd, write_fd = os.pipe()
+        self.process = subprocess.Popen(
+            ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", f"{self.size[0]}x{self.size[1]}x24",
+             "-nolisten", "tcp"],
+            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.close(write_fd)
+        # Xvfb writes the display number it picked once it accepts connections
+        with os.fdopen(read_fd) as f:
+            number = f.readline().strip()
+        if not number:
+            raise RuntimeError("Xvfb did not start")
+
+        for key in ("DISPLAY", "WAYLAND_DISPLAY"):
+            self._saved_env[key] = os.environ.pop(key, None)
+        os.environ["DISPLAY"] = f":{number}"
+
+    def stop(self):
+        for key, value in self._saved_env.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+
+
+def _setup():
+    prepare()
+    from PIL import Image
+
+    server = Xvfb()
+    server.start()
+    tmp_dir = Path(tempfile.mkdtemp(prefix="tapeciarnia-bench-x11-"))
+    image = Image.radial_gradient("L").resize((WIDTH, HEIGHT)).convert("RGB")
+    path = tmp_dir / "wallpaper.jpg"
+    image.save(path, quality=90)
+    return {"server": server, "tmp_dir": tmp_dir, "image": image, "path": path}
+
+def _teardown(state):
+    state["server"].stop()
+    shutil.rmtree(state["tmp_dir"], ignore_errors=True)
+
+
+if shutil.which("Xvfb") and importlib.util.find_spec("Xlib"):
+    @benchmark(f"x11.root_pixmap_upload[{WIDTH}x{HEIGHT}]", setup=_setup, teardown=_teardown, rounds=10)
+    def bench_root_pixmap_upload(state):
+        """Upload a prepared image into a new root pixmap and publish it (no render)"""
+        from utils import x11_root
+
+        pixmap = x11_root.set_root_pixmap(state["image"])
+        assert x11_root.get_root_pixmap() == pixmap
+
+    @benchmark(f"x11.apply[{WIDTH}x{HEIGHT}]", setup=_setup, teardown=_teardown, rounds=10)
+    def bench_x11_apply(state):
+        """Whole in-process apply on bare X11: render for the layout, upload, publish"""
+        from utils.linux_desktop import X11RootBackend
+
+        assert X11RootBackend().set_wallpaper(state["path"], "fill")
+
+    @benchmark("x11.desktop_window", setup=_setup, teardown=_teardown, rounds=10)
+    def bench_desktop_window(state):
+        """Create and tear down the window video wallpapers play in (what xwinwrap did)"""
+        from utils.x11_root import DesktopWindow
+
+        window = DesktopWindow()
+        assert window.create()
+        window.destroy()
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import logging
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+_settings_dir = None
+_app = None
+
+
+def prepare():
+    """
+    Make the app modules importable outside the GUI: quiet logging, a core
+    application for QObject/QThread users, and the home folder, config.json,
+    QSettings and the cache folder pointed at temp dirs so benchmark runs never
+    touch the user's real data. Must run before any app module is imported:
+    path_utils creates its folders at import time.
+    """
+    global _settings_dir, _app
+    if _app is not None:
+        return
+    if "utils.path_utils" in sys.modules:
+        raise RuntimeError("benchmarks.env.prepare() must run before the app modules are imported")
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # The collection (~/Pictures/Tapeciarnia) lives under the home folder
+    home_dir = tempfile.mkdtemp(prefix="tapeciarnia-bench-home-")
+    os.environ["HOME"] = home_dir
+    os.environ["USERPROFILE"] = home_dir
+    # config.json is written two levels above the running script
+    sys.argv[0] = os.path.join(home_dir, "app", "scripts", "benchmarks")
+
+    # Render/thumbnail caches and the media catalog live under the user cache dir
+    cache_dir = tempfile.mkdtemp(prefix="tapeciarnia-bench-cache-")
+    os.environ["XDG_CACHE_HOME"] = cache_dir
+    os.environ["LOCALAPPDATA"] = cache_dir
+
+    from PySide6.QtCore import QCoreApplication, QSettings
+    _settings_dir = tempfile.mkdtemp(prefix="tapeciarnia-bench-settings-")
+    QSettings.setPath(QSettings.Format.NativeFormat, QSettings.Scope.UserScope, _settings_dir)
+    QSettings.setPath(QSettings.Format.IniFormat, QSettings.Scope.UserScope, _settings_dir)
+
+    _app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+
+class PayloadServer:
+    """Local HTTP server returning a fixed in-memory payload for every GET"""
+
+    def __init__(self, payload: bytes, content_type: str = "application/octet-stream"):
+        self.payload = payload
+        self.content_type = content_type
+        self.httpd = None
+
+    def start(self) -> str:
+        payload = self.payload
+        content_type = self.content_type
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def make_media_tree(root: Path, count: int) -> Path:
+    """Flat folder with `count` empty files, mixed media and junk extensions"""
+    root.mkdir(parents=True, exist_ok=True)
+    exts = (".jpg", ".png", ".mp4", ".webm", ".jpeg", ".txt", ".part", ".mkv")
+    for i in range(count):
+        (root / f"wallpaper_{i:06d}{exts[i % len(exts)]}").touch()
+    return root
@@ -0,0 +1,131 @@
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import logging
+from pathlib import Path
+from typing import Callable, Optional
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = BENCH_DIR / "baselines"
+
+# A benchmark regresses when its median gets slower than baseline * threshold
+DEFAULT_THRESHOLD = 1.25
+
+
+class Benchmark:
+    """One registered benchmark: a setup returning state, the timed callable and an optional teardown."""
+
+    def __init__(self, name: str, func: Callable, setup: Optional[Callable] = None,
+                 teardown: Optional[Callable] = None, rounds: int = 10, warmup: int = 1,
+                 large: bool = False, ops: int = 1):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.teardown = teardown
+        self.rounds = rounds
+        self.warmup = warmup
+        self.large = large
+        self.ops = ops          # operations per call, used for throughput reporting
+
+
+_registry: list[Benchmark] = []
+
+def benchmark(name: str, setup: Callable = None, teardown: Callable = None,
+              rounds: int = 10, warmup: int = 1, large: bool = False, ops: int = 1):
+    """Decorator registering `func(state)` as a benchmark. A returned dict is reported as extra info."""
+    def wrap(func):
+        _registry.append(Benchmark(name, func, setup, teardown, rounds, warmup, large, ops))
+        return func
+    return wrap
+
+def registered() -> list[Benchmark]:
+    return list(_registry)
+
+
+def measure(bench: Benchmark) -> dict:
+    """Run one benchmark and return timing statistics in seconds"""
+    state = bench.setup() if bench.setup else None
+    try:
+        for _ in range(bench.warmup):
+            bench.func(state)
+
+        samples, info = [], None
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(bench.rounds):
+                t0 = time.perf_counter()
+                info = bench.func(state)
+                samples.append(time.perf_counter() - t0)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if bench.teardown:
+            bench.teardown(state)
+
+    median = statistics.median(samples)
+    stats = {
+        "rounds": len(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.fmean(samples),
+        "median": median,
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sec": bench.ops / median if median > 0 else 0.0,
+    }
+    # A benchmark may return a dict of extra measurements (e.g. output quality)
+    if isinstance(info, dict):
+        stats["info"] = info
+    return stats
+
+
+# -------------------------------------------------------------------
+# BASELINES
+# -------------------------------------------------------------------
+def machine_id() -> str:
+    """Baselines are only comparable on the same machine / interpreter"""
+    return f"{platform.system().lower()}-{platform.machine().lower()}-py{sys.version_info.major}{sys.version_info.minor}"
+
+def baseline_path() -> Path:
+    return BASELINE_DIR / f"{machine_id()}.json"
+
+def load_baseline() -> dict:
+    path = baseline_path()
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("results", {})
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not read baseline {path}: {e}")
+        return {}
+
+def save_baseline(results: dict):
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = baseline_path()
+    payload = {
+        "machine": machine_id(),
+        "python": sys.version,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+    print(f"Baseline saved: {path}")
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Return the names of benchmarks whose median regressed past the threshold"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("median"):
+            continue
+        if stats["median"] > base["median"] * threshold:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,146 @@
+import logging
+import threading
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from core.download_queue import get_download_queue
+from utils.metrics import get_metrics
+from utils.cancellation import CancelToken
+
+
+# Higher wins: a scheduled change never overrides something the user asked for
+PRIORITIES = {"scheduled": 0, "manual": 1}
+
+
+class ApplyRequest:
+    def __init__(self, target: str, priority: str, source: str, generation: int):
+        self.target = target            # local path or URL
+        self.priority = priority
+        self.source = source            # scheduler / ui / shuffle / uri / drop / browser ...
+        self.generation = generation
+        self.token = CancelToken()      # cancelled when superseded, stops its render
+
+    def __repr__(self):
+        return f"ApplyRequest({self.source}, {self.priority}, {self.target!r}, gen={self.generation})"
+
+
+class ApplyArbiter(QObject):
+    """
+    Single entry point for "change the wallpaper" from every source.
+
+    Requests arriving within `window_ms` of each other are coalesced: the
+    highest priority wins, and among equals the latest one. Only the winner is
+    dispatched. A new winner supersedes the request still in flight (typically
+    waiting for its download): its token is cancelled and it stops waiting for
+    its downloads (a transfer nobody else shares is cancelled), so its late
+    result can no longer overwrite the newer choice; a scheduled request never
+    supersedes a manual one in flight.
+
+    submit() may be called from any thread; dispatch happens on the GUI thread.
+    """
+
+    dispatch = Signal(object)           # ApplyRequest
+    _submitted = Signal(object)
+
+    def __init__(self, window_ms: int = 50, parent=None):
+        super().__init__(parent)
+        self.downloads = get_download_queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending: list[ApplyRequest] = []
+        self.in_flight: ApplyRequest | None = None
+        self._in_flight_downloads: list[tuple] = []     # (url, on_done) of the request in flight
+        self._in_flight_rendering = False
+
+        self.window = QTimer(self)
+        self.window.setSingleShot(True)
+        self.window.setInterval(window_ms)
+        self.window.timeout.connect(self._decide)
+        # Queued across threads: the scheduler thread never touches the timer
+        self._submitted.connect(self._on_submitted)
+
+    # -------------------------------------------------------------------
+    # PUBLIC
+    # -------------------------------------------------------------------
+    def submit(self, target: str, priority: str = "manual", source: str = "ui") -> int:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown apply priority: {priority}")
+        with self._lock:
+            self._generation += 1
+            request = ApplyRequest(str(target), priority, source, self._generation)
+        get_metrics().inc("apply_requests_total")
+        self._submitted.emit(request)
+        return request.generation
+
+    def is_current(self, generation: int) -> bool:
+        """Is this request still the one the user should see applied?"""
+        return self.in_flight is not None and self.in_flight.generation == generation
+
+    def attach_download(self, generation: int, url: str, on_done):
+        """
+        Remember a download made for a request (and the on_done it was queued
+        with), to stop waiting for it if the request is superseded
+        """
+        if self.is_current(generation):
+            self._in_flight_downloads.append((url, on_done))
+
+    def awaiting_download(self, generation: int) -> bool:
+        return self.is_current(generation) and bool(self._in_flight_downloads)
+
+    def attach_render(self, generation: int):
+        """The request's image is rendering on a worker: it stays in flight (and cancellable) until applied"""
+        if self.is_current(generation):
+            self._in_flight_rendering = True
+
+    def rendering(self, generation: int) -> bool:
+        return self.is_current(generation) and self._in_flight_rendering
+
+    def complete(self, generation: int):
+        """The request finished (applied or failed); later requests no longer supersede it"""
+        if self.is_current(generation):
+            self.in_flight = None
+            self._in_flight_downloads = []
+            self._in_flight_rendering = False
+
+    # -------------------------------------------------------------------
+    # ARBITRATION
+    # -------------------------------------------------------------------
+    def _on_submitted(self, request: ApplyRequest):
+        self._pending.append(request)
+        # Every request restarts the window: a burst ends in a single decision
+        self.window.start()
+
+    def _decide(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        # max() keeps the first of equals, so walk newest first: latest wins among equals
+        winner = max(reversed(pending), key=lambda r: PRIORITIES[r.priority])
+        metrics = get_metrics()
+        if len(pending) > 1:
+            metrics.inc("apply_coalesced_total", len(pending) - 1)
+            logging.info(f"Coalesced {len(pending)} apply requests into {winner}")
+
+        current = self.in_flight
+        if current is not None:
+            if PRIORITIES[winner.priority] < PRIORITIES[current.priority]:
+                logging.info(f"Dropped {winner}: {current} is in flight")
+                metrics.inc("apply_dropped_total")
+                return
+            self._supersede(current)
+
+        self.in_flight = winner
+        self._in_flight_downloads = []
+        self._in_flight_rendering = False
+        self.dispatch.emit(winner)
+
+    def _supersede(self, request: ApplyRequest):
+        logging.info(f"Superseded {request}")
+        get_metrics().inc("apply_superseded_total")
+        request.token.cancel()
+        for url, on_done in self._in_flight_downloads:
+            self.downloads.detach(url, on_done)
+        self.in_flight = None
+        self._in_flight_downloads = []
+        self._in_flight_rendering = False
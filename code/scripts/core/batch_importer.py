@@ -0,0 +1,312 @@
+import os
+import time
+import uuid
+import logging
+import tarfile
+import zipfile
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PySide6.QtCore import Signal
+
+from utils.catalog import get_catalog
+from utils.media_probe import probe_media
+from utils.metrics import get_metrics
+from utils.cancellation import OperationCancelled
+from core.event_bus import get_event_bus
+from core.task_executor import BackgroundTask
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+CHUNK_SIZE = 1024 * 1024
+
+
+def is_archive(path) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BatchImporter(BackgroundTask):
+    """
+    Imports dropped folders, multi-selections and zip/tar archives into the collection.
+
+    Sources are enumerated lazily; plain files are copied by a bounded thread pool,
+    archives are streamed entry by entry without unpacking them first. Every copy is
+    hashed while it is written, duplicates (of the collection or of the batch) are
+    dropped, and each new file is probed so broken media never lands in the collection.
+    """
+
+    # Progress and errors go over the event bus (source "import")
+    done = Signal(dict)                     # summary
+
+    def __init__(self, sources: list, dest_folder: Path, extensions: list[str],
+                 max_workers: int = 4, probe: bool = True, parent=None):
+        super().__init__(parent)
+        self.sources = [Path(s) for s in sources]
+        self.dest_folder = Path(dest_folder)
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.max_workers = max_workers
+        self.probe = probe
+        self.catalog = get_catalog()
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+        self._hashes = {}                   # digest -> destination path
+        self._sizes = {}                    # size -> [existing collection files not hashed yet]
+        self._hashing = {}                  # size -> Event, set once that bucket's hashes are in _hashes
+        self._names = set()
+        self._last_emit = 0.0
+        self._started = time.perf_counter()
+        self.stats = {"discovered": 0, "imported": 0, "duplicates": 0, "rejected": 0,
+                      "failed": 0, "bytes": 0, "seconds": 0.0}
+
+    # -------------------------------------------------------------------
+    # MAIN
+    # -------------------------------------------------------------------
+    def run(self):
+        t0 = self._started = time.perf_counter()
+        try:
+            self.dest_folder.mkdir(parents=True, exist_ok=True)
+            self._load_existing()
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="import") as pool:
+                for source in self.sources:
+                    if self.token.cancelled:
+                        break
+                    if source.is_dir():
+                        for path in self._walk(source):
+                            if self.token.cancelled:
+                                break
+                            self._submit(pool, self._import_file, path)
+                    elif is_archive(source):
+                        self._submit(pool, self._import_archive, source)
+                    elif source.is_file() and self._wanted(source.name):
+                        self._submit(pool, self._import_file, source)
+        except Exception as e:
+            logging.error(f"Batch import failed: {e}", exc_info=True)
+            get_event_bus().publish("error", {"title": "Import", "text": f"Import failed: {e}", "notify": True},
+                                    source="import")
+        finally:
+            self.catalog.save()
+            self.stats["seconds"] = time.perf_counter() - t0
+            metrics = get_metrics()
+            metrics.inc("import_files_total", self.stats["imported"])
+            metrics.inc("import_bytes_total", self.stats["bytes"])
+            metrics.observe("batch_import", self.stats["seconds"])
+            self._emit_progress(force=True)
+            logging.info(f"Batch import finished: {self.stats}")
+            self.done.emit(dict(self.stats))
+
+    def _submit(self, pool, fn, *args):
+        # Bounded queue: enumeration never runs far ahead of the copy workers
+        self._slots.acquire()
+        if fn is self._import_file:
+            with self._lock:
+                self.stats["discovered"] += 1
+
+        def task():
+            try:
+                # Queued before a cancel: skip it without opening anything
+                if not self.token.cancelled:
+                    fn(*args)
+            finally:
+                self._slots.release()
+        pool.submit(task).add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, future):
+        error = None if future.cancelled() else future.exception()
+        if error is not None and not isinstance(error, OperationCancelled):
+            logging.error(f"Import task failed: {error}", exc_info=error)
+            self._count("failed")
+
+    def _wanted(self, name: str) -> bool:
+        return name.lower().endswith(self.extensions) and not name.startswith(".")
+
+    def _walk(self, folder: Path):
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if self._wanted(name):
+                    yield Path(root) / name
+
+    def _load_existing(self):
+        """Index the collection by size; existing files are only hashed on a size collision"""
+        with os.scandir(self.dest_folder) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    self._names.add(entry.name.lower())
+                    self._sizes.setdefault(entry.stat().st_size, []).append(Path(entry.path))
+
+    # -------------------------------------------------------------------
+    # COPY
+    # -------------------------------------------------------------------
+    def _import_file(self, path: Path):
+        try:
+            with open(path, "rb") as src:
+                self._copy_stream(src, path.name)
+        except OSError as e:
+            logging.warning(f"Import failed for {path}: {e}")
+            self._count("failed")
+
+    def _import_archive(self, archive: Path):
+        """Stream archive members straight into the collection, one at a time"""
+        try:
+            if archive.name.lower().endswith(".zip"):
+                with zipfile.ZipFile(archive) as zf:
+                    for info in zf.infolist():
+                        if self.token.cancelled:
+                            break
+                        name = Path(info.filename).name
+                        if info.is_dir() or not self._wanted(name):
+                            continue
+                        self._count("discovered")
+                        with zf.open(info) as src:
+                            self._copy_stream(src, name)
+            else:
+                # "r|*" reads the archive as a stream (no seeking, any compression)
+                with tarfile.open(archive, "r|*") as tf:
+                    for member in tf:
+                        if self.token.cancelled:
+                            break
+                        name = Path(member.name).name
+                        if not member.isfile() or not self._wanted(name):
+                            continue
+                        self._count("discovered")
+                        src = tf.extractfile(member)
+                        if src is not None:
+                            self._copy_stream(src, name)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+            logging.error(f"Could not read archive {archive}: {e}")
+            self._count("failed")
+
+    def _copy_stream(self, src, name: str):
+        tmp = self.dest_folder / f".import-{uuid.uuid4().hex}.tmp"
+        digest = hashlib.blake2b(digest_size=20)
+        size = 0
+        try:
+            with open(tmp, "wb") as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    self.token.raise_if_cancelled()
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        key = digest.hexdigest()
+        if self._is_duplicate(key, size):
+            tmp.unlink(missing_ok=True)
+            self._count("duplicates")
+            return
+
+        try:
+            # Probed by content, the temp name has no meaningful extension
+            info = probe_media(tmp) if self.probe else None
+            if info is not None and not info["ok"]:
+                tmp.unlink(missing_ok=True)
+                logging.warning(f"Import rejected {name}: {info['error']}")
+                self._count("rejected")
+                return
+
+            dest = self._claim_name(name)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            # Give the digest back, a later copy of the same content may still land
+            with self._lock:
+                if key in self._hashes and self._hashes[key] is None:
+                    del self._hashes[key]
+            raise
+        fields = {"hash": key}
+        if info is not None:
+            fields["media"] = info
+        self.catalog.update(dest, **fields)
+
+        with self._lock:
+            self._hashes[key] = dest
+            self.stats["imported"] += 1
+            self.stats["bytes"] += size
+        self._emit_progress()
+
+    def _is_duplicate(self, key: str, size: int) -> bool:
+        with self._lock:
+            if key in self._hashes:
+                return True
+            candidates = self._sizes.pop(size, None)
+            if candidates is not None:
+                ready = self._hashing[size] = threading.Event()
+            else:
+                ready = self._hashing.get(size)
+
+        if candidates is not None:
+            # Same size as existing files: hash them now (once) and compare
+            try:
+                for existing in candidates:
+                    entry = self.catalog.get(existing)
+                    existing_key = entry.get("hash") if entry else None
+                    if not existing_key:
+                        try:
+                            existing_key = file_digest(existing)
+                        except OSError:
+                            continue
+                        self.catalog.update(existing, hash=existing_key)
+                    with self._lock:
+                        self._hashes[existing_key] = existing
+            finally:
+                with self._lock:
+                    del self._hashing[size]
+                ready.set()
+        elif ready is not None:
+            # Another copy of this size is hashing the existing files: wait for its digests
+            ready.wait()
+
+        with self._lock:
+            if key in self._hashes:
+                return True
+            # Reserve the digest so a concurrent copy of the same content is a duplicate
+            self._hashes[key] = None
+            return False
+
+    def _claim_name(self, name: str) -> Path:
+        stem, suffix = os.path.splitext(name)
+        with self._lock:
+            candidate, counter = name, 1
+            while candidate.lower() in self._names:
+                candidate = f"{stem}_{counter}{suffix}"
+                counter += 1
+            self._names.add(candidate.lower())
+        return self.dest_folder / candidate
+
+    # -------------------------------------------------------------------
+    # PROGRESS
+    # -------------------------------------------------------------------
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+        self._emit_progress()
+
+    def _emit_progress(self, force: bool = False):
+        now = time.perf_counter()
+        with self._lock:
+            # At most ~10 updates per second, whatever the file rate
+            if not force and now - self._last_emit < 0.1:
+                return
+            self._last_emit = now
+            processed = self.stats["imported"] + self.stats["duplicates"] + self.stats["rejected"] + self.stats["failed"]
+            discovered = self.stats["discovered"]
+            elapsed = now - self._started
+            mb_s = self.stats["bytes"] / 1024 / 1024 / elapsed if elapsed else 0.0
+        get_event_bus().publish("progress", {
+            "text": f"Importing {processed}/{discovered} files ({mb_s:.1f} MB/s)",
+            "done": processed, "total": discovered,
+        }, source="import")
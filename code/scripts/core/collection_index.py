@@ -0,0 +1,189 @@
+import os
+import logging
+import threading
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+from utils.metrics import get_metrics
+
+
+# Files that only exist while something is still being written
+# (yt-dlp fragments / merges, browser downloads, our own atomic writes)
+TEMP_SUFFIXES = (".part", ".ytdl", ".tmp", ".temp", ".crdownload")
+
+
+def is_temp_file(name: str) -> bool:
+    lower = name.lower()
+    if lower.startswith(".") or lower.endswith(TEMP_SUFFIXES):
+        return True
+    # yt-dlp writes per-format streams as name.f137.mp4 before merging them
+    parts = lower.rsplit(".", 2)
+    return len(parts) == 3 and parts[1].startswith("f") and parts[1][1:].isdigit()
+
+
+def scan_folder(folder: Path) -> set[str]:
+    """Names of the regular, finished files directly inside `folder`"""
+    names = set()
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not is_temp_file(entry.name) and entry.is_file():
+                    names.add(entry.name)
+    except OSError as e:
+        logging.warning(f"Could not scan {folder}: {e}")
+    return names
+
+
+class CollectionIndex(QObject):
+    """
+    In-memory listing of the collection folders kept live by QFileSystemWatcher
+    (inotify on Linux, ReadDirectoryChangesW on Windows).
+
+    A folder is scanned once when it is first watched. After that only change
+    notifications cause work: bursts are debounced, then just the affected folder
+    is re-listed and the difference is applied as add/remove deltas (a rename is a
+    remove plus an add). Readers on any thread get the current listing without
+    touching the disk.
+
+    Must be created on the GUI thread; file lists can be read from anywhere.
+    """
+
+    # folder, added names, removed names
+    delta = Signal(str, list, list)
+
+    def __init__(self, debounce_ms: int = 500, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._folders: dict[str, set[str]] = {}
+        self._pending: set[str] = set()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(debounce_ms)
+        self.debounce.timeout.connect(self.flush)
+
+    @staticmethod
+    def _key(folder) -> str:
+        return str(Path(folder).resolve())
+
+    # -------------------------------------------------------------------
+    # WATCHING
+    # -------------------------------------------------------------------
+    def watch(self, folder) -> bool:
+        key = self._key(folder)
+        with self._lock:
+            if key in self._folders:
+                return True
+
+        if not Path(key).is_dir():
+            logging.warning(f"Cannot watch missing folder: {key}")
+            return False
+
+        with get_metrics().stage("scan"):
+            names = scan_folder(Path(key))
+        with self._lock:
+            self._folders[key] = names
+
+        if not self.watcher.addPath(key):
+            logging.warning(f"File watcher refused {key}, index will not update live")
+        logging.info(f"Collection index watching {key} ({len(names)} files)")
+        return True
+
+    def unwatch(self, folder):
+        key = self._key(folder)
+        self.watcher.removePath(key)
+        with self._lock:
+            self._folders.pop(key, None)
+            self._pending.discard(key)
+
+    def watched_folders(self) -> list[Path]:
+        with self._lock:
+            return [Path(key) for key in self._folders]
+
+    def is_watching(self, folder) -> bool:
+        with self._lock:
+            return self._key(folder) in self._folders
+
+    # -------------------------------------------------------------------
+    # QUERIES
+    # -------------------------------------------------------------------
+    def files(self, folder, extensions=None) -> list[Path]:
+        """Files of a watched folder, optionally filtered by (lowercase) extension"""
+        key = self._key(folder)
+        with self._lock:
+            names = list(self._folders.get(key, ()))
+        if extensions is not None:
+            extensions = tuple(e.lower() for e in extensions)
+            names = [n for n in names if n.lower().endswith(extensions)]
+        base = Path(key)
+        return [base / n for n in names]
+
+    def count(self, folder, extensions=None) -> int:
+        return len(self.files(folder, extensions))
+
+    # -------------------------------------------------------------------
+    # CHANGE HANDLING
+    # -------------------------------------------------------------------
+    def _on_directory_changed(self, path: str):
+        with self._lock:
+            self._pending.add(self._key(path))
+        # Restart the timer: a burst of writes ends in one re-list
+        self.debounce.start()
+
+    def refresh(self, folder):
+        """Re-list a watched folder now, e.g. right after a writer we know about finished"""
+        key = self._key(folder)
+        with self._lock:
+            if key not in self._folders:
+                return
+            self._pending.add(key)
+        self.flush()
+
+    def flush(self):
+        """Apply pending changes now (normally called by the debounce timer)"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+
+        metrics = get_metrics()
+        for key in pending:
+            folder = Path(key)
+            if not folder.is_dir():
+                logging.warning(f"Watched folder disappeared: {key}")
+                with self._lock:
+                    removed = sorted(self._folders.get(key, ()))
+                    self._folders[key] = set()
+                if removed:
+                    self.delta.emit(key, [], removed)
+                continue
+
+            current = scan_folder(folder)
+            with self._lock:
+                known = self._folders.get(key)
+                if known is None:
+                    continue        # unwatched meanwhile
+                added = sorted(current - known)
+                removed = sorted(known - current)
+                self._folders[key] = current
+
+            # Some platforms drop the watch when the folder is replaced
+            if key not in self.watcher.directories():
+                self.watcher.addPath(key)
+
+            if added or removed:
+                metrics.inc("index_files_added_total", len(added))
+                metrics.inc("index_files_removed_total", len(removed))
+                logging.debug(f"Collection index {key}: +{len(added)} -{len(removed)}")
+                self.delta.emit(key, added, removed)
+
+
+_index_instance: CollectionIndex | None = None
+
+def get_collection_index() -> CollectionIndex:
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = CollectionIndex()
+    return _index_instance
@@ -6,22 +6,63 @@ from pathlib import Path
 from typing import Optional
 import logging
 
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Signal
 
-from utils.path_utils import SAVES_DIR
+from utils.path_utils import SAVES_DIR, get_tools_path
+from utils.system_utils import which
+from utils.metrics import get_metrics
+from utils.bandwidth import get_bandwidth
+from utils.display_layout import get_display_layout
+from core.event_bus import get_event_bus
+from core.task_executor import BackgroundTask
+from utils.cancellation import OperationCancelled, abort_response
 
 logger = logging.getLogger()
 
 
-class DownloaderThread(QThread):
-    progress = Signal(float, str)   # percent, status message
+def find_aria2c() -> Optional[str]:
+    bundled = get_tools_path() / ("aria2c.exe" if os.name == "nt" else "aria2c")
+    if bundled.exists():
+        return str(bundled)
+    return which("aria2c")
+
+
+def lane_for(traffic_class: str) -> str:
+    """Executor lane of a download: only the user's own downloads are interactive"""
+    return "interactive" if traffic_class == "interactive" else "background"
+
+
+def publish_progress(url: str, percent: float, status: str):
+    """Progress goes over the event bus: per-chunk reports coalesce to one UI update per frame"""
+    get_event_bus().publish("progress", {"url": url, "percent": percent, "text": status}, source="download", key=url)
+
+
+def wallpaper_format(width: int, height: int) -> str:
+    """
+    yt-dlp format selector for a wallpaper: the best video-only stream that is
+    not larger than the display (either orientation), then anything video-only,
+    and only then a muxed stream with audio.
+    """
+    long_side, short_side = max(width, height), min(width, height)
+    fits = f"[height<={short_side}][width<={long_side}]"
+    return f"bv{fits}/bv/b{fits}/b"
+
+
+class DownloaderThread(BackgroundTask):
     done = Signal(str)              # path to downloaded file
     error = Signal(str)
 
-    def __init__(self, url: str, parent=None):
+    def __init__(self, url: str, target_size: tuple[int, int] = None, traffic_class: str = "interactive", parent=None):
         logger.info(f"Initializing DownloaderThread for URL: {url}")
         super().__init__(parent)
         self.url = url
+        self.traffic_class = traffic_class
+        self.lane = lane_for(traffic_class)
+        if target_size is None:
+            # The largest display decides, a smaller stream would be upscaled there
+            largest = max(get_display_layout(), key=lambda d: d.width * d.height)
+            target_size = (largest.width, largest.height)
+        self.target_size = target_size
         self._ensure_directories()
 
     def _ensure_directories(self):
@@ -44,75 +85,121 @@ class DownloaderThread(QThread):
             logger.error(f"Directory setup failed: {e}", exc_info=True)
             self.error.emit(f"Directory setup failed: {e}")
 
+    def _build_options(self) -> dict:
+        width, height = self.target_size
+        ydl_opts = {
+            'outtmpl': str(SAVES_DIR / '%(title)s.%(ext)s'),
+            # Wallpapers are silent: a video-only stream needs no merge step
+            'format': wallpaper_format(width, height),
+            'noplaylist': True,
+            'continuedl': True,
+            'noprogress': True,  # We handle progress ourselves
+            'nooverwrites': True,
+            'writethumbnail': False,
+            'ignoreerrors': False,  # Don't ignore errors
+            'socket_timeout': 30,
+            'retries': 3,
+            'restrictfilenames': True,  # Restrict to safe filenames
+            # DASH/HLS: fetch several fragments at once
+            'concurrent_fragment_downloads': 4,
+        }
+
+        limit = int(get_bandwidth().buckets[self.traffic_class].rate)
+        aria2c = find_aria2c()
+        if aria2c:
+            # Several connections per file; aria2c must apply the class limit itself
+            args = ['-x', '8', '-s', '8', '-k', '1M', '--summary-interval=0']
+            if limit:
+                args.append(f'--max-overall-download-limit={limit}')
+            ydl_opts['external_downloader'] = {'default': aria2c}
+            ydl_opts['external_downloader_args'] = {'aria2c': args}
+            logger.debug(f"Using external downloader: {aria2c}")
+        elif limit:
+            ydl_opts['ratelimit'] = limit
+        return ydl_opts
+
     def run(self):
         """Main download thread with improved error handling"""
         logging.info(f"Starting download thread for URL: {self.url}")
+        final_paths = []
+        partial_files = set()
         
         try:
-            # Configure yt-dlp with better error handling
-            ydl_opts = {
-                'outtmpl': str(SAVES_DIR / '%(title)s.%(ext)s'),
-                'merge_output_format': 'mp4',
-                'noplaylist': True,
-                'continuedl': True,
-                'noprogress': True,  # We handle progress ourselves
-                'nooverwrites': True,
-                'writethumbnail': False,
-                'ignoreerrors': False,  # Don't ignore errors
-                'socket_timeout': 30,
-                'retries': 3,
-                'restrictfilenames': True,  # Restrict to safe filenames
-            }
+            ydl_opts = self._build_options()
+
+            def check_cancelled():
+                # yt-dlp's own way to abort from a hook; it is not wrapped into a DownloadError
+                if self.token.cancelled:
+                    raise yt_dlp.utils.DownloadCancelled("cancelled")
+
+            # Runs once extraction is done, before any byte of media is fetched
+            def match_filter(info, *args, **kwargs):
+                check_cancelled()
+                return None
             
             # Custom progress hook
             def progress_hook(d):
+                check_cancelled()
                 if d['status'] == 'downloading':
+                    # Only files this run is writing; a file that was already complete is never touched
+                    partial_files.update(p for p in (d.get('tmpfilename'), d.get('filename')) if p)
                     if 'total_bytes' in d and d['total_bytes']:
                         percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
                         speed = d.get('speed', 0)
                         speed_str = f"{speed / 1024 / 1024:.1f} MB/s" if speed else "Unknown speed"
                         status = f"Downloading... {percent:.1f}% ({speed_str})"
-                        self.progress.emit(percent, status)
+                        publish_progress(self.url, percent, status)
                     else:
                         status = f"Downloading... {d.get('_percent_str', '0%')}"
-                        self.progress.emit(0, status)
+                        publish_progress(self.url, 0, status)
                 
                 elif d['status'] == 'finished':
-                    self.progress.emit(100, "Download completed! Processing...")
+                    publish_progress(self.url, 100, "Download completed! Processing...")
                     logging.info(f"Download finished: {d.get('filename', 'Unknown')}")
                 
                 elif d['status'] == 'error':
                     logging.error(f"Download error in progress hook: {d}")
-                    self.progress.emit(0, f"Error: {d.get('error', 'Unknown error')}")
+                    publish_progress(self.url, 0, f"Error: {d.get('error', 'Unknown error')}")
+
+            # Runs after every post-processor (merge, remux...): 'filepath' is the final file
+            def postprocessor_hook(d):
+                check_cancelled()
+                if d['status'] == 'finished':
+                    path = d.get('info_dict', {}).get('filepath')
+                    if path:
+                        final_paths.append(path)
             
             ydl_opts['progress_hooks'] = [progress_hook]
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl_opts['postprocessor_hooks'] = [postprocessor_hook]
+            ydl_opts['match_filter'] = match_filter
+
+            with get_bandwidth().transfer(self.traffic_class), yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 logging.info("Starting yt-dlp download")
-                self.progress.emit(0, "Starting download...")
+                publish_progress(self.url, 0, "Starting download...")
                 
-                # Extract info first to validate
-                info = ydl.extract_info(self.url, download=False)
+                # One extraction, downloading the selected format right away
+                with get_metrics().stage("download"):
+                    info = ydl.extract_info(self.url, download=True)
                 if not info:
                     raise Exception("Could not extract video information")
-                
-                logging.info(f"Video info extracted: {info.get('title', 'Unknown')}")
-                self.progress.emit(5, f"Preparing: {info.get('title', 'Video')}")
-                
-                # Start download
-                result = ydl.download([self.url])
-                logging.info(f"Download process completed with result: {result}")
-                
-                # Find the actual downloaded file
-                downloaded_file = self._find_downloaded_file(info.get('title'))
+                logging.info(f"Downloaded: {info.get('title', 'Unknown')} "
+                             f"({info.get('format_id')}, {info.get('width')}x{info.get('height')})")
+
+                downloaded_file = self._final_path(info, final_paths)
                 if downloaded_file and downloaded_file.exists():
-                    self.progress.emit(100, "Download completed successfully!")
+                    publish_progress(self.url, 100, "Download completed successfully!")
                     logging.info(f"Download successful: {downloaded_file}")
                     self.done.emit(str(downloaded_file))
                 else:
                     raise Exception("Downloaded file not found after completion")
                     
+        except (yt_dlp.utils.DownloadCancelled, OperationCancelled):
+            self._remove_partial(partial_files)
+            raise OperationCancelled()
         except yt_dlp.utils.DownloadError as e:
+            if self.token.cancelled:
+                self._remove_partial(partial_files)
+                raise OperationCancelled()
             error_msg = f"Download failed: {str(e)}"
             logging.error(error_msg)
             self.error.emit(error_msg)
@@ -127,47 +214,40 @@ class DownloaderThread(QThread):
         finally:
             logging.info("Download thread finished")
 
-    def _find_downloaded_file(self, title):
-        """Find the actual downloaded file after completion"""
-        if not title:
-            return None
-        
-        # Look for files that match the title pattern
-        possible_patterns = [
-            f"{title}.mp4",
-            f"{title}.mkv", 
-            f"{title}.webm",
-            f"{title}.*"
-        ]
-        
-        for pattern in possible_patterns:
-            for file_path in SAVES_DIR.glob(pattern):
-                if file_path.exists() and file_path.stat().st_size > 0:
-                    logging.info(f"Found downloaded file: {file_path}")
-                    return file_path
-        
-        # If no exact match, look for recent files in download directory
-        recent_files = sorted(SAVES_DIR.glob("*"), key=os.path.getmtime, reverse=True)
-        for file_path in recent_files[:5]:  # Check 5 most recent files
-            if file_path.exists() and file_path.stat().st_size > 0:
-                logging.info(f"Found recent file as download: {file_path}")
-                return file_path
-        
-        logging.warning("No downloaded file found")
-        return 
+    @staticmethod
+    def _remove_partial(partial_files: set):
+        """Delete what a cancelled yt-dlp run left behind (.part, fragments, .ytdl state)"""
+        for name in partial_files:
+            base = Path(name)
+            for path in [base, Path(f"{name}.part"), Path(f"{name}.ytdl"), *base.parent.glob(f"{base.name}*.part-Frag*")]:
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError as e:
+                    logging.debug(f"Could not remove partial file {path}: {e}")
+
+    @staticmethod
+    def _final_path(info: dict, final_paths: list) -> Optional[Path]:
+        """The file yt-dlp reported, no directory scan"""
+        if final_paths:
+            return Path(final_paths[-1])
+        # No post-processor ran (single stream, nothing to merge)
+        for requested in info.get('requested_downloads') or []:
+            if requested.get('filepath'):
+                return Path(requested['filepath'])
+        return Path(info['filepath']) if info.get('filepath') else None
     
 
-class DirectDownloadThread(QThread):
-    progress = Signal(float, str)   # percent, status message
+class DirectDownloadThread(BackgroundTask):
     done = Signal(str)              # path to downloaded file
     error = Signal(str)
 
-    def __init__(self, url: str, file_path: str, parent=None):
+    def __init__(self, url: str, file_path: str, traffic_class: str = "interactive", parent=None):
         logging.info(f"Initializing DirectDownloadThread for URL: {url}")
         super().__init__(parent)
         self.url = url
         self.file_path = file_path
-        self._cancelled = False
+        self.traffic_class = traffic_class
+        self.lane = lane_for(traffic_class)
     
     # prevent running more then one intance of this class 
 
@@ -176,28 +256,29 @@ class DirectDownloadThread(QThread):
             import requests
             logging.info(f"Starting direct download: {self.url} -> {self.file_path}")
             
-            self.progress.emit(0, "Connecting...")
+            publish_progress(self.url, 0, "Connecting...")
             
             # Stream download with progress
             response = requests.get(self.url, stream=True, timeout=30)
+            # Cancelling shuts the socket down: a blocked read returns at once
+            self.token.on_cancel(lambda: abort_response(response))
+            self.token.raise_if_cancelled()
             response.raise_for_status()
             
             total_size = int(response.headers.get('content-length', 0))
             downloaded_size = 0
             
-            self.progress.emit(0, f"Downloading... (0%)")
+            publish_progress(self.url, 0, f"Downloading... (0%)")
             
-            with open(self.file_path, 'wb') as file:
+            bandwidth = get_bandwidth()
+            with get_metrics().stage("download"), bandwidth.transfer(self.traffic_class), open(self.file_path, 'wb') as file:
                 for chunk in response.iter_content(chunk_size=8192):
-                    if self._cancelled:
-                        logging.info("Download cancelled by user")
-                        if os.path.exists(self.file_path):
-                            os.remove(self.file_path)
-                        return
+                    self.token.raise_if_cancelled()
                     
                     if chunk:
                         file.write(chunk)
                         downloaded_size += len(chunk)
+                        bandwidth.throttle(self.traffic_class, len(chunk), self.token)
                         
                         if total_size > 0:
                             percent = (downloaded_size / total_size) * 100
@@ -205,14 +286,18 @@ class DirectDownloadThread(QThread):
                             mb_total = total_size / (1024 * 1024)
                             
                             status = f"Downloading... {percent:.1f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB)"
-                            self.progress.emit(percent, status)
+                            publish_progress(self.url, percent, status)
                         else:
                             status = f"Downloading... {downloaded_size / (1024 * 1024):.1f} MB"
-                            self.progress.emit(0, status)
+                            publish_progress(self.url, 0, status)
             
+            # An aborted socket can also end the body early without an error
+            self.token.raise_if_cancelled()
+            get_metrics().inc("bytes_downloaded_total", downloaded_size)
+
             # Verify download
             if os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0:
-                self.progress.emit(100, "Download completed!")
+                publish_progress(self.url, 100, "Download completed!")
                 logging.info(f"Direct download completed successfully: {self.file_path}")
                 self.done.emit(self.file_path)
             else:
@@ -221,35 +306,32 @@ class DirectDownloadThread(QThread):
                 self.error.emit(error_msg)
                 
         except Exception as e:
-            error_msg = f"Direct download failed: {str(e)}"
-            logging.error(error_msg, exc_info=True)
-            
             # Clean up partial download
             if os.path.exists(self.file_path):
                 try:
                     os.remove(self.file_path)
                 except:
                     pass
-                    
-            self.error.emit(error_msg)
 
-    def cancel(self):
-        """Cancel the download"""
-        self._cancelled = True
-        logging.info("Download cancellation requested")
+            if self.token.cancelled:
+                # A response closed mid-read surfaces as a connection error
+                raise OperationCancelled() from e
+            error_msg = f"Direct download failed: {str(e)}"
+            logging.error(error_msg, exc_info=True)
+            self.error.emit(error_msg)
 
 
-class ImageDownloadThread(QThread):
-    progress = Signal(float, str)   # percent, status message
+class ImageDownloadThread(BackgroundTask):
     done = Signal(str)              # path to downloaded file
     error = Signal(str)
 
-    def __init__(self, url: str, download_path: str = None, parent=None):
+    def __init__(self, url: str, download_path: str = None, traffic_class: str = "interactive", parent=None):
         logging.info(f"Initializing ImageDownloadThread for URL: {url}")
         super().__init__(parent)
         self.url = url
         self.download_path = download_path
-        self._cancelled = False
+        self.traffic_class = traffic_class
+        self.lane = lane_for(traffic_class)
 
     def run(self):
         try:
@@ -257,7 +339,7 @@ class ImageDownloadThread(QThread):
             from urllib.parse import urlparse
             logging.info(f"Starting image download: {self.url}")
             
-            self.progress.emit(0, "Connecting to image source...")
+            publish_progress(self.url, 0, "Connecting to image source...")
             
             # Determine download path
             if self.download_path:
@@ -278,36 +360,40 @@ class ImageDownloadThread(QThread):
             
             # Stream download with progress
             response = requests.get(self.url, stream=True, timeout=30)
+            self.token.on_cancel(lambda: abort_response(response))
+            self.token.raise_if_cancelled()
             response.raise_for_status()
             
             total_size = int(response.headers.get('content-length', 0))
             downloaded_size = 0
             
-            self.progress.emit(0, f"Downloading image... (0%)")
+            publish_progress(self.url, 0, f"Downloading image... (0%)")
             
-            with open(download_path, 'wb') as file:
+            bandwidth = get_bandwidth()
+            with get_metrics().stage("download"), bandwidth.transfer(self.traffic_class), open(download_path, 'wb') as file:
                 for chunk in response.iter_content(chunk_size=8192):
-                    if self._cancelled:
-                        logging.info("Image download cancelled by user")
-                        if os.path.exists(download_path):
-                            os.remove(download_path)
-                        return
+                    self.token.raise_if_cancelled()
                     
                     if chunk:
                         file.write(chunk)
                         downloaded_size += len(chunk)
+                        bandwidth.throttle(self.traffic_class, len(chunk), self.token)
                         
                         if total_size > 0:
                             percent = (downloaded_size / total_size) * 100
                             status = f"Downloading image... {percent:.1f}%"
-                            self.progress.emit(percent, status)
+                            publish_progress(self.url, percent, status)
                         else:
                             status = f"Downloading image... {downloaded_size / 1024:.1f} KB"
-                            self.progress.emit(0, status)
+                            publish_progress(self.url, 0, status)
             
+            # An aborted socket can also end the body early without an error
+            self.token.raise_if_cancelled()
+            get_metrics().inc("bytes_downloaded_total", downloaded_size)
+
             # Verify download
             if os.path.exists(download_path) and os.path.getsize(download_path) > 0:
-                self.progress.emit(100, "Image download completed!")
+                publish_progress(self.url, 100, "Image download completed!")
                 logging.info(f"Image download completed successfully: {download_path}")
                 self.done.emit(str(download_path))
             else:
@@ -316,16 +402,17 @@ class ImageDownloadThread(QThread):
                 self.error.emit(error_msg)
                 
         except Exception as e:
-            error_msg = f"Image download failed: {str(e)}"
-            logging.error(error_msg, exc_info=True)
-            
             # Clean up partial download
             if 'download_path' in locals() and os.path.exists(download_path):
                 try:
                     os.remove(download_path)
                 except:
                     pass
-                    
+
+            if self.token.cancelled:
+                raise OperationCancelled() from e
+            error_msg = f"Image download failed: {str(e)}"
+            logging.error(error_msg, exc_info=True)
             self.error.emit(error_msg)
 
     def _get_safe_filename(self, filename):
@@ -335,7 +422,3 @@ class ImageDownloadThread(QThread):
             filename = filename.replace(char, '_')
         return filename
 
-    def cancel(self):
-        """Cancel the download"""
-        self._cancelled = True
-        logging.info("Image download cancellation requested")
@@ -0,0 +1,300 @@
+import os
+import json
+import heapq
+import itertools
+import logging
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from core.download_manager import DirectDownloadThread, ImageDownloadThread
+from utils.path_utils import CACHE_DIR
+from utils.metrics import get_metrics
+from core.event_bus import get_event_bus
+
+
+QUEUE_FILE = CACHE_DIR / "downloads.json"
+QUEUE_VERSION = 1
+
+# Lower runs first; the name doubles as the bandwidth traffic class
+PRIORITIES = {"interactive": 0, "prefetch": 1, "sync": 2}
+DOWNLOAD_KINDS = {"image": ImageDownloadThread, "direct": DirectDownloadThread}
+
+
+class DownloadJob:
+    """One transfer and everyone waiting for it"""
+
+    def __init__(self, url: str, dest: str, kind: str = "image", priority: str = "interactive"):
+        self.url = url
+        self.dest = str(dest) if dest else None     # None: image name taken from the URL
+        self.kind = kind
+        self.priority = priority
+        self.state = "queued"           # queued / running / paused / done / failed
+        self.thread = None
+        self.waiters = []               # (on_done, on_error, on_progress)
+
+    @property
+    def key(self) -> tuple:
+        return self.url, self.dest
+
+    def as_dict(self) -> dict:
+        return {"url": self.url, "dest": self.dest, "kind": self.kind, "priority": self.priority}
+
+
+class DownloadQueue(QObject):
+    """
+    The one place downloads are started from.
+
+    Jobs wait in a priority queue and at most `max_concurrent` run at a time.
+    Asking for a URL that is already queued or running to the same destination
+    does not start a second transfer: the caller is attached to the existing
+    job and notified with everyone else. A different destination is a job of
+    its own, so each caller gets the file where it asked for it. Pending jobs
+    are written to disk, so a restart picks them up again. pause() stops new
+    starts and puts running jobs back in the queue.
+
+    Must be used from the GUI thread; callbacks run there too.
+    """
+
+    changed = Signal(int, int)      # running, queued
+
+    def __init__(self, max_concurrent: int = 2, path: Path = QUEUE_FILE, parent=None):
+        super().__init__(parent)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.path = Path(path)
+        self.paused = False
+        self._jobs: dict[tuple, DownloadJob] = {}    # (url, dest) -> queued or running job
+        self._heap = []                             # (priority, seq, (url, dest))
+        self._seq = itertools.count()
+        self._running: set[tuple] = set()
+        # Transfers report progress on the event bus, already batched per frame
+        get_event_bus().subscribe("progress", self._on_bus_progress)
+
+    # -------------------------------------------------------------------
+    # PUBLIC
+    # -------------------------------------------------------------------
+    def enqueue(self, url: str, dest, kind: str = "image", priority: str = "interactive",
+                on_done=None, on_error=None, on_progress=None) -> DownloadJob:
+        if kind not in DOWNLOAD_KINDS:
+            raise ValueError(f"Unknown download kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown download priority: {priority}")
+
+        job = self._jobs.get((url, str(dest) if dest else None))
+        if job is not None:
+            logging.info(f"Download already in flight, sharing it: {url}")
+            get_metrics().inc("downloads_coalesced_total")
+            # A user now waiting for a background job makes it urgent
+            if PRIORITIES[priority] < PRIORITIES[job.priority] and job.state == "queued":
+                job.priority = priority
+                heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), job.key))
+        else:
+            job = DownloadJob(url, dest, kind, priority)
+            self._jobs[job.key] = job
+            heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), job.key))
+            self._save()
+
+        job.waiters.append((on_done, on_error, on_progress))
+        self._pump()
+        return job
+
+    def set_max_concurrent(self, value: int):
+        self.max_concurrent = max(1, int(value))
+        self._pump()
+
+    def pause(self):
+        """Stop starting jobs and put running ones back in the queue"""
+        self.paused = True
+        for key in list(self._running):
+            job = self._jobs.get(key)
+            if job is None:
+                continue            # cancelled, its thread is already stopping
+            job.state = "paused"
+            # The thread deletes its partial file; once it has stopped the job is re-queued
+            job.thread.cancel()
+        self._emit_changed()
+
+    def resume(self):
+        self.paused = False
+        self._pump()
+
+    def cancel(self, url: str, reason: str = "Download cancelled"):
+        """Stop every job for `url` for everyone waiting for it; each of them hears it through on_error"""
+        for job in self._jobs_for(url):
+            self._cancel_job(job, reason)
+
+    def _cancel_job(self, job: DownloadJob, reason: str):
+        del self._jobs[job.key]
+        if job.thread is not None and job.state == "running":
+            job.thread.cancel()
+        job.state = "failed"
+        # Taken off the job, so the stopping thread's own error reaches nobody twice
+        waiters, job.waiters = job.waiters, []
+        self._save()
+        self._emit_changed()
+        for _, on_error, _ in waiters:
+            if on_error:
+                on_error(reason)
+
+    def detach(self, url: str, on_done) -> bool:
+        """
+        Drop one caller's interest in a job: the waiter registered with `on_done`.
+        The transfer is only cancelled when nobody else waits for it (a shared
+        job may also feed the shuffle pool). Returns True when it was cancelled.
+        """
+        for job in self._jobs_for(url):
+            waiters = [waiter for waiter in job.waiters if waiter[0] is not on_done]
+            if len(waiters) == len(job.waiters):
+                continue            # another destination, not this caller's job
+            job.waiters = waiters
+            if job.waiters:
+                return False
+            self._cancel_job(job, "Download cancelled")
+            return True
+        return False
+
+    def is_pending(self, url: str) -> bool:
+        return bool(self._jobs_for(url))
+
+    def _jobs_for(self, url: str) -> list[DownloadJob]:
+        return [job for job in self._jobs.values() if job.url == url]
+
+    def counts(self) -> tuple[int, int]:
+        running = len(self._running)
+        return running, len(self._jobs) - running
+
+    # -------------------------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------------------------
+    def restore(self) -> int:
+        """Re-queue the jobs a previous session left unfinished"""
+        if not self.path.exists():
+            return 0
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Download queue unreadable, starting empty: {e}")
+            return 0
+        if data.get("version") != QUEUE_VERSION:
+            return 0
+
+        restored = 0
+        for item in data.get("jobs", []):
+            dest = item.get("dest")
+            if (item.get("url"), dest) in self._jobs or (dest and Path(dest).exists()):
+                continue
+            try:
+                self.enqueue(item["url"], dest, item.get("kind", "image"), item.get("priority", "prefetch"))
+                restored += 1
+            except (KeyError, ValueError) as e:
+                logging.warning(f"Skipping bad download queue entry {item}: {e}")
+        if restored:
+            logging.info(f"Restored {restored} unfinished download(s)")
+        return restored
+
+    def _save(self):
+        payload = json.dumps({"version": QUEUE_VERSION,
+                              "jobs": [job.as_dict() for job in self._jobs.values()]})
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save download queue: {e}")
+
+    def shutdown(self):
+        """Stop running transfers; they stay in the saved queue for next time"""
+        self._save()
+        self.paused = True
+        for key in list(self._running):
+            job = self._jobs.get(key)
+            if job is not None and job.thread is not None:
+                job.thread.cancel()
+                job.thread.wait(3000)
+
+    # -------------------------------------------------------------------
+    # SCHEDULING
+    # -------------------------------------------------------------------
+    def _pump(self):
+        while not self.paused and len(self._running) < self.max_concurrent and self._heap:
+            _, _, key = heapq.heappop(self._heap)
+            job = self._jobs.get(key)
+            # Stale heap entry: cancelled, already running, or re-pushed with a new priority
+            if job is None or job.state != "queued":
+                continue
+            self._start(job)
+        self._emit_changed()
+
+    def _start(self, job: DownloadJob):
+        job.state = "running"
+        self._running.add(job.key)
+        thread = DOWNLOAD_KINDS[job.kind](job.url, job.dest, traffic_class=job.priority, parent=self)
+        thread.done.connect(lambda path, job=job: self._on_done(job, path))
+        thread.error.connect(lambda msg, job=job: self._on_error(job, msg))
+        thread.finished.connect(lambda job=job, thread=thread: self._on_finished(job, thread))
+        job.thread = thread
+        logging.info(f"Download started ({job.priority}): {job.url}")
+        thread.start()
+
+    def _on_bus_progress(self, event):
+        if event.source != "download":
+            return
+        # Keyed by URL: every destination of it hears the progress
+        for job in self._jobs_for(event.key):
+            if job.state == "running":
+                self._on_progress(job, event.payload["percent"], event.payload["text"])
+
+    def _on_progress(self, job: DownloadJob, percent: float, status: str):
+        for _, _, on_progress in job.waiters:
+            if on_progress:
+                on_progress(percent, status)
+
+    def _on_done(self, job: DownloadJob, path: str):
+        job.state = "done"
+        self._complete(job)
+        for on_done, _, _ in job.waiters:
+            if on_done:
+                on_done(path)
+
+    def _on_error(self, job: DownloadJob, message: str):
+        job.state = "failed"
+        self._complete(job)
+        for _, on_error, _ in job.waiters:
+            if on_error:
+                on_error(message)
+
+    def _complete(self, job: DownloadJob):
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        self._save()
+
+    def _on_finished(self, job: DownloadJob, thread):
+        self._running.discard(job.key)
+        job.thread = None
+        thread.deleteLater()
+        if job.state == "paused" or (job.state == "running" and self.paused):
+            # Stopped by pause() or shutdown: try again later
+            job.state = "queued"
+            heapq.heappush(self._heap, (PRIORITIES[job.priority], next(self._seq), job.key))
+        elif job.state == "running":
+            # Ended without done or error (an unexpected exception in the thread):
+            # fail it, re-queuing would retry it forever
+            logging.error(f"Download ended without a result: {job.url}")
+            self._on_error(job, "Download failed unexpectedly")
+        self._pump()
+
+    def _emit_changed(self):
+        running, queued = self.counts()
+        get_metrics().set_gauge("downloads_running", running)
+        get_metrics().set_gauge("downloads_queued", queued)
+        self.changed.emit(running, queued)
+
+
+_queue_instance: DownloadQueue | None = None
+
+def get_download_queue() -> DownloadQueue:
+    global _queue_instance
+    if _queue_instance is None:
+        _queue_instance = DownloadQueue()
+    return _queue_instance
@@ -0,0 +1,177 @@
+import time
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from utils.metrics import get_metrics
+
+
+# Event type -> (mailbox policy, capacity)
+#   latest = only the newest event per (source, key) matters (status lines, progress bars)
+#   queue  = every event matters, oldest dropped when the mailbox is full
+EVENT_TYPES = {
+    "status":        ("latest", 64),
+    "progress":      ("latest", 256),
+    "applied":       ("queue", 16),
+    "error":         ("queue", 32),
+    "wallpaper_due": ("latest", 4),
+}
+
+# One frame: fast enough to feel immediate, slow enough to batch a flood
+FLUSH_MS = 16
+
+
+class Event:
+    __slots__ = ("type", "payload", "source", "key", "seq", "created")
+
+    def __init__(self, type: str, payload, source: str, key, seq: int):
+        self.type = type
+        self.payload = payload
+        self.source = source
+        self.key = key
+        self.seq = seq
+        self.created = time.perf_counter()
+
+    def __repr__(self):
+        return f"Event({self.type}, source={self.source}, key={self.key}, payload={self.payload!r})"
+
+
+class Mailbox:
+    """Bounded store for the undelivered events of one type (not thread-safe, the bus locks)"""
+
+    def __init__(self, policy: str, capacity: int):
+        self.policy = policy
+        self.capacity = capacity
+        self._items = OrderedDict() if policy == "latest" else deque()
+
+    def put(self, event: Event) -> str | None:
+        """Store an event; returns "coalesced" or "dropped" when an older one was lost"""
+        lost = None
+        if self.policy == "latest":
+            slot = (event.source, event.key)
+            if self._items.pop(slot, None) is not None:
+                lost = "coalesced"
+            self._items[slot] = event
+        else:
+            self._items.append(event)
+
+        if len(self._items) > self.capacity:
+            if self.policy == "latest":
+                self._items.popitem(last=False)
+            else:
+                self._items.popleft()
+            lost = "dropped"
+        return lost
+
+    def drain(self) -> list[Event]:
+        events = list(self._items.values()) if self.policy == "latest" else list(self._items)
+        self._items.clear()
+        return events
+
+    def __len__(self):
+        return len(self._items)
+
+
+class EventBus(QObject):
+    """
+    Carries worker-to-UI events (status, progress, applied, error...) onto the
+    GUI thread.
+
+    publish() may be called from any thread and never blocks on the GUI: the
+    event lands in its type's bounded mailbox and at most one wake-up per batch
+    is posted to the GUI thread. Every FLUSH_MS the mailboxes are drained and
+    the events handed to subscribers in publish order. Status and progress
+    keep only the newest event per source, so a downloader reporting every
+    chunk costs one update per frame.
+
+    Subscribers run on the GUI thread and may touch widgets. The bus itself
+    must be created on the GUI thread (the main window does so first thing).
+    """
+
+    _wake = Signal()
+
+    def __init__(self, flush_ms: int = FLUSH_MS, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._mailboxes = {t: Mailbox(policy, capacity) for t, (policy, capacity) in EVENT_TYPES.items()}
+        self._subscribers = {t: [] for t in EVENT_TYPES}
+        self._scheduled = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(flush_ms)
+        self.timer.timeout.connect(self.flush)
+        # Queued when published from a worker: the timer is only touched on the GUI thread
+        self._wake.connect(self.timer.start)
+
+    # -------------------------------------------------------------------
+    # PUBLIC
+    # -------------------------------------------------------------------
+    def subscribe(self, type: str, handler):
+        """Call handler(event) on the GUI thread for every delivered event of this type"""
+        self._check_type(type)
+        self._subscribers[type].append(handler)
+
+    def unsubscribe(self, type: str, handler):
+        if handler in self._subscribers.get(type, []):
+            self._subscribers[type].remove(handler)
+
+    def publish(self, type: str, payload=None, source: str = "app", key=None):
+        self._check_type(type)
+        with self._lock:
+            event = Event(type, payload, source, key, next(self._seq))
+            lost = self._mailboxes[type].put(event)
+            wake = not self._scheduled
+            self._scheduled = True
+
+        metrics = get_metrics()
+        metrics.inc("events_published_total")
+        if lost:
+            metrics.inc(f"events_{lost}_total")
+        if wake:
+            self._wake.emit()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(mailbox) for mailbox in self._mailboxes.values())
+
+    def flush(self):
+        """Deliver everything waiting (GUI thread)"""
+        with self._lock:
+            batch = [event for mailbox in self._mailboxes.values() for event in mailbox.drain()]
+            self._scheduled = False
+        if not batch:
+            return
+
+        batch.sort(key=lambda event: event.seq)
+        now = time.perf_counter()
+        for event in batch:
+            for handler in list(self._subscribers[event.type]):
+                try:
+                    handler(event)
+                except Exception as e:
+                    logging.error(f"Event handler failed for {event}: {e}", exc_info=True)
+
+        metrics = get_metrics()
+        metrics.inc("events_delivered_total", len(batch))
+        metrics.set_gauge("event_bus_batch_size", len(batch))
+        # The oldest event of the batch waited the longest
+        metrics.observe("event_bus_latency", now - batch[0].created)
+
+    @staticmethod
+    def _check_type(type: str):
+        if type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {type}")
+
+
+_bus_instance: EventBus | None = None
+
+def get_event_bus() -> EventBus:
+    global _bus_instance
+    if _bus_instance is None:
+        _bus_instance = EventBus()
+    return _bus_instance
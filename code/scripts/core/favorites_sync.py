@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import uuid
+import logging
+import mimetypes
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from PySide6.QtCore import Signal
+
+from utils.path_utils import FAVS_DIR
+from utils.catalog import get_catalog
+from utils.media_probe import probe_media
+from utils.metrics import get_metrics
+from utils.bandwidth import get_bandwidth
+from core.event_bus import get_event_bus
+from core.task_executor import BackgroundTask
+from utils.cancellation import OperationCancelled, abort_response
+
+
+# Dot-file: the collection index never lists it as a wallpaper
+MANIFEST_NAME = ".favorites.json"
+MANIFEST_VERSION = 1
+CHUNK_SIZE = 256 * 1024
+
+# Left in the favorites folder by versions that streamed favorites instead of mirroring them
+LEGACY_FILES = ("current_wallpaper.jpg",)
+
+# Probed format (Pillow format / ffprobe format_name) -> extension of the mirrored file
+FORMAT_SUFFIXES = {
+    "jpeg": ".jpg", "mpo": ".jpg", "png": ".png", "webp": ".webp", "gif": ".gif", "bmp": ".bmp",
+    "mov,mp4,m4a,3gp,3g2,mj2": ".mp4", "avi": ".avi",
+}
+WEBM_CODECS = ("vp8", "vp9", "av1")
+MIRROR_SUFFIXES = set(FORMAT_SUFFIXES.values()) | {".jpeg", ".webm", ".mkv"}
+
+
+class FavoritesManifest:
+    """
+    What the local favorites mirror holds: wallpaper id -> {url, file}, plus the
+    validators (ETag / Last-Modified) of the last favorites list we downloaded.
+    """
+
+    def __init__(self, folder: Path):
+        self.path = Path(folder) / MANIFEST_NAME
+        self.items: dict[str, dict] = {}
+        self.etag = None
+        self.last_modified = None
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Favorites manifest unreadable, starting empty: {e}")
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.items = data.get("items", {})
+        self.etag = data.get("etag")
+        self.last_modified = data.get("last_modified")
+
+    def save(self):
+        payload = json.dumps({
+            "version": MANIFEST_VERSION,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "items": self.items,
+        })
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save favorites manifest: {e}")
+
+    def local_path(self, wall_id: str) -> Path | None:
+        item = self.items.get(wall_id)
+        return self.path.parent / item["file"] if item and item.get("file") else None
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart, shared by all workers"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self, cancelled: threading.Event = None):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        delay = start - time.monotonic()
+        if delay > 0:
+            if cancelled is not None:
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+def parse_favorites(data: dict) -> dict[str, str]:
+    """Favorites API payload -> {wallpaper id: image url}, in server order"""
+    walls = data.get("wall") or {}
+    if isinstance(walls, list):
+        walls = {str(i): meta for i, meta in enumerate(walls)}
+    return {str(wall_id): meta["url"] for wall_id, meta in walls.items()
+            if isinstance(meta, dict) and meta.get("url")}
+
+
+def mirror_name(wall_id: str, info: dict, content_type: str = None) -> str:
+    """
+    File name for a mirrored favorite. The extension comes from what was
+    downloaded (probed format, else Content-Type, else .jpg), never from the
+    URL: "show.php?id=1" would otherwise become "1.php", which the collection
+    filters never pick.
+    """
+    fmt = (info.get("format") or "").lower()
+    suffix = FORMAT_SUFFIXES.get(fmt)
+    if suffix is None and fmt.startswith("matroska"):
+        suffix = ".webm" if info.get("codec") in WEBM_CODECS else ".mkv"
+    if suffix is None and content_type:
+        suffix = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if suffix not in MIRROR_SUFFIXES:
+            suffix = None
+    return f"{wall_id}{suffix or '.jpg'}"
+
+
+class FavoritesSync(BackgroundTask):
+    """
+    Incremental mirror of the account's favorites into FAVS_DIR.
+
+    The favorites list is fetched with a conditional GET, so an unchanged list
+    costs a single 304. Otherwise it is diffed against the local manifest: only
+    new (or locally missing) wallpapers are downloaded, by a small pool of
+    workers sharing one rate limit; wallpapers removed from the account are
+    removed from the mirror. Each file is written atomically and probed before
+    it becomes visible, so the mirror never holds half a download.
+    """
+
+    # Status, progress and errors go over the event bus (source "favorites")
+    synced = Signal(dict)           # summary
+
+    lane = "maintenance"
+
+    def __init__(self, api_url: str, dest_folder: Path = FAVS_DIR, max_workers: int = 3,
+                 rate_per_second: float = 4.0, parent=None):
+        super().__init__(parent)
+        self.api_url = api_url
+        self.dest_folder = Path(dest_folder)
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_per_second)
+        self.bandwidth = get_bandwidth()
+        self.catalog = get_catalog()
+        self.events = get_event_bus()
+
+        self.session = requests.Session()
+        # One pooled connection per worker, the API and images share a host
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self.stats = {"listed": 0, "added": 0, "removed": 0, "failed": 0,
+                      "bytes": 0, "not_modified": False, "seconds": 0.0}
+
+    def _status(self, message: str):
+        self.events.publish("status", message, source="favorites")
+
+    # -------------------------------------------------------------------
+    # MAIN
+    # -------------------------------------------------------------------
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            self.dest_folder.mkdir(parents=True, exist_ok=True)
+            manifest = FavoritesManifest(self.dest_folder)
+            # A metered link only pays for the first mirror, never for refreshes
+            if manifest.items and not self.bandwidth.allow_background():
+                logging.info("Metered connection, favorites sync postponed")
+                self._status("Metered connection: favorites sync postponed")
+                return
+            for name in LEGACY_FILES:
+                (self.dest_folder / name).unlink(missing_ok=True)
+            remote, validators = self._fetch_list(manifest)
+
+            if remote is None:
+                # 304: the list is unchanged, only repair files deleted locally
+                remote = {wall_id: item["url"] for wall_id, item in manifest.items.items()}
+            else:
+                self._remove_unfavorited(manifest, remote)
+
+            self.stats["listed"] = len(remote)
+            pending = deque(
+                (wall_id, url) for wall_id, url in remote.items()
+                if not self._is_mirrored(manifest, wall_id, url)
+            )
+            wanted = list(pending)
+            if pending:
+                self._status(f"Syncing {len(pending)} favorite wallpaper(s)...")
+                self._download_all(manifest, pending)
+
+            # Remember the new list only once all of it is mirrored: a 304 next time
+            # would otherwise hide the favorites that failed or were cancelled
+            if validators is not None and all(self._is_mirrored(manifest, w, u) for w, u in wanted):
+                manifest.etag, manifest.last_modified = validators
+            manifest.save()
+            self.catalog.save()
+        except Exception as e:
+            logging.error(f"Favorites sync failed: {e}", exc_info=True)
+            self.events.publish("error", {"title": "Favorites", "text": f"Favorites sync failed: {e}", "notify": False},
+                                source="favorites")
+        finally:
+            self.stats["seconds"] = time.perf_counter() - t0
+            metrics = get_metrics()
+            metrics.inc("favorites_downloaded_total", self.stats["added"])
+            metrics.inc("favorites_bytes_total", self.stats["bytes"])
+            metrics.observe("favorites_sync", self.stats["seconds"])
+            logging.info(f"Favorites sync finished: {self.stats}")
+            self.synced.emit(dict(self.stats))
+
+    def _fetch_list(self, manifest: FavoritesManifest) -> tuple[dict[str, str] | None, tuple | None]:
+        """
+        The favorites as {id: url} (None when the server says nothing changed)
+        and the list's (ETag, Last-Modified), which the caller stores
+        """
+        headers = {}
+        if manifest.etag:
+            headers["If-None-Match"] = manifest.etag
+        if manifest.last_modified:
+            headers["If-Modified-Since"] = manifest.last_modified
+
+        r = self.session.get(self.api_url, headers=headers, timeout=10)
+        if r.status_code == 304:
+            logging.debug("Favorites list not modified")
+            self.stats["not_modified"] = True
+            return None, None
+        r.raise_for_status()
+
+        remote = parse_favorites(r.json())
+        if not remote:
+            self._status("Can't find any image from your favourite collection")
+        return remote, (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+    def _is_mirrored(self, manifest: FavoritesManifest, wall_id: str, url: str) -> bool:
+        item = manifest.items.get(wall_id)
+        if not item or item.get("url") != url:
+            return False
+        path = manifest.local_path(wall_id)
+        # Mirrors named after their URL ("1.php") are fetched again under a usable name
+        return path is not None and path.suffix.lower() in MIRROR_SUFFIXES and path.exists()
+
+    def _remove_unfavorited(self, manifest: FavoritesManifest, remote: dict):
+        for wall_id in [w for w in manifest.items if w not in remote]:
+            path = manifest.local_path(wall_id)
+            if path is not None:
+                path.unlink(missing_ok=True)
+                self.catalog.remove(path)
+            del manifest.items[wall_id]
+            self.stats["removed"] += 1
+
+    # -------------------------------------------------------------------
+    # DOWNLOAD
+    # -------------------------------------------------------------------
+    def _download_all(self, manifest: FavoritesManifest, pending: deque):
+        total, done = len(pending), 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="favs") as pool:
+            futures = []
+            while pending and not self.token.cancelled:
+                wall_id, url = pending.popleft()
+                futures.append((wall_id, url, pool.submit(self._download_one, wall_id, url)))
+
+            for wall_id, url, future in futures:
+                try:
+                    name = future.result()
+                except OperationCancelled:
+                    continue
+                except Exception as e:
+                    logging.warning(f"Favorite {wall_id} not downloaded: {e}")
+                    self.stats["failed"] += 1
+                    continue
+                if name:
+                    old = manifest.local_path(wall_id)
+                    if old is not None and old.name != name:
+                        old.unlink(missing_ok=True)
+                        self.catalog.remove(old)
+                    manifest.items[wall_id] = {"url": url, "file": name}
+                    self.stats["added"] += 1
+                done += 1
+                self.events.publish("progress", {"text": f"Syncing favorites {done}/{total}", "done": done, "total": total},
+                                    source="favorites")
+
+    def _download_one(self, wall_id: str, url: str) -> str | None:
+        if self.token.cancelled:
+            return None
+        self.limiter.wait(self.token)
+
+        tmp = self.dest_folder / f".fav-{uuid.uuid4().hex}.tmp"
+        try:
+            with self.bandwidth.transfer("sync"), self.session.get(url, timeout=15, stream=True) as r:
+                # Cancelling shuts the socket down, a blocked read returns at once
+                release = self.token.on_cancel(lambda: abort_response(r))
+                try:
+                    r.raise_for_status()
+                    content_type = r.headers.get("Content-Type")
+                    size = 0
+                    with open(tmp, "wb") as f:
+                        for chunk in r.iter_content(CHUNK_SIZE):
+                            self.token.raise_if_cancelled()
+                            f.write(chunk)
+                            size += len(chunk)
+                            # Yields to interactive downloads and the sync class limit
+                            self.bandwidth.throttle("sync", len(chunk), self.token)
+                    # An aborted socket can also end the body early without an error
+                    self.token.raise_if_cancelled()
+                except Exception as e:
+                    if self.token.cancelled:
+                        raise OperationCancelled() from e
+                    raise
+                finally:
+                    release()
+
+            info = probe_media(tmp)
+            if not info["ok"]:
+                raise ValueError(info["error"])
+
+            name = mirror_name(wall_id, info, content_type)
+            dest = self.dest_folder / name
+            os.replace(tmp, dest)
+            self.catalog.update(dest, media=info)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self.stats["bytes"] += size
+        return name
@@ -1,8 +1,9 @@
 import json
 import requests
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Signal
 import logging
 import urllib.parse
+from core.task_executor import BackgroundTask
 
 
 '''
@@ -22,8 +23,10 @@ expires_at (optional)
 
 '''
 
-class LoginWorker(QThread):
-    """Runs a login API request in a background thread (non-blocking)."""
+class LoginWorker(BackgroundTask):
+    """Runs a login API request on the shared executor (non-blocking)."""
+
+    lane = "interactive"
 
     success = Signal(dict)      # Emits parsed JSON
     failed = Signal(str)        # Emits error message
@@ -103,7 +106,9 @@ class LoginWorker(QThread):
 
 
 
-class TokenValidateThread(QThread):
+class TokenValidateThread(BackgroundTask):
+    lane = "maintenance"
+
     valid = Signal()
     invalid = Signal(str)
 
@@ -1,4 +1,3 @@
-import time
 import random
 import logging
 from pathlib import Path
@@ -6,24 +5,53 @@ from threading import Thread, Event
 from typing import Optional, Callable
 from utils.singletons import get_config
 from utils.path_utils import FAVS_DIR,SAVES_DIR
-import requests
 import logging
 from typing import List, Optional
-from PySide6.QtCore import QThread, Signal, Slot
-import requests
-import time
-from collections import deque
 from utils.validators import MY_COLLECTION_MODE,FAVOURITE_MODE
+from utils.metrics import get_metrics
+from core.collection_index import get_collection_index
+from utils.catalog import get_catalog
+from utils.display_layout import get_display_layout
+from core.event_bus import get_event_bus
+
+
+# any    = every file is a candidate
+# prefer = pick from files matching the display layout, fall back to any file
+# strict = only files matching the display layout
+SELECTION_POLICIES = ("any", "prefer", "strict")
+
+# A file matches when it needs at most this much upscaling, is not more than
+# MAX_OVERSIZE times larger than needed and its aspect ratio is close enough
+MAX_UPSCALE = 1.1
+MAX_OVERSIZE = 2.0
+MAX_ASPECT_DIFF = 0.2
+
+
+def resolution_matches(media: dict | None, target: tuple[int, int]) -> bool:
+    """Does a probed file suit a display of `target` size (device pixels)?"""
+    if not media or not media.get("ok") or not media.get("width") or not media.get("height"):
+        return False
+    width, height = media["width"], media["height"]
+    target_w, target_h = target
+
+    upscale = max(target_w / width, target_h / height)
+    oversize = min(width / target_w, height / target_h)
+    target_aspect = target_w / target_h
+    aspect_diff = abs(width / height - target_aspect) / target_aspect
+    return upscale <= MAX_UPSCALE and oversize <= MAX_OVERSIZE and aspect_diff <= MAX_ASPECT_DIFF
 
 
 
 
 class UnifiedWallpaperScheduler:
     """
-    One scheduler to rule both modes.
-    
-    offline = pick random local file
-    online  = use online API + ImagePrefetchThread queue
+    One scheduler to rule both sources.
+
+    Both pick a random local file: the collection, or the local mirror of the
+    account favorites (kept up to date in the background by FavoritesSync).
+
+    The loop runs on its own thread and never calls into the UI: picks are
+    published on the event bus as "wallpaper_due", problems as "status".
     """
 
     def __init__(self):
@@ -32,11 +60,11 @@ class UnifiedWallpaperScheduler:
         # common scheduler state
         self.interval_minutes = 30
         self.source = str(SAVES_DIR)
-        self.change_callback = None
-        self.status_callback = None
 
         self.config = get_config()
+        self.events = get_event_bus()
         self.stop_event = Event()
+        self.wake_event = Event()           # set by trigger() and stop(): ends the interval wait early
         self.last_wallpaper = None
 
         # thread states
@@ -44,12 +72,11 @@ class UnifiedWallpaperScheduler:
         self.is_running = False
         self.range_type=None
 
-        # online mode worker
-        self.online_worker = None
+        # favorites API, used by the background mirror sync
         self.api_url = None
 
-        # helper
-        self.first_serverd:bool = False
+        # resolution-matched selection
+        self.selection_policy = self.config.get_selection_policy()
 
         logging.info("UnifiedWallpaperScheduler initialized")
 
@@ -67,12 +94,9 @@ class UnifiedWallpaperScheduler:
 
 
     def set_api_url(self, api_url: str):
-        """Set API URL for online mode"""
+        """Set the favorites API URL the mirror is synced from"""
         self.api_url = api_url
 
-    def set_change_callback(self, callback):
-        self.change_callback = callback
-
     def set_range(self, range_type: str):
         logging.debug(f"Range change to {self.range_type} -> {range_type}")
         self.range_type = range_type
@@ -80,15 +104,6 @@ class UnifiedWallpaperScheduler:
     def get_range(self) ->str:
         return self.range_type
 
-    def get_queue_upadate(self,queue_lenght:int):
-        logging.debug("Queue lenght:" + str(queue_lenght))
-        if queue_lenght == 1 and not self.first_serverd:
-            logging.debug("First image serverd")
-            self.online_worker._serve_requested_image()
-            self.first_serverd = True
-
-    def handle_status(self,status:str):
-        self.set_status.emit(status)
     # -------------------------------------------------------------------
     # START / STOP
     # -------------------------------------------------------------------
@@ -106,19 +121,13 @@ class UnifiedWallpaperScheduler:
         self.source = source
         self.interval_minutes = interval_minutes
         self.stop_event.clear()
+        self.wake_event.clear()
         self.is_running = True
 
-        # online mode uses its own worker
+        # Favorites rotate from the local mirror, which may not exist before the first sync
         if self.source == str(FAVS_DIR):
-            if not self.api_url:
-                raise RuntimeError("API URL must be set before starting online mode")
-
-            # start online worker
-            self.online_worker = OnlineWallpaperScheduler(self.api_url)
-            self.online_worker.image_ready.connect(self._on_online_image_ready)
-            self.online_worker.queue_updated.connect(self.get_queue_upadate)
-            self.online_worker.setStatus.connect(lambda e: self.status_callback(e))
-            self.online_worker.start()
+            FAVS_DIR.mkdir(parents=True, exist_ok=True)
+        get_collection_index().watch(self.source)
 
         # main loop (handles timing)
         self.scheduler_thread = Thread(target=self._main_loop, daemon=True)
@@ -127,21 +136,21 @@ class UnifiedWallpaperScheduler:
     def stop(self):
         logging.info("Stopping Scheduler")
         self.is_running = False
-        self.first_serverd = False
         self.stop_event.set()
+        self.wake_event.set()
 
         # stop main scheduler
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             self.scheduler_thread.join(timeout=5)
 
-        # stop online worker
-        if self.online_worker:
-            self.online_worker.stop()
-            self.online_worker = None
-
     def is_active(self):
         return self.is_running
 
+    def trigger(self):
+        """Pick a wallpaper now, on the scheduler's own thread; the interval restarts from there"""
+        if self.is_running:
+            self.wake_event.set()
+
     # -------------------------------------------------------------------
     # MAIN LOOP
     # -------------------------------------------------------------------
@@ -153,33 +162,71 @@ class UnifiedWallpaperScheduler:
             if not self.is_running:
                 break
 
-            if self.source == str(SAVES_DIR):
-                self._run_offline_cycle()
-
-            elif self.source == str(FAVS_DIR):
-                # ask for image
-                if self.online_worker:
-                    self.online_worker.request_image()
+            if self.source in (str(SAVES_DIR), str(FAVS_DIR)):
+                try:
+                    self._run_offline_cycle()
+                except Exception as e:
+                    # A bad cycle must not end the rotation
+                    logging.error(f"Scheduler cycle failed: {e}", exc_info=True)
+                    self.events.publish("error", {"title": "Scheduler", "text": f"Wallpaper change failed: {e}",
+                                                  "notify": False}, source="scheduler")
 
-            self.stop_event.wait(self.interval_minutes * 60)
+            self.wake_event.wait(self.interval_minutes * 60)
+            self.wake_event.clear()
 
 
         logging.info("Unified scheduler loop ended")
 
     # -------------------------------------------------------------------
-    # OFFLINE WORKFLOW (unchanged from your original)
+    # LOCAL WORKFLOW (collection and favorites mirror)
     # -------------------------------------------------------------------
     def _run_offline_cycle(self):
         logging.debug("offline scheduler cycle ran")
-        wallpaper:Path = self._get_random_wallpaper()
+        with get_metrics().span("scheduler"):
+            wallpaper:Path = self._get_random_wallpaper()
 
-        if wallpaper and wallpaper != self.last_wallpaper:
-            self.last_wallpaper = wallpaper
-            if self.change_callback:
-                self.change_callback(file_path=wallpaper)
+            if wallpaper and wallpaper != self.last_wallpaper:
+                self.last_wallpaper = wallpaper
+                self.events.publish("wallpaper_due", wallpaper, source="scheduler")
 
     def _get_random_wallpaper(self):
         files = self._get_media_files()
+        with get_metrics().stage("select"):
+            return self._pick_random(self._filter_by_resolution(files))
+
+    def set_selection_policy(self, policy: str):
+        if policy not in SELECTION_POLICIES:
+            logging.warning(f"Unknown selection policy '{policy}', using 'any'")
+            policy = "any"
+        logging.debug(f"Selection policy change to {self.selection_policy} -> {policy}")
+        self.selection_policy = policy
+
+    def _filter_by_resolution(self, files):
+        """
+        Apply the selection policy using dimensions probed at ingest. Only the
+        in-memory catalog and the cached display layout are read: no I/O per pick.
+        """
+        if self.selection_policy == "any" or not files:
+            return files
+
+        # The largest display decides: it is the one a too-small image would hurt
+        largest = max(get_display_layout(), key=lambda d: d.width * d.height)
+        catalog = get_catalog()
+        matching = [
+            f for f in files
+            if resolution_matches((catalog.peek(f) or {}).get("media"), (largest.width, largest.height))
+        ]
+        logging.debug(f"{len(matching)}/{len(files)} files match {largest.width}x{largest.height}")
+
+        if matching or self.selection_policy == "strict":
+            if not matching:
+                logging.warning(f"No wallpapers match {largest.width}x{largest.height} (strict selection)")
+                self.events.publish("status", f"No wallpapers match {largest.width}x{largest.height}",
+                                    source="scheduler")
+            return matching
+        return files
+
+    def _pick_random(self, files):
         if not files:
             return None
 
@@ -187,7 +234,7 @@ class UnifiedWallpaperScheduler:
 
         # avoid same wallpaper twice
         if len(files) > 1 and selected == self.last_wallpaper:
-            return self._get_random_wallpaper()
+            return self._pick_random(files)
 
         return selected
 
@@ -212,134 +259,15 @@ class UnifiedWallpaperScheduler:
             logging.warning(f"Invali type found: {self.range_type}. Switching to all range")
             exts = self.config.get_all_valid_extensions()
 
+        index = get_collection_index()
         for f in folders:
+            # Watched folders are served from memory, no disk access
+            if index.is_watching(f):
+                files += index.files(f, exts)
+                continue
             if not f.exists():
                 continue
-            files += [x for x in f.iterdir() if x.is_file() and x.suffix.lower() in exts]
+            with get_metrics().stage("scan"):
+                files += [x for x in f.iterdir() if x.is_file() and x.suffix.lower() in exts]
 
         return files
-
-    # -------------------------------------------------------------------
-    # ONLINE WORKFLOW
-    # -------------------------------------------------------------------
-    @Slot(bytes)
-    def _on_online_image_ready(self, img_data:dict): # {"url": url, "data": img_bytes}
-        """Offline callback receives Path, online receives bytes."""
-        if self.change_callback:
-            self.change_callback(image_data=img_data)
-
-
-class OnlineWallpaperScheduler(QThread):
-    image_ready = Signal(dict)          # {"url": url, "data": img_bytes} emits raw image data (for QPixmap.loadFromData)
-    queue_updated = Signal(int)          # emits current queue size
-    setStatus = Signal(str)
-
-
-    def __init__(self, api_url: str, parent=None):
-        super().__init__(parent)
-        self.api_url = api_url
-        self.running = True
-        self.url_list = []               # list of pending URLs from JSON
-        self.queue = deque(maxlen=20)    # RAM-stored preloaded images
-        self.min_queue = 3               # keep at least 3 images ready
-        self.session = requests.Session()
-        self.wait_interval = 1.0         # seconds between checks
-        self.request_flag = False        # main app requests next image
-
-    # ---------------------------------------------------------
-    #               THREAD MAIN LOOP
-    # ---------------------------------------------------------
-    def run(self):
-        self._fetch_json_urls()  # fetch first-time URL list
-        # logging.info(self.url_list)
-
-        while self.running:
-            # 1) If user requested an image → serve it immediately
-            if self.request_flag:
-                self._serve_requested_image()
-                self.request_flag = False
-
-            # 2) If queue too small → download more images
-            if len(self.queue) < self.min_queue:
-                self._download_next_image()
-
-            # 3) If URL list is almost empty → fetch more from API
-            if len(self.url_list) < 3:
-                self._fetch_json_urls()
-                
-            time.sleep(self.wait_interval)
-
-    # ---------------------------------------------------------
-    #               PUBLIC: user requesting next image
-    # ---------------------------------------------------------
-    @Slot()
-    def request_image(self):
-        """Main app calls this to request next ready image."""
-        self.request_flag = True
-
-    # ---------------------------------------------------------
-    #               PRIVATE WORK METHODS
-    # ---------------------------------------------------------
-    def _serve_requested_image(self):
-        """Send one preloaded image to the UI."""
-        if not self.queue:
-            return  # No ready images → UI will request again
-
-        logging.info("Serving image from schedueler qeueu")
-        image_bytes:dict = self.queue.popleft()
-        self.image_ready.emit(image_bytes)
-        self.queue_updated.emit(len(self.queue))
-
-    def _download_next_image(self):
-        """Download next image from URL list and add to queue."""
-        logging.info("Downloading image to add in schedueler qeueu")
-        if not self.url_list:
-            return
-
-        url:str = self.url_list.pop(0)
-
-        try:
-            r = self.session.get(url, timeout=10, stream=True)
-            r.raise_for_status()
-            data:bytes = r.content
-            self.queue.append({"url": url, "data": data})
-            self.queue_updated.emit(len(self.queue))
-
-        except Exception as e:
-            # skip failed download → continue
-            logging.error(f"[ERROR] Failed to download {url}: {e}")
-
-    def _fetch_json_urls(self):
-        """Fetch new JSON and extend url_list."""
-        logging.info("Fetching images from api")
-        self.setStatus.emit("Fetching images...")
-
-        try:
-            r = self.session.get(self.api_url, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-
-            walls = data.get("wall", {})
-            for _id, meta in walls.items():
-                url = meta.get("url")
-                if not url:
-                    continue
-                self.url_list.append(url)
-            
-            if len(self.url_list) <= 0:
-                self.setStatus("Can't find any image from your favourite collection")
-
-        except Exception as e:
-            logging.error(f"[ERROR] Could not fetch JSON: {e}")
-
-    # ---------------------------------------------------------
-    #               CLEAN STOP
-    # ---------------------------------------------------------
-    def stop(self):
-        self.running = False
-        self.wait_interval = 0
-        self.quit()
-        self.wait()
-
-
-
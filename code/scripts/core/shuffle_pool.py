@@ -0,0 +1,240 @@
+import os
+import shutil
+import logging
+from collections import deque
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from core.shuffler import Shuffler
+from core.download_queue import get_download_queue
+from core.task_executor import get_task_executor
+from utils.path_utils import CACHE_DIR, SAVES_DIR
+from utils.media_probe import probe_media
+from utils.bandwidth import get_bandwidth
+from utils.display_layout import get_primary_display
+from utils.metrics import get_metrics
+
+
+POOL_DIR = CACHE_DIR / "shuffle"
+# Videos are large: keep fewer of them warm
+DEFAULT_POOL_SIZES = {"static": 3, "animated": 1}
+RETRY_MS = 60 * 1000
+
+
+def pool_folder_for(dest_folder: Path) -> Path:
+    """
+    Where warm files wait: the cache, unless the collection is on another
+    filesystem. Then next to the collection, so handing a file out is a
+    rename and never a copy of a large video on the click.
+    """
+    try:
+        if os.stat(CACHE_DIR).st_dev == os.stat(dest_folder).st_dev:
+            return POOL_DIR
+    except OSError:
+        return POOL_DIR
+    return Path(dest_folder).parent / ".shuffle"
+
+
+class ShufflePool(QObject):
+    """
+    Keeps a few shuffle candidates per type (static / animated) downloaded ahead
+    of time for the current screen size, so a shuffle click is applied at once.
+
+    take() hands out a pooled file (moved into the collection) and triggers a
+    refill. A refill asks the shuffle API for a URL on a Shuffler thread and
+    downloads it through the download queue at prefetch priority, so the GUI
+    thread never blocks and the user's own downloads go first. Every file is
+    probed on the task executor and only pooled once its result is back.
+    Refills are skipped on metered connections. Pooled files are named after
+    the screen size they were requested for; files for another size are dropped.
+
+    Lives on the GUI thread.
+    """
+
+    refilled = Signal(str, int)     # kind, pooled count
+
+    # From executor threads, queued to the GUI thread
+    _probed = Signal(str, str, dict, bool)  # kind, path, media info, fresh download
+    _loaded = Signal()
+
+    def __init__(self, pool_sizes: dict = None, folder: Path = None, dest_folder: Path = SAVES_DIR, parent=None):
+        super().__init__(parent)
+        self.pool_sizes = dict(DEFAULT_POOL_SIZES if pool_sizes is None else pool_sizes)
+        self.dest_folder = Path(dest_folder)
+        self.folder = Path(folder) if folder is not None else pool_folder_for(self.dest_folder)
+        self.downloads = get_download_queue()
+        self.bandwidth = get_bandwidth()
+        self._pools = {kind: deque() for kind in self.pool_sizes}
+        self._fetchers = {}                 # kind -> running Shuffler
+        self._pending = {kind: 0 for kind in self.pool_sizes}
+        self._loading = True
+        self._refill_after_load = False
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.setInterval(RETRY_MS)
+        self.retry_timer.timeout.connect(self.refill)
+
+        self._probed.connect(self._on_probed)
+        self._loaded.connect(self._on_loaded)
+        # The screen size is read here: Qt screens belong to the GUI thread
+        get_task_executor().submit(self._load, self._size_prefix(), lane="background", name="ShufflePool.load")
+
+    @staticmethod
+    def _size_prefix() -> str:
+        display = get_primary_display()
+        return f"{display.width}x{display.height}_"
+
+    def _kind_folder(self, kind: str) -> Path:
+        return self.folder / kind
+
+    def _load(self, prefix: str):
+        """Adopt candidates left from the last session that still fit the screen (executor thread)"""
+        try:
+            if self.folder != POOL_DIR and POOL_DIR.exists():
+                # Collection moved to another filesystem: the old pool is never used again
+                shutil.rmtree(POOL_DIR, ignore_errors=True)
+            for kind in self.pool_sizes:
+                folder = self._kind_folder(kind)
+                folder.mkdir(parents=True, exist_ok=True)
+                for path in sorted(folder.iterdir(), key=lambda p: p.stat().st_mtime):
+                    # A crash can leave a half-written download behind
+                    if path.name.startswith(prefix):
+                        self._probed.emit(kind, str(path), probe_media(path), False)
+                    else:
+                        path.unlink(missing_ok=True)
+        except OSError as e:
+            logging.warning(f"Shuffle pool leftovers not loaded: {e}")
+        finally:
+            self._loaded.emit()
+
+    def _on_loaded(self):
+        self._loading = False
+        counts = {kind: len(pool) for kind, pool in self._pools.items()}
+        logging.debug(f"Shuffle pool warm items: {counts}")
+        if self._refill_after_load:
+            self._refill_after_load = False
+            self.refill()
+
+    # -------------------------------------------------------------------
+    # PUBLIC
+    # -------------------------------------------------------------------
+    def take(self, animated: bool) -> Path | None:
+        """A ready-to-apply file moved into the collection, or None when the pool is empty"""
+        kind = "animated" if animated else "static"
+        pool = self._pools[kind]
+        prefix = self._size_prefix()
+        result = None
+        while pool and result is None:
+            path = pool.popleft()
+            # Screen changed since it was fetched, or deleted behind our back
+            if not path.name.startswith(prefix) or not path.exists():
+                path.unlink(missing_ok=True)
+                continue
+            result = self._claim(path, prefix)
+
+        get_metrics().inc("shuffle_pool_hits_total" if result else "shuffle_pool_misses_total")
+        self.refill()
+        return result
+
+    def count(self, animated: bool) -> int:
+        return len(self._pools["animated" if animated else "static"])
+
+    def refill(self):
+        if self._loading:
+            self._refill_after_load = True
+            return                  # leftovers are still being checked
+        if self.retry_timer.isActive():
+            return                  # backing off after a failure
+        if not self.bandwidth.allow_background():
+            logging.debug("Metered connection, shuffle pool not refilled")
+            return
+        for kind, size in self.pool_sizes.items():
+            if kind in self._fetchers:
+                continue
+            if len(self._pools[kind]) + self._pending[kind] < size:
+                self._fetch(kind)
+
+    def shutdown(self):
+        self.retry_timer.stop()
+        for fetcher in self._fetchers.values():
+            fetcher.wait(3000)
+
+    # -------------------------------------------------------------------
+    # REFILL
+    # -------------------------------------------------------------------
+    def _fetch(self, kind: str):
+        fetcher = Shuffler(animated=(kind == "animated"), lane="background", parent=self)
+        fetcher.success.connect(lambda url, kind=kind: self._on_url(kind, url))
+        fetcher.failed.connect(lambda reason, kind=kind: self._on_failed(kind, reason))
+        fetcher.finished.connect(lambda kind=kind: self._on_fetcher_finished(kind))
+        self._fetchers[kind] = fetcher
+        fetcher.start()
+
+    def _on_fetcher_finished(self, kind: str):
+        fetcher = self._fetchers.pop(kind, None)
+        if fetcher is not None:
+            fetcher.deleteLater()
+        self.refill()
+
+    def _on_url(self, kind: str, url: str):
+        name = os.path.basename(url.split("?")[0]) or "shuffle"
+        dest = self._kind_folder(kind) / f"{self._size_prefix()}{name}"
+        self._pending[kind] += 1
+        self.downloads.enqueue(
+            url, dest, "direct" if kind == "animated" else "image", priority="prefetch",
+            on_done=lambda path, kind=kind: self._on_downloaded(kind, Path(path)),
+            on_error=lambda reason, kind=kind: self._on_download_failed(kind, reason),
+        )
+
+    def _on_downloaded(self, kind: str, path: Path):
+        # Still counted as pending until the probe result arrives
+        get_task_executor().submit(self._probe, kind, path, lane="background", name="ShufflePool.probe")
+
+    def _probe(self, kind: str, path: Path):
+        self._probed.emit(kind, str(path), probe_media(path), True)
+
+    def _on_probed(self, kind: str, path: str, info: dict, fetched: bool):
+        path = Path(path)
+        if fetched:
+            self._pending[kind] -= 1
+        if not info["ok"]:
+            logging.warning(f"Shuffle candidate rejected: {path.name} ({info['error']})")
+            path.unlink(missing_ok=True)
+        else:
+            self._pools[kind].append(path)
+            self.refilled.emit(kind, len(self._pools[kind]))
+        if fetched:
+            self.refill()
+
+    def _on_download_failed(self, kind: str, reason: str):
+        self._pending[kind] -= 1
+        self._on_failed(kind, reason)
+
+    def _on_failed(self, kind: str, reason: str):
+        logging.info(f"Shuffle pool refill failed ({kind}): {reason}")
+        # Offline or API trouble: try again later instead of hammering the server
+        self.retry_timer.start()
+
+    def _claim(self, path: Path, prefix: str) -> Path:
+        """Move a pooled file into the collection under a free name"""
+        self.dest_folder.mkdir(parents=True, exist_ok=True)
+        name = path.name[len(prefix):]
+        stem, suffix = os.path.splitext(name)
+        dest, counter = self.dest_folder / name, 1
+        while dest.exists():
+            dest = self.dest_folder / f"{stem}_{counter}{suffix}"
+            counter += 1
+        # A rename: the pool folder is on the collection's filesystem (see pool_folder_for)
+        shutil.move(path, dest)
+        return dest
+
+
+_pool_instance: ShufflePool | None = None
+
+def get_shuffle_pool() -> ShufflePool:
+    global _pool_instance
+    if _pool_instance is None:
+        _pool_instance = ShufflePool()
+    return _pool_instance
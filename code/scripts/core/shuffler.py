@@ -1,16 +1,19 @@
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Signal
 import logging,requests,json
-from PySide6.QtWidgets import QApplication
 from utils.singletons import get_config
+from utils.display_layout import get_primary_display
 import socket
+from core.task_executor import BackgroundTask
 
-class Shuffler(QThread):
+class Shuffler(BackgroundTask):
 
     success = Signal(str)
     failed = Signal(str)
 
-    def __init__(self, animated:bool, parent = None):
+    def __init__(self, animated:bool, lane:str = "interactive", parent = None):
         super().__init__(parent)
+        # The shuffle pool prefetches on the background lane
+        self.lane = lane
         self.x , self.y = self.get_primary_screen_dimensions()        
         self.config = get_config()
         self.isAnimated = animated
@@ -32,15 +35,9 @@ class Shuffler(QThread):
             bool: True if connected, False otherwise.
         """
         try:
-            # Create a socket object
-            socket.setdefaulttimeout(timeout)
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            
-            # Attempt to connect to the host
-            s.connect((host, port))
-            
-            # Connection successful
-            s.close()
+            # Per-connection timeout: setdefaulttimeout() would change every socket in the app
+            with socket.create_connection((host, port), timeout=timeout):
+                pass
             logging.info("Internet connection verified successfully.")
             return True
         
@@ -56,31 +53,18 @@ class Shuffler(QThread):
 
     def get_primary_screen_dimensions(self) -> tuple[int, int]:
         """
-        Retrieves the width and height of the primary screen using PySide6's 
-        QApplication and QScreen methods.
+        Retrieves the width and height of the primary screen in device pixels
+        from the display layout (screeninfo + QScreen).
 
         Returns:
             tuple[int, int]: (width, height) of the primary screen in pixels.
-                            Returns (1920, 1080) as a safe fallback if QApplication is not running.
+                            Returns (1920, 1080) as a safe fallback if no screen can be detected.
         """
         try:
-            # Get the running QApplication instance
-            app = QApplication.instance()
-            if not app:
-                logging.warning("QApplication instance not found. Returning fallback dimensions.")
-                return 1920, 1080
-                
-            # Get the primary screen object
-            screen = app.primaryScreen()
-            if screen:
-                size = screen.size()
-                width = size.width()
-                height = size.height()
-                logging.info(f"Primary screen dimensions retrieved: {width}x{height}")
-                return width, height
-            
-            logging.warning("Primary screen object not found. Returning fallback dimensions.")
-            return 1920, 1080
+            # Device pixels, so HiDPI screens get a full-resolution wallpaper
+            primary = get_primary_display()
+            logging.info(f"Primary screen dimensions retrieved: {primary.width}x{primary.height}")
+            return primary.width, primary.height
 
         except Exception as e:
             logging.error(f"Failed to get screen dimensions: {e}")
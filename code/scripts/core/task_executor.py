@@ -0,0 +1,182 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+from utils.metrics import get_metrics
+from utils.cancellation import CancelToken, OperationCancelled
+
+
+# Lane -> thread cap. Each lane has its own pool, so a long background job can
+# never hold up something the user is waiting for.
+#   interactive = the user is waiting (shuffle, login, pasted URL download)
+#   background  = long or speculative work (imports, prefetch downloads)
+#   maintenance = periodic housekeeping (favorites refresh, token checks)
+LANES = {"interactive": 4, "background": 2, "maintenance": 1}
+
+
+class TaskExecutor:
+    """
+    The app's worker threads: one bounded pool per lane, threads created once
+    and reused. submit() returns a concurrent.futures.Future; cancelling it
+    drops a task that has not started yet (running tasks stop cooperatively,
+    see BackgroundTask.cancel). Live queued/running counts per lane are
+    published as metrics gauges.
+    """
+
+    def __init__(self, lanes: dict = None):
+        self.lanes = dict(LANES if lanes is None else lanes)
+        self._pools = {
+            lane: ThreadPoolExecutor(max_workers=cap, thread_name_prefix=f"task-{lane}")
+            for lane, cap in self.lanes.items()
+        }
+        self._lock = threading.Lock()
+        self._queued = {lane: 0 for lane in self.lanes}
+        self._running = {lane: 0 for lane in self.lanes}
+        self._closed = False
+
+    def submit(self, fn, *args, lane: str = "background", name: str = None, **kwargs) -> Future:
+        if lane not in self._pools:
+            raise ValueError(f"Unknown task lane: {lane}")
+        if self._closed:
+            raise RuntimeError("Task executor is shut down")
+
+        name = name or getattr(fn, "__qualname__", "task")
+        with self._lock:
+            self._queued[lane] += 1
+        self._publish()
+        get_metrics().inc("tasks_submitted_total")
+
+        future = self._pools[lane].submit(self._run, lane, name, fn, args, kwargs)
+        future.add_done_callback(lambda f, lane=lane: self._on_done(lane, f))
+        return future
+
+    def _run(self, lane: str, name: str, fn, args, kwargs):
+        with self._lock:
+            self._queued[lane] -= 1
+            self._running[lane] += 1
+        self._publish()
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            get_metrics().observe(f"task_{lane}", time.perf_counter() - t0)
+            with self._lock:
+                self._running[lane] -= 1
+            self._publish()
+            logging.debug(f"Task '{name}' finished on lane '{lane}'")
+
+    def _on_done(self, lane: str, future: Future):
+        # A task cancelled before it started never reaches _run
+        if future.cancelled():
+            with self._lock:
+                self._queued[lane] -= 1
+            self._publish()
+
+    def counts(self) -> dict:
+        """{lane: {"queued": n, "running": n}}"""
+        with self._lock:
+            return {lane: {"queued": self._queued[lane], "running": self._running[lane]} for lane in self.lanes}
+
+    def _publish(self):
+        metrics = get_metrics()
+        for lane, count in self.counts().items():
+            metrics.set_gauge(f"tasks_queued_{lane}", count["queued"])
+            metrics.set_gauge(f"tasks_running_{lane}", count["running"])
+
+    def shutdown(self, timeout: float = 3.0):
+        """Drop queued tasks and give running ones `timeout` seconds to finish"""
+        self._closed = True
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        deadline = time.monotonic() + timeout
+        while any(c["running"] for c in self.counts().values()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        leftover = {lane: c["running"] for lane, c in self.counts().items() if c["running"]}
+        if leftover:
+            logging.warning(f"Tasks still running at shutdown: {leftover}")
+
+
+class BackgroundTask(QObject):
+    """
+    Base for one-off background operations, with the QThread-style API the
+    UI already uses (start / isRunning / wait / finished) but running on the
+    shared executor instead of a thread of its own. Subclasses implement
+    run() and emit their own signals from it; they reach the GUI thread
+    queued, as they did from a QThread.
+
+    cancel() cancels `self.token`; run() checks it (or lets it interrupt its
+    I/O) and may simply raise OperationCancelled, which ends the task quietly.
+    """
+
+    finished = Signal()
+
+    # Executor lane; instances may override it before start()
+    lane = "background"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._future = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self.token = CancelToken()
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self):
+        if self.isRunning():
+            logging.debug(f"{type(self).__name__} already running, start ignored")
+            return
+        if self.token.cancelled:
+            self.token = CancelToken()
+        self._idle.clear()
+        self._future = get_task_executor().submit(self._execute, lane=self.lane, name=type(self).__name__)
+        self._future.add_done_callback(self._on_future_done)
+
+    def _execute(self):
+        try:
+            self.run()
+        except OperationCancelled:
+            logging.info(f"{type(self).__name__} cancelled")
+        except Exception as e:
+            logging.error(f"{type(self).__name__} failed: {e}", exc_info=True)
+        finally:
+            if self.token.cancelled:
+                self.token.report(type(self).__name__)
+            self._idle.set()
+            self.finished.emit()
+
+    def _on_future_done(self, future: Future):
+        if future.cancelled():
+            # Dropped before it ran: still report the end, callers clean up on finished
+            self._idle.set()
+            self.finished.emit()
+
+    def isRunning(self) -> bool:
+        """Queued or running"""
+        return not self._idle.is_set()
+
+    def wait(self, msecs: int = None) -> bool:
+        return self._idle.wait(None if msecs is None else msecs / 1000)
+
+    def cancel(self):
+        """Drop the task if it has not started, else ask the running one to stop"""
+        self.token.cancel()
+        if self._future is not None:
+            self._future.cancel()
+
+    def isCancelled(self) -> bool:
+        return self.token.cancelled
+
+
+_executor_instance: TaskExecutor | None = None
+
+def get_task_executor() -> TaskExecutor:
+    global _executor_instance
+    if _executor_instance is None:
+        _executor_instance = TaskExecutor()
+    return _executor_instance
@@ -5,18 +5,70 @@ import platform
 import os
 import re
 import time
+from pathlib import Path
 
 from PySide6.QtWidgets import QMessageBox
+from PySide6.QtCore import Signal
 
-from utils.system_utils import which, set_static_desktop_wallpaper
+from utils.system_utils import which, RenderedWallpaper, render_static_wallpaper, apply_rendered_wallpaper
 from utils.path_utils import get_weebp_path, get_mpv_path, get_tools_path
-from utils.command_handler import run_and_forget_silent
+from utils.process_supervisor import get_process_supervisor
+from utils.resource_limits import DEFAULT_PLAYER_PROFILE, get_profile_limits
+from utils.metrics import get_metrics
+from utils.cancellation import CancelToken, OperationCancelled
+from utils.wallpaper_render import DEFAULT_FIT_MODE, DEFAULT_OUTPUT_FORMAT, DEFAULT_OUTPUT_QUALITY
+from utils import x11_root
+from core.task_executor import BackgroundTask
+
+
+# IPC pipe of the mpv weebp runs for us (weebp's own "mpv" commands talk to it too)
+MPV_PIPE = "\\\\.\\pipe\\mpvsocket"
+# Helpers bundled with the app: their image names are ours alone, unlike mpv.exe
+WINDOWS_TOOLS = ("wp.exe", "autopause.exe", "refresh.exe")
+
+
+class ImageRenderTask(BackgroundTask):
+    """
+    Renders a static wallpaper on the executor's interactive lane. Shares the
+    apply request's cancel token, so a newer request stops it; the result is
+    applied by whoever receives `rendered`, on the GUI thread.
+    """
+
+    rendered = Signal(object)       # RenderedWallpaper
+    failed = Signal(str)
+
+    lane = "interactive"
+
+    def __init__(self, controller, image_path: str, displays: list, token: CancelToken, span=None, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.image_path = image_path
+        self.displays = displays
+        self.token = token
+        self.span = span
+
+    def run(self):
+        with get_metrics().use_span(self.span):
+            try:
+                rendered = self.controller.render_image(self.image_path, self.displays, self.token)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                self.failed.emit(str(e))
+                return
+        self.rendered.emit(rendered)
 
 
 class WallpaperController:
     def __init__(self):
-        self.player_procs = []
+        self.processes = get_process_supervisor()
+        self.desktop_window = None          # X11 window the Linux video player draws into
         self.current_is_video = False
+        self.fit_mode = DEFAULT_FIT_MODE
+        self.render_format = DEFAULT_OUTPUT_FORMAT
+        self.render_quality = DEFAULT_OUTPUT_QUALITY
+        self.display_wallpapers = {}        # display name -> image pinned to that display
+        self.player_profile = DEFAULT_PLAYER_PROFILE
 
         # Cached paths
         self.tools_path = get_tools_path()
@@ -46,7 +98,7 @@ class WallpaperController:
     # ---------------------------------------------------------
     def _run_auto_pause(self):
         exe_path = os.path.join(self.tools_path, "autoPause.exe")
-        run_and_forget_silent([exe_path])
+        self._run_tool("autoPause", [exe_path])
         logging.info("Launched autoPause.exe")
 
     def _run_refresh(self):
@@ -59,9 +111,17 @@ class WallpaperController:
             return self._run_refresh()
 
         refresh_exe = os.path.join(self.tools_path, "refresh.exe")
-        run_and_forget_silent([refresh_exe, f"0x{view_id}"])
+        self._run_tool("refresh", [refresh_exe, f"0x{view_id}"])
         logging.info("Launched refresh.exe")
 
+    def _run_tool(self, name: str, cmd: list, cwd=None):
+        """Start a helper tool under the process supervisor (it reaps it when it exits)"""
+        try:
+            return self.processes.spawn(name, cmd, group="tool", cwd=cwd)
+        except OSError as e:
+            logging.error(f"Could not start {name}: {e}")
+            return None
+
     def run_optional_tools(self):
         # self._run_auto_pause()
         self._run_refresh()
@@ -73,24 +133,26 @@ class WallpaperController:
         logging.info("Stopping wallpaper processes...")
 
         if sys.platform.startswith("linux"):
-            for proc in ("xwinwrap", "mpv"):
-                subprocess.call(
-                    f"pkill -f {proc}", shell=True,
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
+            self._stop_linux_players()
 
         elif sys.platform.startswith("win") and self.current_is_video:
             self._stop_windows()
 
+        else:
+            self.processes.stop_group("player")
+
         self.current_is_video = False
         logging.info("All wallpaper processes stopped")
 
     def _stop_windows(self):
         self._clear_playlist()
+        self.processes.stop_group("player")
 
-        kill_list = ["mpv.exe", "wp.exe", "autopause.exe", "refresh.exe"]
+        # weebp hands mpv over to the desktop, outside the process groups we own:
+        # ask that mpv to quit over its pipe, never by image name (other mpv players live on)
+        self._quit_wallpaper_mpv()
 
-        for proc in kill_list:
+        for proc in WINDOWS_TOOLS:
             try:
                 subprocess.run(["taskkill", "/F", "/IM", proc, "/T"],
                                check=False,
@@ -100,12 +162,24 @@ class WallpaperController:
             except Exception:
                 pass
 
+    def _quit_wallpaper_mpv(self):
+        try:
+            with open(MPV_PIPE, "wb", buffering=0) as pipe:
+                pipe.write(b'{"command": ["quit"]}\n')
+            logging.info("Asked the wallpaper mpv to quit")
+        except OSError:
+            logging.debug("Wallpaper mpv pipe not open, no mpv to stop")
+
     # ---------------------------------------------------------
     #  VIDEO STARTERS
     # ---------------------------------------------------------
     def start_video(self, video_path: str):
         logging.debug(f"Current is video: {self.current_is_video}")
+        metrics = get_metrics()
+        with metrics.span("apply"), metrics.stage("player_switch"):
+            return self._start_video(video_path)
 
+    def _start_video(self, video_path: str):
         if platform.system() == "Windows":
             if self.current_is_video:
                 return self._play_next_video(video_path)
@@ -114,6 +188,7 @@ class WallpaperController:
             return self._start_video_windows(video_path)
 
         if sys.platform.startswith("linux"):
+            self.current_is_video = True
             return self._start_video_linux(video_path)
 
         return self._start_video_fallback(video_path)
@@ -124,21 +199,21 @@ class WallpaperController:
     def _clear_playlist(self):
         """Clears MPV playlist via weebp."""
         cmd = [str(self.weebp_path), "mpv", "playlist-clear"]
-        run_and_forget_silent(cmd, cwd=self.mpv_path.parents[0])
+        self._run_tool("weebp", cmd, cwd=self.mpv_path.parents[0])
         time.sleep(0.5)
 
     def _play_next_video(self, video_path):
         """Append & switch to next."""
         base_cmd = str(self.weebp_path)
 
-        run_and_forget_silent(
-            [base_cmd, "mpv", "loadfile", video_path, "append"],
+        self._run_tool(
+            "weebp", [base_cmd, "mpv", "loadfile", video_path, "append"],
             cwd=self.mpv_path.parents[0]
         )
         time.sleep(0.2)
 
-        run_and_forget_silent(
-            [base_cmd, "mpv", "playlist-next"],
+        self._run_tool(
+            "weebp", [base_cmd, "mpv", "playlist-next"],
             cwd=self.mpv_path.parents[0]
         )
 
@@ -152,7 +227,7 @@ class WallpaperController:
 
             mpv_cmd = [
                 weebp, "run", "mpv", video_path,
-                "--input-ipc-server=\\\\.\\pipe\\mpvsocket",
+                f"--input-ipc-server={MPV_PIPE}",
                 "--fullscreen",
                 "--panscan=1.0",
                 "--no-border",
@@ -167,10 +242,10 @@ class WallpaperController:
                 "--fullscreen", "--class", "mpv"
             ]
 
-            run_and_forget_silent(mpv_cmd, cwd=mpv_cwd)
+            self.processes.spawn("weebp-mpv", mpv_cmd, group="player", cwd=mpv_cwd)
             time.sleep(0.6)
 
-            run_and_forget_silent(add_cmd, cwd=mpv_cwd)
+            self._run_tool("weebp", add_cmd, cwd=mpv_cwd)
             time.sleep(0.4)
 
             self.run_optional_tools()
@@ -182,31 +257,48 @@ class WallpaperController:
     #  LINUX VIDEO START
     # ---------------------------------------------------------
     def _start_video_linux(self, video_path):
-        xwinwrap = which("xwinwrap")
         mpv = which("mpv")
+        if not mpv:
+            raise RuntimeError("No suitable video wallpaper backend (mpv not found).")
+
+        mpv_args = [mpv, "--loop", "--no-audio", "--no-osd-bar"]
+        self._stop_linux_players(keep_window=True)
+
+        # Bare X11: mpv draws into our own desktop window (no xwinwrap, no shell)
+        if x11_root.available():
+            try:
+                if self.desktop_window is None:
+                    self.desktop_window = x11_root.DesktopWindow()
+                wid = self.desktop_window.create()
+                self._spawn_player("mpv", mpv_args + [f"--wid={wid}", str(video_path)])
+                return
+            except Exception as e:
+                logging.error(f"X11 desktop window failed: {e}")
+                self._stop_linux_players()
 
-        if xwinwrap and mpv:
+        xwinwrap = which("xwinwrap")
+        if xwinwrap:
             try:
-                cmd = (
-                    f"{xwinwrap} -ov -fs -- "
-                    f"{mpv} --loop --no-audio --no-osd-bar --wid=WID '{video_path}'"
-                )
-                p = subprocess.Popen(cmd, shell=True, executable="/bin/bash",
-                                     stdout=subprocess.DEVNULL,
-                                     stderr=subprocess.DEVNULL)
-                self.player_procs.append(p)
+                # xwinwrap replaces WID with its window id
+                self._spawn_player("xwinwrap", [xwinwrap, "-ov", "-fs", "--"] + mpv_args + ["--wid=WID", str(video_path)])
                 return
             except Exception as e:
                 logging.error(f"xwinwrap failed: {e}")
 
-        if mpv:
-            p = subprocess.Popen(
-                [mpv, "--loop", "--no-audio", "--no-osd-bar", "--fullscreen", "--no-border", video_path],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self.player_procs.append(p)
-            return
+        self._spawn_player("mpv", mpv_args + ["--fullscreen", "--no-border", str(video_path)])
 
-        raise RuntimeError("No suitable video wallpaper backend (xwinwrap/mpv).")
+    def _spawn_player(self, name: str, args: list):
+        # Players are restarted (with backoff) if they crash, and capped by the performance profile
+        self.processes.spawn(name, args, group="player", restart=True,
+                             limits=get_profile_limits(self.player_profile))
+
+    def _stop_linux_players(self, keep_window: bool = False):
+        """Stop the players we started; the desktop window is reused by the next video if kept"""
+        self.processes.stop_group("player")
+
+        if self.desktop_window is not None and not keep_window:
+            self.desktop_window.destroy()
+            self.desktop_window = None
 
     # ---------------------------------------------------------
     #  FALLBACK VIDEO START
@@ -216,24 +308,48 @@ class WallpaperController:
         if not mpv:
             raise RuntimeError(f"Unsupported platform: {sys.platform}")
 
-        subprocess.Popen(
-            [mpv, "--loop", "--no-audio", "--fullscreen", "--no-border", video_path],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.current_is_video = True
+        self._spawn_player("mpv", [mpv, "--loop", "--no-audio", "--fullscreen", "--no-border", video_path])
 
     # ---------------------------------------------------------
     #  STATIC IMAGE
     # ---------------------------------------------------------
-    def start_image(self, image_path):
+    def start_image(self, image_path) -> bool:
+        """Render and apply in one go, on the calling thread"""
+        with get_metrics().span("apply"):
+            try:
+                rendered = self.render_image(image_path)
+            except Exception:
+                return False
+            return self.apply_rendered(rendered)
+
+    def render_image(self, image_path, displays: list = None, token: CancelToken = None) -> RenderedWallpaper:
+        """The slow half of start_image; safe on a worker once `displays` is given"""
         try:
-            set_static_desktop_wallpaper(image_path)
+            return render_static_wallpaper(image_path, displays, per_display=self._per_display(),
+                                           fit_mode=self.fit_mode,
+                                           output_format=self.render_format, quality=self.render_quality,
+                                           token=token)
+        except OperationCancelled:
+            logging.info(f"Render of {image_path} cancelled, a newer wallpaper was requested")
+            raise
         except Exception as e:
-            logging.error(f"Failed to set wallpaper: {e}")
+            logging.error(f"Failed to render wallpaper: {e}")
             raise
 
-        if self.current_is_video:
-            self.stop()
+    def _per_display(self) -> dict:
+        """Pinned images that still exist; a deleted one gives its display back to the wallpaper"""
+        return {name: Path(path) for name, path in self.display_wallpapers.items() if Path(path).is_file()}
+
+    def apply_rendered(self, rendered: RenderedWallpaper) -> bool:
+        """The quick half of start_image: put the render up and stop a playing video (GUI thread)"""
+        applied = apply_rendered_wallpaper(rendered)
 
+        if self.current_is_video:
+            with get_metrics().stage("player_switch"):
+                self.stop()
         self.current_is_video = False
+        return applied
 
     # ---------------------------------------------------------
     #  VIEW ID PARSING (Windows)
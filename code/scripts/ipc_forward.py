@@ -0,0 +1,58 @@
+
+# ============================================================
+#  DEEP-LINK FAST PATH (SECONDARY INSTANCES)
+# ============================================================
+#
+# A browser opening a tapeciarnia: link starts a second process just to hand
+# the URI to the running app. main.py calls forward_uri_and_exit() before
+# PySide6 or any app module is imported, so this file must stay stdlib only.
+#
+# The primary's QLocalServer is the proof it is alive: on Windows it is the
+# named pipe \\.\pipe\<name>, elsewhere a Unix socket in QDir.tempPath().
+# If nothing accepts the connection (no primary, stale socket after a crash,
+# primary still starting) the normal startup path runs and SingleApplication
+# decides as before.
+
+import os
+import sys
+import socket
+
+
+SERVER_NAME = "Tapeciarnia_IPC"
+URI_SCHEME = "tapeciarnia:"
+
+
+def server_address(name: str = SERVER_NAME) -> str:
+    """Where QLocalServer listens for `name`"""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    # QDir.tempPath(): $TMPDIR, else /tmp
+    tmp_dir = (os.environ.get("TMPDIR") or "/tmp").rstrip("/") or "/"
+    return os.path.join(tmp_dir, name)
+
+
+def forward_to_primary(argv: list[str], timeout: float = 1.0) -> bool:
+    """Send argv[1:] to the running primary, the way SingleApplication does; True when delivered"""
+    message = " ".join(argv[1:]).encode("utf-8")
+    address = server_address()
+    try:
+        if sys.platform == "win32":
+            with open(address, "wb", buffering=0) as pipe:
+                pipe.write(message)
+        else:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(address)
+                sock.sendall(message)
+    except OSError:
+        return False
+    return True
+
+
+def forward_uri_and_exit(argv: list[str] = None):
+    """Exit right away when a tapeciarnia: URI was handed to a running instance"""
+    argv = sys.argv if argv is None else argv
+    if not any(arg.startswith(URI_SCHEME) for arg in argv[1:]):
+        return
+    if forward_to_primary(argv):
+        sys.exit(0)
@@ -1,6 +1,21 @@
 import sys
 import os
 import logging
+import multiprocessing
+
+# ============================================================
+#  DEEP LINK FAST PATH (BEFORE QT IS IMPORTED)
+# ============================================================
+
+# A tapeciarnia: link opened while the app is running only has to reach the
+# primary instance: hand it over and exit without the full startup
+try:
+    from code.scripts.ipc_forward import forward_uri_and_exit
+except ImportError:
+    from ipc_forward import forward_uri_and_exit
+
+if __name__ == "__main__":
+    forward_uri_and_exit()
 
 from PySide6.QtWidgets import QApplication,QMessageBox
 from PySide6.QtCore import Qt
@@ -142,6 +157,8 @@ def main():
         raise
 
 if __name__ == "__main__":
+    # Thumbnail workers run in child processes (required for frozen builds)
+    multiprocessing.freeze_support()
     main()
         
 
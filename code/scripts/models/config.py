@@ -1,7 +1,10 @@
+import json
+
 from PySide6.QtCore import QSettings
 
 from utils.path_utils import CONFIG_PATH
 from utils.system_utils import current_system_locale
+from utils.resource_limits import DEFAULT_PLAYER_PROFILE
 import logging
 
 
@@ -74,6 +77,99 @@ class Config:
     def set_range_preference(self, pref: str):
         self.set("range_preference", pref)
 
+    def get_fit_mode(self) -> str:
+        """How static wallpapers are fitted to each display: fill / fit / center / smart"""
+        return self.get("fit_mode", "fill")
+
+    def set_fit_mode(self, mode: str):
+        self.set("fit_mode", mode)
+
+    def get_render_format(self) -> str:
+        """Encoding of the stitched Windows wallpaper: jpeg / png / bmp"""
+        return self.get("render_format", "jpeg")
+
+    def set_render_format(self, fmt: str):
+        self.set("render_format", fmt)
+
+    def get_render_quality(self) -> int:
+        """JPEG quality of the stitched wallpaper (1-95)"""
+        return max(1, min(95, int(self.get("render_quality", 92))))
+
+    def set_render_quality(self, quality: int):
+        self.set("render_quality", int(quality))
+
+    def get_display_wallpapers(self) -> dict:
+        """Display name -> image shown on that display instead of the current wallpaper"""
+        # Stored as JSON: Windows display names (\\.\DISPLAY1) would be split by QSettings
+        try:
+            value = json.loads(self.get("display_wallpapers", "{}") or "{}")
+        except (TypeError, ValueError):
+            return {}
+        return value if isinstance(value, dict) else {}
+
+    def set_display_wallpaper(self, display_name: str, path: str | None):
+        """Pin an image to one display; None gives the display back to the current wallpaper"""
+        wallpapers = self.get_display_wallpapers()
+        if path:
+            wallpapers[display_name] = str(path)
+        else:
+            wallpapers.pop(display_name, None)
+        self.set("display_wallpapers", json.dumps(wallpapers))
+
+    def get_selection_policy(self) -> str:
+        """How the local scheduler uses file resolution: any / prefer / strict"""
+        return self.get("selection_policy", "prefer")
+
+    def set_selection_policy(self, policy: str):
+        self.set("selection_policy", policy)
+
+    # --------- network --------- #
+    def get_bandwidth_limits(self) -> dict:
+        """Per traffic class download limit in KB/s, 0 = unlimited"""
+        return {
+            "interactive": int(self.get("bandwidth_interactive_kbps", 0)),
+            "prefetch": int(self.get("bandwidth_prefetch_kbps", 0)),
+            "sync": int(self.get("bandwidth_sync_kbps", 0)),
+        }
+
+    def set_bandwidth_limit(self, traffic_class: str, kbps: int):
+        self.set(f"bandwidth_{traffic_class}_kbps", int(kbps))
+
+    def get_download_concurrency(self) -> int:
+        """How many downloads may run at the same time"""
+        return max(1, int(self.get("download_concurrency", 2)))
+
+    def set_download_concurrency(self, value: int):
+        self.set("download_concurrency", int(value))
+
+    def get_pause_background_on_metered(self) -> bool:
+        return self.to_bool(self.get("pause_background_on_metered", True))
+
+    def set_pause_background_on_metered(self, enabled: bool):
+        self.set("pause_background_on_metered", enabled)
+
+    # --------- players --------- #
+    def get_player_profile(self) -> str:
+        """Resource caps for video players: performance (no caps, the default) / balanced / eco"""
+        return self.get("player_profile", DEFAULT_PLAYER_PROFILE)
+
+    def set_player_profile(self, profile: str):
+        self.set("player_profile", profile)
+
+    # --------- diagnostics --------- #
+    def get_metrics_enabled(self) -> bool:
+        return self.to_bool(self.get("metrics_enabled", True))
+
+    def set_metrics_enabled(self, enabled: bool):
+        self.set("metrics_enabled", enabled)
+
+    def get_metrics_http_port(self) -> int:
+        """Local port for the /metrics endpoint, 0 = disabled"""
+        return int(self.get("metrics_http_port", 0))
+
+    def set_metrics_http_port(self, port: int):
+        self.set("metrics_http_port", int(port))
+
     def clear(self):
         logging.warning("Clearing all QSettings entries")
         self.settings.clear()
@@ -0,0 +1,4 @@
+"""
+Tests that need the app modules (and PySide6). Run from code/scripts:
+    python -m unittest discover -s tests -t .
+"""
@@ -0,0 +1,134 @@
+import time
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from pathlib import Path
+
+if importlib.util.find_spec("PySide6") is None:
+    raise unittest.SkipTest("PySide6 is not installed")
+
+from benchmarks.env import prepare, make_media_tree
+
+
+def setUpModule():
+    # Temp home, config and cache: the app modules create folders on import
+    prepare()
+
+
+class CollectionIndexTest(unittest.TestCase):
+    DEBOUNCE_MS = 100
+
+    def setUp(self):
+        from core.collection_index import CollectionIndex
+
+        self.tmp = Path(tempfile.mkdtemp(prefix="tapeciarnia-test-index-"))
+        self.media = make_media_tree(self.tmp / "media", 200)
+        # A private index, not the process-wide singleton other code listens to
+        self.index = CollectionIndex(debounce_ms=self.DEBOUNCE_MS)
+        self.deltas = []
+        self.index.delta.connect(lambda folder, added, removed: self.deltas.append((added, removed)))
+        self.assertTrue(self.index.watch(self.media))
+
+    def tearDown(self):
+        self.index.unwatch(self.media)
+        self.index.deleteLater()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _names(self) -> set[str]:
+        return {p.name for p in self.index.files(self.media)}
+
+    def _pump_until(self, predicate, timeout: float = 5.0):
+        from PySide6.QtCore import QCoreApplication
+
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail("collection index did not catch up")
+            QCoreApplication.processEvents()
+            time.sleep(0.001)
+
+    def _settle(self):
+        """Pump events for a while after the debounce interval, so late flushes show up"""
+        from PySide6.QtCore import QCoreApplication
+
+        deadline = time.monotonic() + 3 * self.DEBOUNCE_MS / 1000
+        while time.monotonic() < deadline:
+            QCoreApplication.processEvents()
+            time.sleep(0.005)
+
+    def _churn(self):
+        """yt-dlp style: fragments appear and are renamed, files are removed and renamed"""
+        for i in range(50):
+            part = self.media / f"new_{i}.f137.mp4.part"
+            part.write_bytes(b"x")
+            part.rename(self.media / f"new_{i}.mp4")
+        existing = sorted(p for p in self.media.iterdir() if p.name.startswith("wallpaper_"))
+        for p in existing[:20]:
+            p.unlink()
+        for p in existing[20:30]:
+            p.rename(self.media / f"renamed_{p.name}")
+        (self.media / "still_writing.mp4.part").write_bytes(b"x")
+
+    def test_initial_scan_skips_temp_files(self):
+        from core.collection_index import scan_folder
+
+        (self.media / "late.webm.part").write_bytes(b"x")
+        self.assertEqual(self._names(), scan_folder(self.media))
+        self.assertFalse(any(name.endswith(".part") for name in self._names()))
+
+    def test_churn_converges_to_a_real_listing(self):
+        from core.collection_index import scan_folder
+
+        self._churn()
+        expected = scan_folder(self.media)
+        self._pump_until(lambda: self._names() == expected)
+        self._settle()
+        self.assertEqual(self._names(), expected)
+        self.assertNotIn("still_writing.mp4.part", self._names())
+
+    def test_burst_is_debounced_into_one_delta(self):
+        from core.collection_index import scan_folder
+
+        # No events are processed during the burst: every change notification
+        # arrives together and restarts the timer, so exactly one re-list runs
+        before = self._names()
+        self._churn()
+        after = scan_folder(self.media)
+        self._pump_until(lambda: self.deltas)
+        self._settle()
+        self.assertEqual(self.deltas, [(sorted(after - before), sorted(before - after))])
+        self.assertFalse(any(name.endswith(".part") for name in self.deltas[0][0]))
+
+    def test_no_delta_before_the_debounce_interval(self):
+        from PySide6.QtCore import QCoreApplication
+
+        (self.media / "one_more.jpg").write_bytes(b"x")
+        started = time.monotonic()
+        while time.monotonic() - started < self.DEBOUNCE_MS / 1000 / 2:
+            QCoreApplication.processEvents()
+            time.sleep(0.001)
+        self.assertEqual(self.deltas, [])
+
+        self._pump_until(lambda: self.deltas)
+        self.assertEqual(self.deltas, [(["one_more.jpg"], [])])
+
+    def test_refresh_applies_changes_at_once(self):
+        (self.media / "written_by_us.png").write_bytes(b"x")
+        self.index.refresh(self.media)
+        self.assertIn("written_by_us.png", self._names())
+        self.assertEqual(self.deltas, [(["written_by_us.png"], [])])
+
+
+class TempFileTest(unittest.TestCase):
+    def test_temp_names(self):
+        from core.collection_index import is_temp_file
+
+        for name in ("a.mp4.part", "a.ytdl", ".favorites.json", "a.f137.mp4", "x.crdownload", "a.TMP"):
+            self.assertTrue(is_temp_file(name), name)
+        for name in ("a.mp4", "a.f.mp4", "family.jpg", "a.final.webm"):
+            self.assertFalse(is_temp_file(name), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import logging
+from collections import OrderedDict
+from pathlib import Path
+
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QListView, QLabel, QPushButton, QAbstractItemView
+from PySide6.QtGui import QPixmap
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, Signal
+
+from core.collection_index import get_collection_index
+from utils.thumbnails import get_thumbnail_service, THUMB_SIZE
+from utils.singletons import get_config
+
+
+class CollectionModel(QAbstractListModel):
+    """
+    Flat list of collection files. Thumbnails are only requested for rows the
+    view actually paints, and only a bounded number of pixmaps stay in memory.
+    data() never touches the source files: thumbnails arrive through `ready`.
+    """
+
+    PENDING = ""
+
+    def __init__(self, files: list[Path], max_pixmaps: int = 600, parent=None):
+        super().__init__(parent)
+        self.files = files
+        self.rows = {str(f): i for i, f in enumerate(files)}
+        self.thumbs = {}                    # source -> thumbnail path ("" = requested)
+        self.pixmaps = OrderedDict()        # source -> QPixmap, LRU
+        self.max_pixmaps = max_pixmaps
+
+        self.service = get_thumbnail_service()
+        self.service.ready.connect(self._on_thumbnail_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.files[index.row()]
+
+        if role == Qt.DisplayRole:
+            return path.name
+        if role == Qt.ToolTipRole:
+            return str(path)
+        if role == Qt.UserRole:
+            return str(path)
+        if role == Qt.DecorationRole:
+            return self._pixmap(str(path))
+        return None
+
+    def _pixmap(self, source: str):
+        pix = self.pixmaps.get(source)
+        if pix is not None:
+            self.pixmaps.move_to_end(source)
+            return pix
+
+        thumb = self.thumbs.get(source)
+        if thumb is None:
+            self.thumbs[source] = self.PENDING
+            self.service.request(source)
+            return None
+        if not thumb:
+            return None
+
+        pix = QPixmap(thumb)
+        if pix.isNull():
+            return None
+        self.pixmaps[source] = pix
+        while len(self.pixmaps) > self.max_pixmaps:
+            self.pixmaps.popitem(last=False)
+        return pix
+
+    def _on_thumbnail_ready(self, source: str, thumb: str):
+        row = self.rows.get(source)
+        if row is None:
+            return
+        self.thumbs[source] = thumb
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def set_files(self, files: list[Path]):
+        self.beginResetModel()
+        self.files = files
+        self.rows = {str(f): i for i, f in enumerate(files)}
+        self.endResetModel()
+
+
+class CollectionBrowserDialog(QDialog):
+    """Grid of collection thumbnails; double-click applies the wallpaper."""
+
+    wallpaper_selected = Signal(str)
+
+    def __init__(self, folders: list[Path], parent=None):
+        super().__init__(parent)
+        self.folders = folders
+        self.index = get_collection_index()
+        self.setup_ui()
+        self.reload()
+        self.index.delta.connect(self._on_collection_changed)
+
+    def setup_ui(self):
+        self.setWindowTitle("Browse Collection")
+        self.resize(960, 640)
+
+        layout = QVBoxLayout(self)
+
+        self.view = QListView(self)
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setIconSize(QSize(THUMB_SIZE // 2, THUMB_SIZE // 2))
+        self.view.setGridSize(QSize(THUMB_SIZE // 2 + 24, THUMB_SIZE // 2 + 36))
+        # Uniform items + batched layout keep 50k rows cheap: only visible rows are painted
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(500)
+        self.view.setWordWrap(False)
+        self.view.setTextElideMode(Qt.ElideMiddle)
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.view.doubleClicked.connect(self._on_double_clicked)
+        layout.addWidget(self.view)
+
+        bottom = QHBoxLayout()
+        self.count_label = QLabel(self)
+        apply_btn = QPushButton("Apply")
+        apply_btn.clicked.connect(lambda: self._on_double_clicked(self.view.currentIndex()))
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        bottom.addWidget(self.count_label)
+        bottom.addStretch()
+        bottom.addWidget(apply_btn)
+        bottom.addWidget(close_btn)
+        layout.addLayout(bottom)
+
+    def _collect_files(self) -> list[Path]:
+        files = []
+        extensions = get_config().get_all_valid_extensions()
+        for folder in self.folders:
+            if not self.index.is_watching(folder):
+                self.index.watch(folder)
+            files += self.index.files(folder, extensions)
+        return sorted(files, key=lambda p: p.name.lower())
+
+    def reload(self):
+        files = self._collect_files()
+        if self.view.model() is None:
+            self.view.setModel(CollectionModel(files, parent=self))
+        else:
+            self.view.model().set_files(files)
+        self.count_label.setText(f"{len(files)} wallpapers")
+        logging.info(f"Collection browser showing {len(files)} files")
+
+    def _on_collection_changed(self, folder: str, added: list, removed: list):
+        if any(Path(folder) == Path(f).resolve() for f in self.folders):
+            self.reload()
+
+    def _on_double_clicked(self, index):
+        if not index.isValid():
+            return
+        path = index.data(Qt.UserRole)
+        logging.info(f"Wallpaper chosen from collection browser: {path}")
+        self.wallpaper_selected.emit(path)
+
+    def closeEvent(self, event):
+        try:
+            self.index.delta.disconnect(self._on_collection_changed)
+        except (RuntimeError, TypeError):
+            pass
+        super().closeEvent(event)
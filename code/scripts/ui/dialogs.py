@@ -1,7 +1,11 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QProgressBar, QApplication
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QApplication, QPlainTextEdit, QPushButton
+from PySide6.QtGui import QFontDatabase
 from PySide6.QtCore import Qt, QTimer
+from datetime import datetime
 import logging
 
+from utils.metrics import get_metrics, CHANGE_STAGES
+
 
 class DownloadProgressDialog(QDialog):
     def __init__(self, parent=None):
@@ -181,4 +185,90 @@ class ShutdownProgressDialog(QDialog):
         if self.progress_bar.value() < 100:
             event.ignore()
         else:
-            super().closeEvent(event)
\ No newline at end of file
+            super().closeEvent(event)
+
+
+class DiagnosticsDialog(QDialog):
+    """Live view of the metrics registry: stage timings, counters and recent wallpaper changes."""
+
+    def __init__(self, parent=None, refresh_ms: int = 1000):
+        super().__init__(parent)
+        self.metrics = get_metrics()
+        self.setup_ui()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(refresh_ms)
+        self.refresh()
+
+    def setup_ui(self):
+        self.setWindowTitle("Tapeciarnia Diagnostics")
+        self.resize(640, 480)
+
+        layout = QVBoxLayout(self)
+
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        copy_btn = QPushButton("Copy JSON")
+        copy_btn.clicked.connect(lambda: QApplication.clipboard().setText(self.metrics.to_json()))
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self._reset)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(copy_btn)
+        buttons.addWidget(reset_btn)
+        buttons.addStretch()
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def _reset(self):
+        logging.info("Diagnostics metrics reset by user")
+        self.metrics.reset()
+        self.refresh()
+
+    def refresh(self):
+        snap = self.metrics.snapshot()
+        lines = []
+
+        if not snap["enabled"]:
+            lines.append("Metrics are disabled.")
+            lines.append("")
+
+        lines.append(f"{'timer':<28}{'count':>7}{'avg ms':>10}{'max ms':>10}{'last ms':>10}")
+        timers = snap["timers"]
+        # Stages first in pipeline order, then everything else alphabetically
+        ordered = [f"stage_{s}" for s in CHANGE_STAGES if f"stage_{s}" in timers]
+        ordered += sorted(k for k in timers if k not in ordered)
+        for name in ordered:
+            t = timers[name]
+            lines.append(f"{name:<28}{t['count']:>7}{t['avg'] * 1000:>10.1f}{t['max'] * 1000:>10.1f}{t['last'] * 1000:>10.1f}")
+
+        lines.append("")
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{name:<40}{value:>14}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"{name:<40}{value:>14}")
+
+        lines.append("")
+        lines.append("Recent wallpaper changes:")
+        for span in reversed(snap["spans"][-15:]):
+            when = datetime.fromtimestamp(span["started_at"]).strftime("%H:%M:%S")
+            stages = ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in span["stages"].items())
+            if span.get("counts"):
+                stages += "  " + ", ".join(f"{k}={v:,}" for k, v in span["counts"].items())
+            status = "ok" if span["ok"] else f"FAILED ({span['detail']})"
+            lines.append(f"  {when} [{span['trigger']}] {span['duration'] * 1000:.0f} ms {status}  {stages}")
+
+        # Keep the scroll position while refreshing
+        bar = self.text.verticalScrollBar()
+        pos = bar.value()
+        self.text.setPlainText("\n".join(lines))
+        bar.setValue(pos)
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        super().closeEvent(event)
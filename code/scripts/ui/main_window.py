@@ -12,7 +12,7 @@ from PySide6.QtWidgets import (
     QSystemTrayIcon, QMenu, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QStyle, QSizePolicy, QDialog,QSpacerItem
 )
-from PySide6.QtGui import QAction, QIcon, QPixmap
+from PySide6.QtGui import QAction, QIcon, QImageReader
 from PySide6.QtCore import QTimer, Qt, QEvent, QSize,Signal, QThread
 from .widgets import EnhancedDragDropWidget
 
@@ -36,26 +36,45 @@ except ImportError as e:
         raise ImportError("Cannot import Ui_MainWindow. Make sure mainUI.py exists in the ui folder.")
 
 # Import core modules
-from core.wallpaper_controller import WallpaperController
-from core.download_manager import DirectDownloadThread,ImageDownloadThread
+from core.wallpaper_controller import WallpaperController, ImageRenderTask
+from core.download_queue import get_download_queue
 from core.scheduler import UnifiedWallpaperScheduler
 from core.language_controller import LanguageController
 from core.login_handler import LoginWorker
 from core.shuffler import Shuffler
+from core.shuffle_pool import get_shuffle_pool
+from core.apply_arbiter import ApplyArbiter
+from core.event_bus import get_event_bus
+from core.task_executor import get_task_executor
+from utils.cancellation import CancelToken
+from utils.process_supervisor import get_process_supervisor
+from utils.resource_limits import systemd_scope_available
+from utils.linux_desktop import get_desktop_backend
+from core.collection_index import get_collection_index
+from core.batch_importer import BatchImporter, is_archive
+from core.favorites_sync import FavoritesSync
 # Import utilities
 from utils.path_utils import COLLECTION_DIR,SAVES_DIR, FAVS_DIR, get_folder_for_range, get_folder_for_source, open_folder_in_explorer
-from utils.system_utils import get_current_desktop_wallpaper, is_connected_to_internet, get_primary_screen_dimensions, resource_path,conver_bytes_to_tmp_path,gen_name_from_url
+from utils.system_utils import get_current_desktop_wallpaper, is_connected_to_internet, get_primary_screen_dimensions, resource_path
 from utils.validators import validate_url_or_path, get_media_type,validate_tapeciarnia_url,is_tapeciarnia_redirect_url
 from utils.file_utils import cleanup_temp_marker
 from utils.pathResolver import fast_resolve_tapeciarnia_redirect
 from utils.singletons import get_config
+from utils.metrics import get_metrics, MetricsServer
+from utils.display_layout import watch_screen_changes, get_display_layout
+from utils.thumbnails import shutdown_thumbnail_service
+from utils.media_probe import get_media_prober
+from utils.bandwidth import get_bandwidth
 # Import models
 from models.config import Config
 
 # Import UI components
-from .dialogs import ShutdownProgressDialog
+from .dialogs import ShutdownProgressDialog, DiagnosticsDialog
+from .collection_browser import CollectionBrowserDialog
 
 
+FAVORITES_REFRESH_MS = 60 * 60 * 1000
+
 
 class TapeciarniaApp(QMainWindow):
     def __init__(self):
@@ -63,6 +82,8 @@ class TapeciarniaApp(QMainWindow):
         super().__init__()
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        # Created before any worker: the bus must live on the GUI thread
+        self.events = get_event_bus()
         self.x , self.y = get_primary_screen_dimensions()
         self.is_dowloading = False
         # Initialize controllers
@@ -70,8 +91,28 @@ class TapeciarniaApp(QMainWindow):
         self.controller = WallpaperController()
         self.scheduler = UnifiedWallpaperScheduler()
         self.language_controller = LanguageController()
-        self.scheduler.set_change_callback(self._apply_wallpaper_from_scheduler)
+        # Every wallpaper change goes through the arbiter: bursts cost one apply
+        self.arbiter = ApplyArbiter(parent=self)
+        self.arbiter.dispatch.connect(self._dispatch_apply)
+        self._apply_generation = 0
+        self._apply_token = None
+        self._setup_events()
         self.config = get_config()
+        self._setup_metrics()
+        watch_screen_changes()
+        self.controller.fit_mode = self.config.get_fit_mode()
+        self.controller.render_format = self.config.get_render_format()
+        self.controller.render_quality = self.config.get_render_quality()
+        self.controller.display_wallpapers = self.config.get_display_wallpapers()
+        self.controller.player_profile = self.config.get_player_profile()
+        if sys.platform.startswith("linux"):
+            # Detected once, here on the GUI thread, before any render worker asks for it
+            get_desktop_backend()
+        # systemd-run takes up to 5 s to answer: probe it now so the first video never waits on it
+        get_task_executor().submit(systemd_scope_available, lane="background", name="scope-probe")
+        get_bandwidth().configure(self.config.get_bandwidth_limits(), self.config.get_pause_background_on_metered())
+        self._setup_collection_index()
+        self._setup_downloads()
 
         self._set_lang()
         # connect to the language controller signals
@@ -90,7 +131,6 @@ class TapeciarniaApp(QMainWindow):
         self.user_name:str|None = None
         # scheduler
         self.scheduler.set_api_url(f"https://www.tapeciarnia.pl/program/wybierz_tapete_2025.php?user=gmail&pokaz=ulubione_tap&x={self.x}&y={self.y}&hd=1")
-        self.scheduler.status_callback = self._set_status
         
 
 
@@ -111,6 +151,140 @@ class TapeciarniaApp(QMainWindow):
 
         logging.info("TapeciarniaApp initialization completed successfully")
 
+    def _setup_metrics(self):
+        '''
+        Apply metrics settings and start the local /metrics endpoint if a port is configured.
+        '''
+        self.metrics = get_metrics()
+        self.metrics.set_enabled(self.config.get_metrics_enabled())
+        self.metrics_server = None
+        self.diagnostics_dialog = None
+        self.collection_browser = None
+
+        port = self.config.get_metrics_http_port()
+        if self.metrics.enabled and port > 0:
+            self.metrics_server = MetricsServer(self.metrics, port)
+            if not self.metrics_server.start():
+                self.metrics_server = None
+
+    def _setup_events(self):
+        """Worker-to-UI events arrive here, on the GUI thread, batched per frame"""
+        self.events.subscribe("wallpaper_due", lambda event: self._apply_wallpaper_from_scheduler(event.payload))
+        self.events.subscribe("status", lambda event: self._set_status(event.payload))
+        self.events.subscribe("progress", self._on_progress_event)
+        self.events.subscribe("applied", self._on_wallpaper_applied)
+        self.events.subscribe("error", self._on_error_event)
+
+    def _on_progress_event(self, event):
+        # Downloads report to whoever queued them (see DownloadQueue)
+        if event.source != "download":
+            self._set_status(event.payload["text"])
+
+    def _on_wallpaper_applied(self, event):
+        self._set_status(event.payload["status"])
+        self._update_url_input(event.payload["path"])
+
+    def _on_error_event(self, event):
+        error = event.payload
+        self._set_status(error["text"])
+        if error.get("notify"):
+            QMessageBox.warning(self, error.get("title", "Error"), error["text"])
+
+    def _setup_collection_index(self):
+        """Keep the collection folders indexed in memory instead of rescanning them"""
+        self.collection_index = get_collection_index()
+        for folder in (SAVES_DIR, FAVS_DIR):
+            if folder.exists():
+                self.collection_index.watch(folder)
+        # Probe new files once at ingest so apply/selection never has to open them
+        self.media_prober = get_media_prober()
+        self._awaiting_probe = {}           # downloaded path -> is_animated, until its probe is in
+        self.media_prober.probed.connect(self._on_download_probed)
+        self.media_prober.attach(self.collection_index)
+
+        # While favorites rotate, refresh the mirror now and then (a 304 when unchanged)
+        self.favorites_refresh_timer = QTimer(self)
+        self.favorites_refresh_timer.setInterval(FAVORITES_REFRESH_MS)
+        self.favorites_refresh_timer.timeout.connect(self.sync_favorites)
+
+    def _setup_downloads(self):
+        """Downloads are started through one queue; unfinished ones from last session resume"""
+        self.downloads = get_download_queue()
+        self.downloads.set_max_concurrent(self.config.get_download_concurrency())
+        self.downloads.restore()
+        # Shuffle candidates are downloaded ahead of time; wait until start-up has settled
+        self.shuffle_pool = get_shuffle_pool()
+        self.shuffler = None
+        QTimer.singleShot(5000, self.shuffle_pool.refill)
+
+    def import_paths(self, paths: list):
+        """Import files, folders and archives into the collection in the background"""
+        if getattr(self, "importer", None) and self.importer.isRunning():
+            QMessageBox.information(self, "Import", "An import is already running.")
+            return
+
+        logging.info(f"Starting batch import of {len(paths)} item(s)")
+        self.importer = BatchImporter(paths, SAVES_DIR, self.config.get_all_valid_extensions(), parent=self)
+        self.importer.done.connect(self._on_import_done)
+        self.importer.start()
+
+    def _on_import_done(self, stats: dict):
+        # Deliver the last progress events first, the summary must stay on screen
+        self.events.flush()
+        summary = (f"Imported {stats['imported']} file(s) in {stats['seconds']:.1f}s"
+                   f" ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        skipped = [f"{stats[k]} {k}" for k in ("duplicates", "rejected", "failed") if stats[k]]
+        if skipped:
+            summary += f", skipped {', '.join(skipped)}"
+        self._set_status(summary)
+        logging.info(summary)
+
+    def sync_favorites(self):
+        """Bring the local favorites mirror up to date with the account, in the background"""
+        if not self.isLogin or not self.scheduler.api_url:
+            return
+        if getattr(self, "favorites_sync", None) and self.favorites_sync.isRunning():
+            return
+
+        self.favorites_sync = FavoritesSync(self.scheduler.api_url, FAVS_DIR, parent=self)
+        self.favorites_sync.synced.connect(self._on_favorites_synced)
+        self.favorites_sync.start()
+
+    def _on_favorites_synced(self, stats: dict):
+        self.events.flush()
+        # The mirror folder may have just been created; pick up the new files right away
+        self.collection_index.watch(FAVS_DIR)
+        self.collection_index.refresh(FAVS_DIR)
+        if stats["added"] or stats["removed"]:
+            self._set_status(f"Favorites synced: +{stats['added']} -{stats['removed']}")
+
+        # First sync finished while favorites rotation waited for it
+        if (self.scheduler.is_active() and self.scheduler.source == str(FAVS_DIR)
+                and self.scheduler.last_wallpaper is None):
+            self.scheduler.trigger()
+
+    def show_diagnostics(self):
+        """Open (or raise) the diagnostics panel"""
+        logging.info("Opening diagnostics panel")
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+            self.diagnostics_dialog.finished.connect(lambda _: setattr(self, "diagnostics_dialog", None))
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+        self.diagnostics_dialog.activateWindow()
+
+    def show_collection_browser(self):
+        """Open (or raise) the thumbnail grid of the collection"""
+        logging.info("Opening collection browser")
+        if self.collection_browser is None:
+            folders = [folder for folder in (SAVES_DIR, FAVS_DIR) if folder.exists()]
+            self.collection_browser = CollectionBrowserDialog(folders, self)
+            self.collection_browser.wallpaper_selected.connect(lambda path: self.request_apply(path, "browser"))
+            self.collection_browser.finished.connect(lambda _: setattr(self, "collection_browser", None))
+        self.collection_browser.show()
+        self.collection_browser.raise_()
+        self.collection_browser.activateWindow()
+
     def _setLogInState(self):
         '''
         Hide email and password imput area. And toggle text on LohInBnt
@@ -138,12 +312,16 @@ class TapeciarniaApp(QMainWindow):
             # Check if the left mouse button was pressed
             if event.button() == Qt.MouseButton.LeftButton:
 
-                path, _ = QFileDialog.getOpenFileName(
+                paths, _ = QFileDialog.getOpenFileNames(
                     self, "Select video or image", str(Path.home()),
-                    "Media (*.mp4 *.mkv *.webm *.avi *.mov *.jpg *.jpeg *.png)"
+                    "Media (*.mp4 *.mkv *.webm *.avi *.mov *.jpg *.jpeg *.png);;Archives (*.zip *.tar *.tar.gz *.tgz)"
                 )
                 
-                if path:
+                if len(paths) > 1 or (paths and is_archive(paths[0])):
+                    logging.info(f"{len(paths)} files selected via browse, importing")
+                    self.import_paths(paths)
+                elif paths:
+                    path = paths[0]
                     logging.info(f"File selected via browse: {path}")
                     
                     # Show the same interface as drag & drop
@@ -208,14 +386,7 @@ class TapeciarniaApp(QMainWindow):
             self._stop_scheduler()
         
 
-        # Try to fetch online wallpaper
-        fetch_online_url = Shuffler(animated=True)
-        fetch_online_url.success.connect(lambda e: self.download_and_set_online_wallpaper(e,is_animated=True))
-        fetch_online_url.failed.connect(lambda e: self._fallback_to_local_shuffle(is_animated=True,fallback_reason=e))
-        fetch_online_url.run()
-
-
-
+        self._shuffle(animated=True)
 
     def on_shuffle_wallpaper(self):
 
@@ -234,12 +405,22 @@ class TapeciarniaApp(QMainWindow):
             self._stop_scheduler()
         
 
-        # Try to fetch online wallpaper
-        animated = False
-        fetch_online_url = Shuffler(animated=animated)
-        fetch_online_url.success.connect(lambda e: self.download_and_set_online_wallpaper(e,is_animated=animated))
-        fetch_online_url.failed.connect(lambda e: self._fallback_to_local_shuffle(is_animated=animated,fallback_reason=e))
-        fetch_online_url.run()
+        self._shuffle(animated=False)
+
+    def _shuffle(self, animated: bool):
+        """Apply a pre-downloaded candidate at once, else fetch one off the GUI thread"""
+        pooled = self.shuffle_pool.take(animated)
+        if pooled is not None:
+            logging.info(f"Shuffle served from the warm pool: {pooled.name}")
+            self._on_online_download_done(str(pooled), animated)
+            return
+
+        if self.shuffler is not None and self.shuffler.isRunning():
+            return
+        self.shuffler = Shuffler(animated=animated, parent=self)
+        self.shuffler.success.connect(lambda e: self.download_and_set_online_wallpaper(e,is_animated=animated))
+        self.shuffler.failed.connect(lambda e: self._fallback_to_local_shuffle(is_animated=animated,fallback_reason=e))
+        self.shuffler.start()
 
 
     def _perform_reset(self):
@@ -307,8 +488,23 @@ class TapeciarniaApp(QMainWindow):
         logging.info("Performing application cleanup")
         self.controller.stop()
         self.stop_auto_pause_process()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        shutdown_thumbnail_service()
+        self.media_prober.shutdown()
+        self._stop_background_tasks()
         logging.info("Application cleanup completed")
 
+    def _stop_background_tasks(self):
+        """Cancel what runs on the task executor, then stop the executor and our child processes"""
+        for task in (getattr(self, "importer", None), getattr(self, "favorites_sync", None)):
+            if task is not None and task.isRunning():
+                task.cancel()
+        self.shuffle_pool.shutdown()
+        self.downloads.shutdown()
+        get_task_executor().shutdown()
+        get_process_supervisor().shutdown()
+
     # Rest of your existing methods remain the same...
     def changeEvent(self, event):
         if event.type() == QEvent.WindowStateChange:
@@ -372,6 +568,11 @@ class TapeciarniaApp(QMainWindow):
                     self.stop_auto_pause_process()
             except Exception as e:
                 logging.warning(f"Error stopping auto-pause process: {e}")
+            if self.metrics_server:
+                self.metrics_server.stop()
+            shutdown_thumbnail_service()
+            self.media_prober.shutdown()
+            self._stop_background_tasks()
             QApplication.processEvents()
             
             # Step 4: Save settings (90%)
@@ -452,6 +653,11 @@ class TapeciarniaApp(QMainWindow):
                     self.stop_auto_pause_process()
             except Exception as e:
                 logging.warning(f"Error stopping auto-pause process: {e}")
+            if self.metrics_server:
+                self.metrics_server.stop()
+            shutdown_thumbnail_service()
+            self.media_prober.shutdown()
+            self._stop_background_tasks()
             QApplication.processEvents()
             
             # Step 4: Save settings (90%)
@@ -759,7 +965,7 @@ class TapeciarniaApp(QMainWindow):
             return
         
         logging.info(f"Applying input string: {url}")
-        self._apply_input_string(url)
+        self.request_apply(url, "ui")
 
     def on_start_clicked(self):
 
@@ -821,7 +1027,7 @@ class TapeciarniaApp(QMainWindow):
                 try:
                     random_wallpaper = random.choice(available_files)
                     logging.info(f"Applying random wallpaper: {random_wallpaper.name}")
-                    self._apply_wallpaper_from_path(random_wallpaper)
+                    self.request_apply(random_wallpaper, "scheduler-start")
                     self._set_status(f"Scheduler started - {len(available_files)} wallpapers, changing every {interval} minutes")
                     #  upadate start button
                     self._update_start_btn()
@@ -849,9 +1055,15 @@ class TapeciarniaApp(QMainWindow):
                     ) # no need
 
             elif self.scheduler.source == str(FAVS_DIR):
-                self.config.set_scheduler_settings(enabled=True, source=source,interval=interval,range_type="mp4")
+                self.config.set_scheduler_settings(enabled=True, source=source,interval=interval,range_type="wallpaper")
                 self.scheduler.start(source,range_type, interval)
                 self._update_start_btn()
+                # Rotation runs from the local mirror; the network only refreshes it
+                self.favorites_refresh_timer.start()
+                self.sync_favorites()
+                # The scheduler loop applies the first mirrored wallpaper itself
+                if not self.scheduler._get_media_files():
+                    self._set_status("Downloading your favorites, the first wallpaper follows shortly")
 
                 
         else:
@@ -859,6 +1071,7 @@ class TapeciarniaApp(QMainWindow):
 
     def _stop_scheduler(self):
         logging.info("Stopping scheduler")
+        self.favorites_refresh_timer.stop()
         self.config.set_scheduler_settings(enabled=True,source=self.scheduler.source,interval=self.scheduler.interval_minutes,range_type=self.scheduler.range_type)
         self.scheduler.stop()
         self._update_start_btn()
@@ -1001,6 +1214,7 @@ class TapeciarniaApp(QMainWindow):
             self._update_source_buttons_active(self.scheduler.source)
             self.scheduler.set_range("wallpaper")
             self._disable_other_range()
+            self.sync_favorites()
     
     def _disable_other_range(self):
         '''
@@ -1029,7 +1243,8 @@ class TapeciarniaApp(QMainWindow):
         self._set_status("My Collection source selected")
         
         # has_favorites = FAVS_DIR.exists() and any(FAVS_DIR.iterdir())
-        has_saves = SAVES_DIR.exists() and any(SAVES_DIR.iterdir())
+        has_saves = self.collection_index.count(SAVES_DIR) > 0 if self.collection_index.is_watching(SAVES_DIR) \
+            else SAVES_DIR.exists() and any(SAVES_DIR.iterdir())
         
         if not (has_saves):
             logging.warning("Empty collection - no wallpapers found")
@@ -1220,18 +1435,16 @@ class TapeciarniaApp(QMainWindow):
         try:
             # Create progress dialog for image download
             
-            # Start download in a thread to show progress
-            self.image_download_thread = ImageDownloadThread(url)
-            self.image_download_thread.progress.connect(
-                lambda percent, status: (
-                    self._set_status(status)
-                )
+            # Queued: a second click on the same URL joins the running transfer
+            on_done = self._for_request(self._on_image_download_done)
+            self.downloads.enqueue(
+                url, None, "image",
+                on_done=on_done,
+                on_error=self._for_request(self._on_download_error),
+                on_progress=lambda percent, status: self._set_status(status),
             )
-            self.image_download_thread.error.connect(self._on_download_error)
-            self.image_download_thread.done.connect(self._on_image_download_done)
-            
-            self.image_download_thread.start()
-            logging.info("Image download thread started")
+            self.arbiter.attach_download(self._apply_generation, url, on_done)
+            logging.info("Image download queued")
             
         except Exception as e:
             logging.error(f"Image download setup failed: {e}", exc_info=True)
@@ -1262,18 +1475,15 @@ class TapeciarniaApp(QMainWindow):
             
             logging.info(f"Downloading to: {download_path}")
             
-            # Start download in a thread to avoid blocking UI
-            self.direct_download_thread = DirectDownloadThread(url, str(download_path))
-            self.direct_download_thread.progress.connect(
-                lambda percent, status: (
-                    self._set_status(status)
-                )
+            on_done = self._for_request(self._on_direct_video_download_done)
+            self.downloads.enqueue(
+                url, download_path, "direct",
+                on_done=on_done,
+                on_error=self._for_request(self._on_download_error),
+                on_progress=lambda percent, status: self._set_status(status),
             )
-            self.direct_download_thread.error.connect(self._on_download_error)
-            self.direct_download_thread.done.connect(self._on_direct_video_download_done)
-            
-            self.direct_download_thread.start()
-            logging.info("Direct download thread started")
+            self.arbiter.attach_download(self._apply_generation, url, on_done)
+            logging.info("Direct download queued")
             
         except Exception as e:
             logging.error(f"Direct download setup failed: {e}", exc_info=True)
@@ -1298,8 +1508,8 @@ class TapeciarniaApp(QMainWindow):
         return filename
 
 
-    def _validate_downloaded_file(self, path: str) -> bool:
-        """Thoroughly validate the downloaded file"""
+    def _validate_downloaded_file(self, path: str, info: dict) -> bool:
+        """Thoroughly validate the downloaded file, given its media probe"""
         if not path or not isinstance(path, str):
             logging.error("Invalid path provided")
             return False
@@ -1323,14 +1533,13 @@ class TapeciarniaApp(QMainWindow):
                 logging.error(f"Downloaded file is not readable: {path}")
                 return False
             
-            # Additional checks for video files
-            if p.suffix.lower() in ('.mp4', '.mkv', '.webm', '.avi', '.mov'):
-                # Quick check if it might be a valid video file
-                if file_size < 1024:  # Less than 1KB is suspicious for a video
-                    logging.warning(f"Video file seems too small: {file_size} bytes")
-                    # Don't fail here, just warn
+            # Headers (dimensions, codec, integrity), probed by the MediaProber
+            if not info["ok"]:
+                logging.error(f"Downloaded file failed media probe: {path} ({info['error']})")
+                return False
             
-            logging.info(f"File validation passed: {p.name} ({file_size} bytes)")
+            logging.info(f"File validation passed: {p.name} ({file_size} bytes, {info['kind']} "
+                         f"{info['width']}x{info['height']} {info['codec']})")
             return True
             
         except Exception as e:
@@ -1388,18 +1597,50 @@ class TapeciarniaApp(QMainWindow):
         else:
             self._apply_image(str(file_path))
 
-    def _apply_wallpaper_from_scheduler(self,file_path: Path=None,image_data:list[str,bytes]=None):
-        if self.scheduler.source == str(SAVES_DIR):
-            if file_path:
-                self._apply_wallpaper_from_path(file_path=file_path)
-        elif self.scheduler.source == str(FAVS_DIR):
-            if image_data:
-                path = conver_bytes_to_tmp_path(image_data.get("data"))
-                self.controller.start_image(path)
-                self._set_status(f"Applied wallpaper: {gen_name_from_url(image_data.get("url"))}")
-        else:
-            pass
-                
+    def _apply_wallpaper_from_scheduler(self,file_path: Path=None):
+        # Delivered by the event bus; collection and favorites both rotate local files
+        if file_path:
+            self.arbiter.submit(str(file_path), "scheduled", "scheduler")
+
+    def request_apply(self, target, source: str = "ui"):
+        """Ask for a wallpaper change on the user's behalf (coalesced, latest wins)"""
+        self.arbiter.submit(str(target), "manual", source)
+
+    def _dispatch_apply(self, request):
+        """Run the request the arbiter picked"""
+        self._apply_generation = request.generation
+        # Cancelled by the arbiter when a newer request supersedes this one
+        self._apply_token = request.token
+        try:
+            if request.source in ("ui", "uri"):
+                # Typed or deep-linked input: may be a URL that needs a download first
+                self._apply_input_string(request.target)
+            else:
+                self._apply_wallpaper_from_path(Path(request.target))
+        finally:
+            # Downloads and renders complete the request from their callbacks
+            if not (self.arbiter.awaiting_download(request.generation) or self.arbiter.rendering(request.generation)):
+                self.arbiter.complete(request.generation)
+
+    def _for_request(self, callback):
+        """
+        Wrap a download callback of the current apply request: once the request
+        is superseded its result is ignored, so a slow download never replaces
+        a newer wallpaper.
+        """
+        generation = self._apply_generation
+
+        def wrapper(*args):
+            if not self.arbiter.is_current(generation):
+                logging.info(f"Ignoring result of superseded apply request {generation}")
+                return
+            try:
+                callback(*args)
+            finally:
+                # A downloaded image goes on to render: that completes the request
+                if not self.arbiter.rendering(generation):
+                    self.arbiter.complete(generation)
+        return wrapper
 
     def _apply_video(self, video_path: str):
         """Apply video wallpaper"""
@@ -1408,8 +1649,8 @@ class TapeciarniaApp(QMainWindow):
             logging.info(f"Applying video wallpaper: {video_path}")
             self.controller.start_video(video_path)
             self.config.set_last_video(video_path)
-            self._set_status(f"Playing video: {Path(video_path).name}")
-            self._update_url_input(video_path)
+            self.events.publish("applied", {"path": video_path, "status": f"Playing video: {Path(video_path).name}"},
+                                source="video")
             logging.info(f"Video wallpaper applied successfully: {Path(video_path).name}")
             self.set_buttons(True)
         except Exception as e:
@@ -1418,45 +1659,71 @@ class TapeciarniaApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to play video: {e}") #
 
     def _apply_image(self, image_path: str):
-        """Apply image wallpaper with fade effect - FIXED for null pixmap"""
+        """Apply image wallpaper: rendered on a worker, applied here if still wanted"""
+        token = self._apply_token or CancelToken()
+        if token.cancelled:
+            return                  # superseded already
         try:
             self.set_buttons(False)
-            logging.info(f"Applying image wallpaper with fade: {image_path}")
+            logging.info(f"Applying image wallpaper: {image_path}")
             
             # Check if image file exists and is valid
             if not os.path.exists(image_path):
                 logging.error(f"Image file does not exist: {image_path}")
                 raise FileNotFoundError(f"Image file not found: {image_path}")
             
-            # Load the new pixmap first
-            new_pix = QPixmap(image_path)
-            if new_pix.isNull():
-                logging.error(f"Failed to load image: {image_path}")
+            # Validate from the header only, no full-size decode
+            reader = QImageReader(image_path)
+            if not reader.canRead():
+                logging.error(f"Failed to load image: {image_path} ({reader.errorString()})")
                 raise ValueError(f"Invalid image file: {image_path}")
             
-            
-            # Apply wallpaper
-            self.controller.start_image(image_path)
+            generation = self._apply_generation
+            span = self.metrics.start_span("apply")
+
+            # The display layout comes from Qt: read it here, render on the interactive lane
+            task = ImageRenderTask(self.controller, image_path, get_display_layout(), token, span, parent=self)
+            task.rendered.connect(lambda rendered: self._on_image_rendered(generation, image_path, rendered, span))
+            task.failed.connect(lambda error: self._on_image_render_failed(generation, image_path, error, span))
+            task.finished.connect(task.deleteLater)
+            self.arbiter.attach_render(generation)
+            task.start()
+
+        except Exception as e:
+            self.set_buttons(True)
+            logging.error(f"Image apply failed: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to apply image: {e}") #
+
+    def _on_image_rendered(self, generation: int, image_path: str, rendered, span):
+        # Decided on this thread, like the arbiter: a stale render never reaches the desktop
+        if not self.arbiter.is_current(generation):
+            logging.info(f"Dropping render of {Path(image_path).name}: a newer wallpaper was requested")
+            return
+        try:
+            with self.metrics.use_span(span):
+                applied = self.controller.apply_rendered(rendered)
+            self.metrics.finish_span(span, ok=applied, detail=None if applied else "not accepted by the desktop")
+            if not applied:
+                raise RuntimeError(f"The desktop did not accept {Path(image_path).name}")
+
             self.config.set_last_video(image_path)
-            
-            self._set_status(f"Image applied: {Path(image_path).name}")
-            self._update_url_input(image_path)
+            self.events.publish("applied", {"path": image_path, "status": f"Image applied: {Path(image_path).name}"},
+                                source="image")
             logging.info(f"Image wallpaper applied: {Path(image_path).name}")
-            self.set_buttons(True)
-            
         except Exception as e:
-            logging.error(f"Fade apply failed: {e}", exc_info=True)
-            # Fallback to direct application without fade
-            try:
-                self.set_buttons(True)
-                logging.info("Attempting direct image application without fade")
-                self.controller.start_image(image_path)
-                self.config.set_last_video(image_path)
-                self._set_status(f"Image applied (no fade): {Path(image_path).name}")
-                self._update_url_input(image_path)
-            except Exception as fallback_error:
-                logging.error(f"Fallback image application also failed: {fallback_error}")
-                QMessageBox.critical(self, "Error", f"Failed to apply image: {fallback_error}") #
+            logging.error(f"Image apply failed: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to apply image: {e}") #
+        finally:
+            self.set_buttons(True)
+            self.arbiter.complete(generation)
+
+    def _on_image_render_failed(self, generation: int, image_path: str, error: str, span):
+        if not self.arbiter.is_current(generation):
+            return
+        self.metrics.finish_span(span, ok=False, detail=error)
+        self.set_buttons(True)
+        self.arbiter.complete(generation)
+        QMessageBox.critical(self, "Error", f"Failed to apply image: {error}") #
 
     # Utility methods - FIXED: Proper media type separation
     def _get_media_files(self, media_type="all"):
@@ -1491,7 +1758,11 @@ class TapeciarniaApp(QMainWindow):
             extensions = ('.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mkv', '.webm', '.avi', '.mov')
         
         for folder in search_folders:
-            if folder.exists():
+            if self.collection_index.is_watching(folder):
+                folder_files = self.collection_index.files(folder, extensions)
+                files.extend(folder_files)
+                logging.debug(f"Found {len(folder_files)} indexed files in {folder}")
+            elif folder.exists():
                 folder_files = [
                     f for f in folder.iterdir() 
                     if f.is_file() and f.suffix.lower() in extensions
@@ -1602,24 +1873,12 @@ class TapeciarniaApp(QMainWindow):
             filename = f"{url.split("/")[-1]}"
             download_path = dest_folder / filename
             
-            # Start download thread
-            if is_animated:
-                self.download_thread = DirectDownloadThread(url, str(download_path))
-            else:
-                self.download_thread = ImageDownloadThread(url, str(download_path))
-            
-            # Connect signals
-            self.download_thread.progress.connect(
-                lambda percent, status: (
-                    self._set_status(status)
-                )
+            self.downloads.enqueue(
+                url, download_path, "direct" if is_animated else "image",
+                on_done=lambda path: self._on_online_download_done(path, is_animated),
+                on_error=self._on_online_download_error,
+                on_progress=lambda percent, status: self._set_status(status),
             )
-            self.download_thread.error.connect(self._on_online_download_error)
-            self.download_thread.done.connect(
-                lambda path: self._on_online_download_done(path, is_animated)
-            )
-            
-            self.download_thread.start()
             logging.info("Online wallpaper download started")
             
         except Exception as e:
@@ -1635,8 +1894,18 @@ class TapeciarniaApp(QMainWindow):
         self.set_buttons(True)        
         # Close progress dialog
         
+        # Probing can take ffprobe's full timeout: validate once the prober answers
+        self._awaiting_probe[str(Path(file_path))] = is_animated
+        self.media_prober.request(file_path)
+
+    def _on_download_probed(self, file_path: str, info: dict):
+        """Continue an online download once its media probe is in (GUI thread)"""
+        is_animated = self._awaiting_probe.pop(file_path, None)
+        if is_animated is None:
+            return                  # a collection file, not one of our downloads
+
         # Validate downloaded file
-        if not self._validate_downloaded_file(file_path):
+        if not self._validate_downloaded_file(file_path, info):
             logging.error("Online wallpaper download validation failed")
             self._fallback_to_local_shuffle(is_animated)
             return
@@ -1648,7 +1917,7 @@ class TapeciarniaApp(QMainWindow):
         # Set as wallpaper immediately (no confirmation for online shuffle)
         try:
             logging.info(f"Setting online wallpaper: {file_path}")
-            self._apply_wallpaper_from_path(Path(file_path))
+            self.request_apply(file_path, "shuffle")
             self._set_status(f"Online {'animated' if is_animated else 'static'} wallpaper set")
             
             
@@ -1713,7 +1982,7 @@ class TapeciarniaApp(QMainWindow):
         
         selected = random.choice(video_files)
         logging.info(f"Selected local animated wallpaper: {selected.name}")
-        self._apply_wallpaper_from_path(selected)
+        self.request_apply(selected, "shuffle")
         self._update_url_input(str(selected))
         self._update_shuffle_button_states(None)
 
@@ -1741,7 +2010,7 @@ class TapeciarniaApp(QMainWindow):
         
         selected = random.choice(image_files)
         logging.info(f"Selected local static wallpaper: {selected.name}")
-        self._apply_wallpaper_from_path(selected)
+        self.request_apply(selected, "shuffle")
         self._update_url_input(str(selected))
         self._update_shuffle_button_states(None)
 
@@ -1842,12 +2111,20 @@ class TapeciarniaApp(QMainWindow):
         
         hide_action = QAction("Hide to Tray", self)
         hide_action.triggered.connect(self.hide_to_tray)
+
+        browse_action = QAction("Browse Collection", self)
+        browse_action.triggered.connect(self.show_collection_browser)
+
+        diagnostics_action = QAction("Diagnostics", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
         
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self._exit_app)
         
         tray_menu.addAction(show_action)
         tray_menu.addAction(hide_action)
+        tray_menu.addAction(browse_action)
+        tray_menu.addAction(diagnostics_action)
         tray_menu.addSeparator()
         tray_menu.addAction(exit_action)
         
@@ -1896,7 +2173,9 @@ class TapeciarniaApp(QMainWindow):
                 }
 
                 logging.debug(payload)
-                login = LoginWorker(url=url, payload=payload,method="GET")
+                # Kept on self: the worker must outlive this method until its signals are delivered
+                self.login_worker = LoginWorker(url=url, payload=payload,method="GET", parent=self)
+                login = self.login_worker
                 login.success.connect(self._on_login_success)
                 login.failed.connect(lambda e: self._on_login_failed(data=e,login_worker=login))
                 self._set_status("Logging in...")
@@ -1934,6 +2213,7 @@ class TapeciarniaApp(QMainWindow):
             self.config.set_login_key(data.get("key"))
             self.config.set_login(data.get("login"))
             self._set_status("Login successfull")
+            self.sync_favorites()
             QMessageBox.information(
                 self,
                 "Log in successfull",
@@ -2062,7 +2342,7 @@ class TapeciarniaApp(QMainWindow):
                         try:
                             self.ui.urlInput.setText(wallpaper_url)
                             self._set_status("Applying wallpaper from URI...")
-                            self._apply_input_string(wallpaper_url)
+                            self.request_apply(wallpaper_url, "uri")
                         except Exception as e:
                             logging.error(f"Failed to apply wallpaper from URI: {e}", exc_info=True)
                             QMessageBox.critical(self, "Error", f"Failed to apply wallpaper: {e}") #
@@ -2106,7 +2386,7 @@ class TapeciarniaApp(QMainWindow):
                         try:
                             self.ui.urlInput.setText(wallpaper_url)
                             self._set_status("Applying wallpaper from URI...")
-                            self._apply_input_string(wallpaper_url)
+                            self.request_apply(wallpaper_url, "uri")
                         except Exception as e:
                             logging.error(f"Failed to apply wallpaper from URI: {e}", exc_info=True)
                             QMessageBox.critical(self, "Error", f"Failed to apply wallpaper: {e}") #
@@ -2144,7 +2424,7 @@ class TapeciarniaApp(QMainWindow):
                         try:
                             self.ui.urlInput.setText(wallpaper_url)
                             self._set_status("Applying static wallpaper from URI...")
-                            self._apply_input_string(wallpaper_url)
+                            self.request_apply(wallpaper_url, "uri")
                         except Exception as e:
                             logging.error(f"Failed to apply wallpaper from URI: {e}", exc_info=True)
                             QMessageBox.critical(self, "Error", f"Failed to apply wallpaper: {e}") #
@@ -2210,7 +2490,7 @@ class TapeciarniaApp(QMainWindow):
                         try:
                             self.ui.urlInput.setText(f"tapeciarnia:{image_id}")
                             self._set_status("Applying static wallpaper from URI...")
-                            self._apply_input_string(wallpaper_url)
+                            self.request_apply(wallpaper_url, "uri")
                         except Exception as e:
                             logging.error(f"Failed to apply wallpaper from URI: {e}", exc_info=True)
                             # QMessageBox.critical(self, "Error", f"Failed to apply wallpaper: {e}")
@@ -7,6 +7,7 @@ from PySide6.QtCore import Qt, QTimer
 
 from utils.path_utils import SAVES_DIR
 from utils.singletons import get_config
+from core.batch_importer import is_archive
 import logging
 from pathlib import Path
 import os
@@ -191,8 +192,8 @@ class EnhancedDragDropWidget(QWidget):
             if urls:
                 file_path = urls[0].toLocalFile()
                 
-                # Check if it's a valid wallpaper file type
-                if self.is_valid_wallpaper_file(file_path):
+                # Check if it's a valid wallpaper file type (or something to batch import)
+                if self.is_valid_wallpaper_file(file_path) or self.is_batch_drop(urls):
                     event.acceptProposedAction()
                     
                     # Visual feedback that this area accepts drops
@@ -222,6 +223,13 @@ class EnhancedDragDropWidget(QWidget):
         self.setStyleSheet("")
         
         urls = event.mimeData().urls()
+        if urls and self.is_batch_drop(urls):
+            paths = [url.toLocalFile() for url in urls if url.toLocalFile()]
+            logging.info(f"Batch drop of {len(paths)} item(s) in drag & drop area")
+            self.parent_app.import_paths(paths)
+            event.acceptProposedAction()
+            return
+
         if urls:
             file_path = urls[0].toLocalFile()
             logging.info(f"File dropped in drag & drop area: {file_path}")
@@ -271,13 +279,9 @@ class EnhancedDragDropWidget(QWidget):
                 if hasattr(self.parent_app, 'ui') and hasattr(self.parent_app.ui, 'urlInput'):
                     self.parent_app.ui.urlInput.setText(self.destination_path)
                 
-                # Apply the wallpaper
-                if self.is_video_file(self.destination_path):
-                    logging.info(f"Setting video wallpaper: {self.destination_path}")
-                    self.parent_app.controller.start_video(self.destination_path)
-                else:
-                    logging.info(f"Setting image wallpaper: {self.destination_path}")
-                    self.parent_app.controller.start_image(self.destination_path)
+                # Apply the wallpaper (through the arbiter, like every other source)
+                logging.info(f"Setting wallpaper: {self.destination_path}")
+                self.parent_app.request_apply(self.destination_path, "drop")
                 
                 # Show success message
                 self.upload_text.setText("Wallpaper set successfully!")
@@ -360,6 +364,13 @@ class EnhancedDragDropWidget(QWidget):
             logging.error(f"Could not get current wallpaper: {e}", exc_info=True)
         return None
     
+    def is_batch_drop(self, urls) -> bool:
+        """Several items, a folder or an archive go through the batch importer"""
+        if len(urls) > 1:
+            return True
+        file_path = urls[0].toLocalFile()
+        return bool(file_path) and (os.path.isdir(file_path) or is_archive(file_path))
+
     def is_valid_wallpaper_file(self, file_path):
         """Check if file is a valid wallpaper type with comprehensive validation"""
         valid_extensions = self.config.get_all_valid_extensions()
@@ -0,0 +1,214 @@
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from utils.metrics import get_metrics
+
+
+# interactive = the user is waiting for it (pasted URL, drag & drop)
+# prefetch    = speculative downloads ahead of need
+# sync        = background mirroring (favorites)
+TRAFFIC_CLASSES = ("interactive", "prefetch", "sync")
+BACKGROUND_CLASSES = ("prefetch", "sync")
+
+# Window for the live throughput figures
+STATS_WINDOW = 5.0
+# How long the metered state is trusted before asking again
+METERED_TTL = 30.0
+
+# NetworkManager NMMetered: 1 = yes, 3 = guess-yes
+NM_METERED_VALUES = (1, 3)
+
+
+class TokenBucket:
+    """
+    Byte-rate limiter: `rate` bytes per second, bursts up to `burst` bytes.
+    A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate: float = 0, burst: float = None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: float = None):
+        with self._lock:
+            self.rate = max(0.0, float(rate or 0))
+            # One second worth of data by default, never less than a typical chunk
+            self.burst = float(burst or max(self.rate, 64 * 1024))
+            self._tokens = self.burst
+            self._stamp = time.monotonic()
+
+    def consume(self, amount: int, cancelled: threading.Event = None):
+        """Block until `amount` bytes may pass"""
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                # A chunk bigger than the burst may go once the bucket is full
+                need = min(amount, self.burst)
+                if self._tokens >= need:
+                    self._tokens -= amount
+                    return
+                delay = (need - self._tokens) / self.rate
+            if cancelled is not None:
+                if cancelled.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+
+
+class BandwidthManager:
+    """
+    Shared by every downloader. Each traffic class has its own token bucket;
+    while any interactive transfer runs, background transfers (prefetch, sync)
+    pause between chunks so the user's download gets the whole link.
+
+    Downloaders wrap a transfer in `transfer(cls)` and call `throttle(cls, n)`
+    after every chunk of n bytes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.buckets = {cls: TokenBucket() for cls in TRAFFIC_CLASSES}
+        self._active = {cls: 0 for cls in TRAFFIC_CLASSES}
+        self._totals = {cls: 0 for cls in TRAFFIC_CLASSES}
+        self._recent = {cls: deque() for cls in TRAFFIC_CLASSES}     # (time, bytes)
+        self.pause_background_on_metered = True
+        self._metered = None
+        self._metered_checked = 0.0
+        self._last_publish = 0.0
+
+    def configure(self, limits_kbps: dict = None, pause_background_on_metered: bool = True):
+        """Apply per-class limits in KB/s (0 = unlimited)"""
+        for cls, kbps in (limits_kbps or {}).items():
+            if cls in self.buckets:
+                self.buckets[cls].set_rate(int(kbps) * 1024)
+        self.pause_background_on_metered = pause_background_on_metered
+        logging.info(f"Bandwidth limits (KB/s): { {c: int(b.rate / 1024) for c, b in self.buckets.items()} }")
+
+    # -------------------------------------------------------------------
+    # TRANSFERS
+    # -------------------------------------------------------------------
+    @contextmanager
+    def transfer(self, cls: str):
+        with self._cond:
+            self._active[cls] += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._active[cls] -= 1
+                self._cond.notify_all()
+
+    def throttle(self, cls: str, nbytes: int, cancelled: threading.Event = None):
+        """Account a chunk, then wait as long as its class has to"""
+        now = time.monotonic()
+        with self._cond:
+            self._totals[cls] += nbytes
+            self._recent[cls].append((now, nbytes))
+
+        if cls in BACKGROUND_CLASSES:
+            self._wait_for_interactive(cancelled)
+        self.buckets[cls].consume(nbytes, cancelled)
+
+        if now - self._last_publish > 1.0:
+            self._last_publish = now
+            self._publish()
+
+    def _wait_for_interactive(self, cancelled: threading.Event = None):
+        with self._cond:
+            if self._active["interactive"]:
+                get_metrics().inc("bandwidth_preemptions_total")
+            # Short waits so a cancelled background job notices promptly
+            while self._active["interactive"] and not (cancelled and cancelled.is_set()):
+                self._cond.wait(0.25)
+
+    def allow_background(self) -> bool:
+        """Should background traffic start now? False on a metered connection (if so configured)"""
+        return not (self.pause_background_on_metered and self.is_metered())
+
+    # -------------------------------------------------------------------
+    # METERED CONNECTIONS
+    # -------------------------------------------------------------------
+    def is_metered(self) -> bool:
+        now = time.monotonic()
+        if self._metered is None or now - self._metered_checked > METERED_TTL:
+            self._metered = detect_metered()
+            self._metered_checked = now
+            get_metrics().set_gauge("network_metered", int(self._metered))
+        return self._metered
+
+    # -------------------------------------------------------------------
+    # STATS
+    # -------------------------------------------------------------------
+    def stats(self) -> dict:
+        now = time.monotonic()
+        result = {}
+        with self._cond:
+            for cls in TRAFFIC_CLASSES:
+                recent = self._recent[cls]
+                while recent and now - recent[0][0] > STATS_WINDOW:
+                    recent.popleft()
+                result[cls] = {
+                    "active": self._active[cls],
+                    "bytes_per_second": sum(n for _, n in recent) / STATS_WINDOW,
+                    "total_bytes": self._totals[cls],
+                    "limit_bytes_per_second": self.buckets[cls].rate,
+                }
+        return result
+
+    def _publish(self):
+        metrics = get_metrics()
+        for cls, stat in self.stats().items():
+            metrics.set_gauge(f"bandwidth_{cls}_bytes_per_second", round(stat["bytes_per_second"]))
+            metrics.set_gauge(f"bandwidth_{cls}_active", stat["active"])
+
+
+def detect_metered() -> bool:
+    """
+    Is the primary connection metered? Asks NetworkManager over D-Bus on Linux,
+    Qt's network information backend elsewhere. Unknown counts as not metered.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            from PySide6.QtDBus import QDBusConnection, QDBusInterface
+
+            nm = QDBusInterface(
+                "org.freedesktop.NetworkManager",
+                "/org/freedesktop/NetworkManager",
+                "org.freedesktop.NetworkManager",
+                QDBusConnection.systemBus(),
+            )
+            if nm.isValid():
+                value = nm.property("Metered")
+                if value is not None:
+                    return int(value) in NM_METERED_VALUES
+        except Exception as e:
+            logging.debug(f"NetworkManager metered check failed: {e}")
+
+    try:
+        from PySide6.QtNetwork import QNetworkInformation
+
+        if QNetworkInformation.instance() is None:
+            QNetworkInformation.loadDefaultBackend()
+        info = QNetworkInformation.instance()
+        if info is not None:
+            return bool(info.isMetered())
+    except Exception as e:
+        logging.debug(f"Qt metered check failed: {e}")
+    return False
+
+
+_bandwidth_instance: BandwidthManager | None = None
+
+def get_bandwidth() -> BandwidthManager:
+    global _bandwidth_instance
+    if _bandwidth_instance is None:
+        _bandwidth_instance = BandwidthManager()
+    return _bandwidth_instance
@@ -0,0 +1,104 @@
+import time
+import socket
+import logging
+import threading
+
+from utils.metrics import get_metrics
+
+
+class OperationCancelled(Exception):
+    """Raised inside an operation once its CancelToken was cancelled"""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one operation (a download, an extraction, a
+    render). The owner calls cancel(); the operation checks raise_if_cancelled()
+    at its safe points. Callbacks registered with on_cancel() run at once on
+    the cancelling thread, which is how blocking I/O is interrupted (see
+    abort_response).
+
+    Also usable where a threading.Event is expected (is_set / wait), e.g. by
+    the bandwidth manager.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled_at = None            # perf_counter() of cancel()
+        self.reported = False
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.debug(f"Cancel callback failed: {e}")
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled()
+
+    def on_cancel(self, callback):
+        """Run callback when cancelled (right away if already); returns a function that unregisters it"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def report(self, operation: str):
+        """Record how long the operation took to stop after cancel() (once per token)"""
+        if self.cancelled_at is None or self.reported:
+            return
+        self.reported = True
+        elapsed = time.perf_counter() - self.cancelled_at
+        metrics = get_metrics()
+        metrics.inc("cancellations_total")
+        metrics.observe(f"time_to_cancel_{operation}", elapsed)
+        logging.info(f"{operation} stopped {elapsed * 1000:.0f} ms after cancel")
+
+
+def abort_response(response):
+    """
+    Stop a streaming `requests` response from another thread. close() alone
+    does not wake a reader blocked in recv() (it waits for the read timeout);
+    shutting the socket down does, at once, and frees the connection.
+    """
+    raw = getattr(response, "raw", None)
+    connection = getattr(raw, "_connection", None) or getattr(raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        # The connection is detached while the body streams: reach the socket through the file object
+        fp = getattr(getattr(raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass                # already closed
@@ -0,0 +1,121 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+
+from utils.path_utils import CACHE_DIR
+
+
+CATALOG_FILE = CACHE_DIR / "catalog.json"
+CATALOG_VERSION = 1
+
+
+class MediaCatalog:
+    """
+    Persistent per-file facts that are expensive to recompute (smart-crop focus,
+    dimensions, duration...).
+
+    Entries are keyed by resolved path and remember the file's mtime and size;
+    an entry whose file has changed since is treated as missing. Updates stay
+    in memory until save() is called, so callers save once after a batch.
+    """
+
+    def __init__(self, path: Path = CATALOG_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def _key(path) -> str:
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def _stamp(path) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Media catalog unreadable, starting empty: {e}")
+            return
+        if data.get("version") != CATALOG_VERSION:
+            logging.info("Media catalog version changed, starting empty")
+            return
+        with self._lock:
+            self._entries = data.get("entries", {})
+        logging.debug(f"Media catalog loaded: {len(self._entries)} entries")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": CATALOG_VERSION, "entries": self._entries})
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save media catalog: {e}")
+
+    def get(self, path) -> dict | None:
+        """Return the entry for `path`, or None when missing or stale"""
+        stamp = self._stamp(path)
+        if stamp is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+        if not entry or (entry.get("mtime_ns"), entry.get("size")) != stamp:
+            return None
+        return dict(entry)
+
+    def peek(self, resolved_path: str) -> dict | None:
+        """
+        In-memory lookup without touching the disk: no resolve(), no stat().
+        For hot paths fed by the collection index, whose paths are already resolved.
+        """
+        with self._lock:
+            return self._entries.get(str(resolved_path))
+
+    def update(self, path, **fields):
+        """Merge `fields` into the entry for `path` (a stale entry is replaced)"""
+        stamp = self._stamp(path)
+        if stamp is None:
+            return
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or (entry.get("mtime_ns"), entry.get("size")) != stamp:
+                entry = {"mtime_ns": stamp[0], "size": stamp[1]}
+            entry.update(fields)
+            self._entries[key] = entry
+            self._dirty = True
+
+    def remove(self, path):
+        with self._lock:
+            if self._entries.pop(self._key(path), None) is not None:
+                self._dirty = True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_catalog_instance: MediaCatalog | None = None
+
+def get_catalog() -> MediaCatalog:
+    global _catalog_instance
+    if _catalog_instance is None:
+        _catalog_instance = MediaCatalog()
+    return _catalog_instance
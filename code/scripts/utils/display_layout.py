@@ -0,0 +1,199 @@
+import logging
+import threading
+from typing import Optional
+
+
+# Used when neither screeninfo nor Qt can tell us anything
+FALLBACK_SIZE = (1920, 1080)
+
+
+class Display:
+    """
+    One physical monitor in virtual-desktop coordinates.
+
+    x, y, width and height are in device pixels (what the wallpaper image must
+    cover), scale is Qt's devicePixelRatio for that screen.
+    """
+
+    def __init__(self, name: str, x: int, y: int, width: int, height: int,
+                 is_primary: bool = False, scale: float = 1.0, dpi: float = 96.0,
+                 width_mm: Optional[int] = None, height_mm: Optional[int] = None):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.is_primary = is_primary
+        self.scale = scale
+        self.dpi = dpi
+        self.width_mm = width_mm
+        self.height_mm = height_mm
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def aspect(self) -> float:
+        return self.width / self.height if self.height else 1.0
+
+    @property
+    def orientation(self) -> str:
+        return "portrait" if self.height > self.width else "landscape"
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name, "x": self.x, "y": self.y,
+            "width": self.width, "height": self.height,
+            "is_primary": self.is_primary, "scale": self.scale, "dpi": self.dpi,
+            "orientation": self.orientation,
+        }
+
+    def __repr__(self):
+        primary = " primary" if self.is_primary else ""
+        return f"<Display {self.name} {self.width}x{self.height}+{self.x}+{self.y} @{self.scale}x {self.orientation}{primary}>"
+
+
+# -------------------------------------------------------------------
+# DETECTION
+# -------------------------------------------------------------------
+def _qt_screens() -> list:
+    try:
+        from PySide6.QtGui import QGuiApplication
+        if not QGuiApplication.instance():
+            return []
+        return list(QGuiApplication.screens())
+    except Exception as e:
+        logging.debug(f"QScreen information unavailable: {e}")
+        return []
+
+def _match_qt_screen(monitor, screens: list):
+    """Find the QScreen describing the same output as a screeninfo monitor"""
+    for screen in screens:
+        if monitor.name and screen.name() and monitor.name.strip("\\.") == screen.name().strip("\\."):
+            return screen
+    for screen in screens:
+        geo = screen.geometry()
+        dpr = screen.devicePixelRatio() or 1.0
+        # Qt geometry is in logical pixels, screeninfo in device pixels
+        if (round(geo.x() * dpr), round(geo.y() * dpr)) == (monitor.x, monitor.y):
+            return screen
+    return None
+
+def _from_screeninfo(screens: list) -> list[Display]:
+    from screeninfo import get_monitors
+
+    displays = []
+    for index, m in enumerate(get_monitors()):
+        screen = _match_qt_screen(m, screens)
+        scale = screen.devicePixelRatio() if screen else 1.0
+        dpi = screen.physicalDotsPerInch() if screen else 96.0
+        displays.append(Display(
+            name=m.name or f"display{index}",
+            x=m.x, y=m.y, width=m.width, height=m.height,
+            is_primary=bool(getattr(m, "is_primary", False)),
+            scale=scale, dpi=dpi,
+            width_mm=getattr(m, "width_mm", None), height_mm=getattr(m, "height_mm", None),
+        ))
+    return displays
+
+def _from_qt(screens: list) -> list[Display]:
+    from PySide6.QtGui import QGuiApplication
+
+    primary = QGuiApplication.primaryScreen()
+    displays = []
+    for index, screen in enumerate(screens):
+        geo = screen.geometry()
+        dpr = screen.devicePixelRatio() or 1.0
+        physical = screen.physicalSize()
+        displays.append(Display(
+            name=screen.name() or f"display{index}",
+            x=round(geo.x() * dpr), y=round(geo.y() * dpr),
+            width=round(geo.width() * dpr), height=round(geo.height() * dpr),
+            is_primary=screen is primary,
+            scale=dpr, dpi=screen.physicalDotsPerInch(),
+            width_mm=round(physical.width()), height_mm=round(physical.height()),
+        ))
+    return displays
+
+def detect_display_layout() -> list[Display]:
+    """Query screeninfo (device pixels) enriched with QScreen DPI/scale, falling back to Qt alone."""
+    screens = _qt_screens()
+    displays = []
+
+    try:
+        displays = _from_screeninfo(screens)
+    except Exception as e:
+        logging.debug(f"screeninfo unavailable, using Qt screens: {e}")
+
+    if not displays and screens:
+        try:
+            displays = _from_qt(screens)
+        except Exception as e:
+            logging.error(f"Failed to read Qt screens: {e}")
+
+    if not displays:
+        logging.warning("No displays detected. Using fallback layout.")
+        displays = [Display("fallback", 0, 0, *FALLBACK_SIZE, is_primary=True)]
+
+    if not any(d.is_primary for d in displays):
+        # screeninfo does not report the primary flag on every platform
+        origin = next((d for d in displays if (d.x, d.y) == (0, 0)), displays[0])
+        origin.is_primary = True
+
+    logging.info(f"Display layout detected: {displays}")
+    return displays
+
+
+_layout_cache: list[Display] | None = None
+_layout_lock = threading.Lock()
+
+def get_display_layout(refresh: bool = False) -> list[Display]:
+    """Cached display layout. Call invalidate_display_layout() when screens change."""
+    global _layout_cache
+    with _layout_lock:
+        if _layout_cache is None or refresh:
+            _layout_cache = detect_display_layout()
+        return list(_layout_cache)
+
+def invalidate_display_layout(*_):
+    global _layout_cache
+    with _layout_lock:
+        _layout_cache = None
+    logging.debug("Display layout cache invalidated")
+
+def watch_screen_changes():
+    """Drop the cached layout whenever Qt reports a screen being added, removed or resized."""
+    try:
+        from PySide6.QtGui import QGuiApplication
+        app = QGuiApplication.instance()
+        if not app:
+            return
+
+        def connect(screen):
+            screen.geometryChanged.connect(invalidate_display_layout)
+            screen.logicalDotsPerInchChanged.connect(invalidate_display_layout)
+
+        for screen in app.screens():
+            connect(screen)
+        app.screenAdded.connect(lambda screen: (connect(screen), invalidate_display_layout()))
+        app.screenRemoved.connect(invalidate_display_layout)
+        app.primaryScreenChanged.connect(invalidate_display_layout)
+    except Exception as e:
+        logging.warning(f"Could not watch screen changes: {e}")
+
+
+# -------------------------------------------------------------------
+# HELPERS
+# -------------------------------------------------------------------
+def get_primary_display(displays: list[Display] = None) -> Display:
+    displays = displays or get_display_layout()
+    return next((d for d in displays if d.is_primary), displays[0])
+
+def layout_bounds(displays: list[Display]) -> tuple[int, int, int, int]:
+    """Bounding box of the whole virtual desktop: (min_x, min_y, width, height)"""
+    min_x = min(d.x for d in displays)
+    min_y = min(d.y for d in displays)
+    max_x = max(d.x + d.width for d in displays)
+    max_y = max(d.y + d.height for d in displays)
+    return min_x, min_y, max_x - min_x, max_y - min_y
@@ -0,0 +1,593 @@
+import os
+import json
+import shlex
+import shutil
+import socket
+import struct
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+from utils.metrics import get_metrics
+from utils.cancellation import CancelToken
+from utils.process_supervisor import get_process_supervisor
+
+
+# Fit mode (see wallpaper_render.FIT_MODES) -> each desktop's own scaling option.
+# The desktop scales the image itself; "smart" crop has no equivalent and fills.
+GNOME_PICTURE_OPTIONS = {"fill": "zoom", "fit": "scaled", "center": "centered", "smart": "zoom"}
+KDE_FILL_MODES = {"fill": 2, "fit": 1, "center": 6, "smart": 2}          # Qt Image.FillMode values
+XFCE_IMAGE_STYLES = {"fill": 5, "fit": 4, "center": 1, "smart": 5}       # zoomed / scaled / centered
+SWAY_BG_MODES = {"fill": "fill", "fit": "fit", "center": "center", "smart": "fill"}
+FEH_BG_OPTIONS = {"fill": "--bg-fill", "fit": "--bg-max", "center": "--bg-center", "smart": "--bg-fill"}
+
+DBUS_TIMEOUT_MS = 5000
+SPAWN_TIMEOUT = 5
+
+
+# -------------------------------------------------------------------
+# HELPERS
+# -------------------------------------------------------------------
+_gio_modules = None
+
+def _gio():
+    """(Gio, GLib) from PyGObject, or None when it is not installed (imported once, on first use)"""
+    global _gio_modules
+    if _gio_modules is None:
+        try:
+            import gi
+            gi.require_version("Gio", "2.0")
+            from gi.repository import Gio, GLib
+            _gio_modules = (Gio, GLib)
+        except (ImportError, ValueError) as e:
+            logging.debug(f"PyGObject not available, desktop settings fall back to command line tools: {e}")
+            _gio_modules = False
+    return _gio_modules or None
+
+
+def _dbus_call(bus_name: str, object_path: str, interface: str, method: str, signature: str = None, args=()):
+    """Synchronous call on the session bus through GIO; returns the unpacked reply tuple"""
+    Gio, GLib = _gio()
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    parameters = GLib.Variant(f"({signature})", tuple(args)) if signature else None
+    reply = connection.call_sync(bus_name, object_path, interface, method, parameters,
+                                 None, Gio.DBusCallFlags.NONE, DBUS_TIMEOUT_MS, None)
+    return reply.unpack() if reply is not None else ()
+
+
+def _spawn(args: list[str]) -> subprocess.CompletedProcess:
+    """Run a desktop tool; counted so in-process backends can be told apart in the metrics"""
+    get_metrics().inc("wallpaper_spawns_total")
+    return subprocess.run(args, capture_output=True, text=True, timeout=SPAWN_TIMEOUT)
+
+
+def _desktop_tokens() -> set[str]:
+    """Lower-case names from XDG_CURRENT_DESKTOP (colon separated) and DESKTOP_SESSION"""
+    names = os.environ.get("XDG_CURRENT_DESKTOP", "").split(":") + [os.environ.get("DESKTOP_SESSION", "")]
+    return {name.strip().lower() for name in names if name.strip()}
+
+
+def _file_uri(path: Path) -> str:
+    return Path(path).resolve().as_uri()
+
+
+def _path_from_uri(value: str) -> Optional[str]:
+    value = (value or "").strip().strip("'\"")
+    if value.startswith("file://"):
+        from urllib.parse import unquote, urlparse
+        return unquote(urlparse(value).path)
+    return value or None
+
+
+# -------------------------------------------------------------------
+# BACKENDS
+# -------------------------------------------------------------------
+class DesktopBackend:
+    """
+    Sets and reads the wallpaper of one kind of Linux desktop.
+
+    detect() only looks at the environment and PATH (cheap, no D-Bus round
+    trip); the chosen backend is cached by get_desktop_backend(). set_wallpaper()
+    returns False on failure and logs why, like set_static_desktop_wallpaper.
+    Backends that render split it in two: render() (any thread, cancellable
+    through `token`) and show() (puts a render up).
+    """
+
+    name = "generic"
+    # Whether per_display images are honoured (others use the main image everywhere)
+    per_display = False
+    # Whether the backend renders the image itself (render() + show())
+    renders = False
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        raise NotImplementedError
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        raise NotImplementedError
+
+    def get_wallpaper(self) -> Optional[str]:
+        return None
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class GSettingsBackend(DesktopBackend):
+    """
+    GNOME (and its relatives) through GSettings. With PyGObject the keys are
+    written in-process (dconf, no gsettings process per apply); without it the
+    gsettings tool is used. picture-uri-dark is set too where the schema has it,
+    so the wallpaper also changes in dark mode.
+    """
+
+    name = "gnome"
+    schema = "org.gnome.desktop.background"
+    desktops = {"gnome", "gnome-classic", "gnome-flashback", "ubuntu", "unity", "budgie", "budgie-desktop",
+                "pantheon", "pop", "zorin"}
+
+    def __init__(self):
+        self._settings = None
+        gio = _gio()
+        if gio:
+            Gio, _ = gio
+            source = Gio.SettingsSchemaSource.get_default()
+            if source is not None and source.lookup(self.schema, True) is not None:
+                self._settings = Gio.Settings.new(self.schema)
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return bool(desktops & cls.desktops) and cls.installed()
+
+    @classmethod
+    def installed(cls) -> bool:
+        gio = _gio()
+        if gio:
+            source = gio[0].SettingsSchemaSource.get_default()
+            return source is not None and source.lookup(cls.schema, True) is not None
+        return shutil.which("gsettings") is not None
+
+    def _has_key(self, key: str) -> bool:
+        return self._settings.props.settings_schema.has_key(key)
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        uri = _file_uri(path)
+        option = GNOME_PICTURE_OPTIONS.get(fit_mode, "zoom")
+
+        if self._settings is not None:
+            Gio, _ = _gio()
+            try:
+                self._settings.set_string("picture-options", option)
+                self._settings.set_string("picture-uri", uri)
+                if self._has_key("picture-uri-dark"):
+                    self._settings.set_string("picture-uri-dark", uri)
+                # Writes are asynchronous: flush them so the change is not lost if we exit
+                Gio.Settings.sync()
+                return True
+            except Exception as e:
+                logging.error(f"GSettings write failed for {self.schema}: {e}", exc_info=True)
+                return False
+
+        _spawn(["gsettings", "set", self.schema, "picture-options", option])
+        result = _spawn(["gsettings", "set", self.schema, "picture-uri", uri])
+        if result.returncode != 0:
+            logging.error(f"gsettings error: {result.stderr.strip()}")
+            return False
+        # Older releases have no dark variant; that is not an error
+        _spawn(["gsettings", "set", self.schema, "picture-uri-dark", uri])
+        return True
+
+    def get_wallpaper(self) -> Optional[str]:
+        if self._settings is not None:
+            key = "picture-uri"
+            if self._has_key("picture-uri-dark") and self._prefers_dark():
+                key = "picture-uri-dark"
+            return _path_from_uri(self._settings.get_string(key))
+
+        result = _spawn(["gsettings", "get", self.schema, "picture-uri"])
+        if result.returncode != 0:
+            logging.error(f"gsettings error: {result.stderr.strip()}")
+            return None
+        return _path_from_uri(result.stdout)
+
+    @staticmethod
+    def _prefers_dark() -> bool:
+        Gio, _ = _gio()
+        source = Gio.SettingsSchemaSource.get_default()
+        if source is None or source.lookup("org.gnome.desktop.interface", True) is None:
+            return False
+        interface = Gio.Settings.new("org.gnome.desktop.interface")
+        return interface.props.settings_schema.has_key("color-scheme") and \
+            interface.get_string("color-scheme") == "prefer-dark"
+
+
+class CinnamonBackend(GSettingsBackend):
+    name = "cinnamon"
+    schema = "org.cinnamon.desktop.background"
+    desktops = {"x-cinnamon", "cinnamon"}
+
+
+class PlasmaBackend(DesktopBackend):
+    """
+    KDE Plasma: a desktop script evaluated by plasmashell over D-Bus, sets
+    every desktop (all screens and activities) in one call.
+    """
+
+    name = "kde"
+    CONFIG = Path.home() / ".config" / "plasma-org.kde.plasma.desktop-appletsrc"
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return "kde" in desktops or "plasma" in desktops or bool(os.environ.get("KDE_FULL_SESSION"))
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        script = (
+            "var all = desktops();"
+            "for (var i = 0; i < all.length; i++) {"
+            "  var d = all[i];"
+            "  d.wallpaperPlugin = 'org.kde.image';"
+            "  d.currentConfigGroup = ['Wallpaper', 'org.kde.image', 'General'];"
+            f"  d.writeConfig('Image', {json.dumps(_file_uri(path))});"
+            f"  d.writeConfig('FillMode', {KDE_FILL_MODES.get(fit_mode, 2)});"
+            "}"
+        )
+        try:
+            if _gio():
+                _dbus_call("org.kde.plasmashell", "/PlasmaShell", "org.kde.PlasmaShell", "evaluateScript",
+                           "s", (script,))
+                return True
+
+            qdbus = shutil.which("qdbus6") or shutil.which("qdbus")
+            if not qdbus:
+                logging.error("Neither PyGObject nor qdbus is available to reach plasmashell")
+                return False
+            result = _spawn([qdbus, "org.kde.plasmashell", "/PlasmaShell", "org.kde.PlasmaShell.evaluateScript", script])
+            if result.returncode != 0:
+                logging.error(f"qdbus error: {result.stderr.strip()}")
+                return False
+            return True
+        except Exception as e:
+            logging.error(f"Plasma wallpaper script failed: {e}", exc_info=True)
+            return False
+
+    def get_wallpaper(self) -> Optional[str]:
+        # plasmashell keeps it in its applet config; reading the file needs no D-Bus round trip
+        try:
+            with open(self.CONFIG, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("Image="):
+                        return _path_from_uri(line.split("=", 1)[1])
+        except OSError as e:
+            logging.debug(f"Could not read {self.CONFIG}: {e}")
+        return None
+
+
+class XfceBackend(DesktopBackend):
+    """
+    XFCE: the xfce4-desktop channel of xfconf, over D-Bus. Every monitor and
+    workspace has its own last-image property; monitors are matched to
+    per_display images by connector name.
+    """
+
+    name = "xfce"
+    per_display = True
+    CHANNEL = "xfce4-desktop"
+    SERVICE = ("org.xfce.Xfconf", "/org/xfce/Xfconf", "org.xfce.Xfconf")
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return bool({"xfce", "xfce4", "xubuntu"} & desktops)
+
+    def _image_properties(self) -> list[str]:
+        if _gio():
+            (properties,) = _dbus_call(*self.SERVICE, "GetAllProperties", "ss", (self.CHANNEL, "/backdrop"))
+            names = list(properties)
+        else:
+            result = _spawn(["xfconf-query", "-c", self.CHANNEL, "-l"])
+            names = result.stdout.split() if result.returncode == 0 else []
+        images = [name for name in names if name.endswith("/last-image")]
+        if not images:
+            # Fresh profile: xfdesktop creates these itself, start with the first monitor
+            from utils.display_layout import get_display_layout
+            images = [f"/backdrop/screen0/monitor{d.name}/workspace0/last-image" for d in get_display_layout()]
+        return images
+
+    def _set_property(self, prop: str, kind: str, value):
+        if _gio():
+            _, GLib = _gio()
+            _dbus_call(*self.SERVICE, "SetProperty", "ssv", (self.CHANNEL, prop, GLib.Variant(kind, value)))
+            return
+        query_type = {"s": "string", "i": "int"}[kind]
+        result = _spawn(["xfconf-query", "-c", self.CHANNEL, "-p", prop, "-n", "-t", query_type, "-s", str(value)])
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        style = XFCE_IMAGE_STYLES.get(fit_mode, 5)
+        try:
+            for prop in self._image_properties():
+                image = Path(path)
+                for display_name, display_image in (per_display or {}).items():
+                    if f"/monitor{display_name}/" in prop:
+                        image = Path(display_image)
+                self._set_property(prop, "s", str(image.resolve()))
+                self._set_property(prop[:-len("last-image")] + "image-style", "i", style)
+            return True
+        except Exception as e:
+            logging.error(f"xfconf wallpaper update failed: {e}", exc_info=True)
+            return False
+
+    def get_wallpaper(self) -> Optional[str]:
+        try:
+            images = self._image_properties()
+            if not images:
+                return None
+            if _gio():
+                (value,) = _dbus_call(*self.SERVICE, "GetProperty", "ss", (self.CHANNEL, images[0]))
+                return value or None
+            result = _spawn(["xfconf-query", "-c", self.CHANNEL, "-p", images[0]])
+            return (result.stdout.strip() or None) if result.returncode == 0 else None
+        except Exception as e:
+            logging.error(f"xfconf wallpaper query failed: {e}")
+            return None
+
+
+class SwayBackend(DesktopBackend):
+    """
+    sway: an `output ... bg` command sent over the sway IPC socket ($SWAYSOCK),
+    no process spawned. sway starts and replaces swaybg itself. Outputs are
+    named like the displays, so per_display images are supported.
+    """
+
+    name = "sway"
+    per_display = True
+    RUN_COMMAND = 0
+
+    def __init__(self):
+        self.current = None
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        sock = os.environ.get("SWAYSOCK")
+        return bool(sock) and os.path.exists(sock)
+
+    @staticmethod
+    def _quote(path: Path) -> str:
+        return '"' + str(Path(path).resolve()).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    def _command(self, command: str) -> list:
+        payload = command.encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(SPAWN_TIMEOUT)
+            sock.connect(os.environ["SWAYSOCK"])
+            sock.sendall(b"i3-ipc" + struct.pack("=II", len(payload), self.RUN_COMMAND) + payload)
+            length, _ = struct.unpack("=II", self._recv(sock, 14)[6:])
+            return json.loads(self._recv(sock, length))
+
+    @staticmethod
+    def _recv(sock, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("sway closed the IPC connection")
+            data += chunk
+        return data
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        mode = SWAY_BG_MODES.get(fit_mode, "fill")
+        commands = [f"output * bg {self._quote(path)} {mode}"]
+        commands += [f"output {json.dumps(name)} bg {self._quote(image)} {mode}"
+                     for name, image in (per_display or {}).items()]
+        try:
+            replies = self._command("; ".join(commands))
+        except (OSError, ValueError) as e:
+            logging.error(f"sway IPC failed: {e}")
+            return False
+
+        failed = [reply.get("error", "unknown error") for reply in replies if not reply.get("success")]
+        if failed:
+            logging.error(f"sway rejected the wallpaper: {failed}")
+            return False
+        self.current = str(Path(path).resolve())
+        return True
+
+    def get_wallpaper(self) -> Optional[str]:
+        # sway has no query for the background; report what we set
+        return self.current
+
+
+class SwaybgBackend(DesktopBackend):
+    """
+    Other wlroots compositors: a swaybg process owns the background, so one is
+    started per apply (the new one first, then the old one is stopped, to
+    avoid a blank frame in between).
+    """
+
+    name = "swaybg"
+    per_display = True
+
+    def __init__(self):
+        self.process = None
+        self.current = None
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return bool(os.environ.get("WAYLAND_DISPLAY")) and shutil.which("swaybg") is not None
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        mode = SWAY_BG_MODES.get(fit_mode, "fill")
+        args = ["swaybg", "-i", str(Path(path).resolve()), "-m", mode]
+        for name, image in (per_display or {}).items():
+            args += ["-o", name, "-i", str(Path(image).resolve()), "-m", mode]
+
+        get_metrics().inc("wallpaper_spawns_total")
+        supervisor = get_process_supervisor()
+        try:
+            # Restarted if it crashes, and left running when the app exits: it is the wallpaper
+            process = supervisor.spawn("swaybg", args, group="helper", restart=True, persist=True)
+        except OSError as e:
+            logging.error(f"Could not start swaybg: {e}")
+            return False
+
+        previous, self.process = self.process, process
+        if previous is not None:
+            supervisor.stop(previous)
+        self.current = str(Path(path).resolve())
+        return True
+
+    def get_wallpaper(self) -> Optional[str]:
+        return self.current
+
+
+class X11RootBackend(DesktopBackend):
+    """
+    Bare X11 window managers, in-process (python-xlib): the wallpaper is
+    rendered for the display layout, like on Windows, and uploaded into the
+    root pixmap. No process is spawned and per_display images are supported.
+    """
+
+    name = "x11"
+    per_display = True
+    renders = True
+
+    def __init__(self):
+        self.current = None
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        from utils import x11_root
+        return x11_root.available()
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        from utils.display_layout import get_display_layout
+
+        displays = get_display_layout()
+        return self.show(self.render(path, displays, fit_mode, per_display), displays, path)
+
+    def render(self, path: Path, displays: list, fit_mode: str = "fill", per_display: dict = None,
+               token: CancelToken = None):
+        """The stitched image for the layout; no X connection, so it may run on a worker"""
+        from utils.wallpaper_render import render_layout
+
+        with get_metrics().stage("resize"):
+            return render_layout(displays, path, per_display=per_display, mode=fit_mode, token=token)
+
+    def show(self, canvas, displays: list, path: Path) -> bool:
+        """Upload a render into the root pixmap"""
+        from utils import x11_root
+        from utils.display_layout import layout_bounds
+
+        min_x, min_y, _, _ = layout_bounds(displays)
+        try:
+            x11_root.set_root_pixmap(canvas, origin=(min_x, min_y))
+        except Exception as e:
+            logging.error(f"X11 root pixmap update failed: {e}", exc_info=True)
+            return False
+        self.current = str(Path(path).resolve())
+        return True
+
+    def get_wallpaper(self) -> Optional[str]:
+        # The root pixmap holds pixels, not a file name
+        return self.current
+
+
+class FehBackend(DesktopBackend):
+    """Plain X11 window managers: feh paints the root window (and writes ~/.fehbg for the next login)"""
+
+    name = "feh"
+    FEHBG = Path.home() / ".fehbg"
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return bool(os.environ.get("DISPLAY")) and shutil.which("feh") is not None
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        result = _spawn(["feh", FEH_BG_OPTIONS.get(fit_mode, "--bg-fill"), str(Path(path).resolve())])
+        if result.returncode != 0:
+            logging.error(f"feh error: {result.stderr.strip()}")
+            return False
+        return True
+
+    def get_wallpaper(self) -> Optional[str]:
+        try:
+            for line in self.FEHBG.read_text(encoding="utf-8").splitlines():
+                if line.lstrip().startswith("feh"):
+                    return shlex.split(line)[-1]
+        except (OSError, ValueError, IndexError) as e:
+            logging.debug(f"Could not read {self.FEHBG}: {e}")
+        return None
+
+
+class XsetrootBackend(DesktopBackend):
+    """
+    Last resort on bare X11: xsetroot can only paint a solid colour, so the
+    root window gets the image's average colour.
+    """
+
+    name = "xsetroot"
+
+    @classmethod
+    def detect(cls, desktops: set[str]) -> bool:
+        return bool(os.environ.get("DISPLAY")) and shutil.which("xsetroot") is not None
+
+    def set_wallpaper(self, path: Path, fit_mode: str = "fill", per_display: dict = None) -> bool:
+        from PySide6.QtCore import Qt
+        from PySide6.QtGui import QImage
+
+        image = QImage(str(path))
+        if image.isNull():
+            logging.error(f"Could not decode {path} for xsetroot")
+            return False
+        color = image.scaled(1, 1, Qt.AspectRatioMode.IgnoreAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation).pixelColor(0, 0).name()
+        result = _spawn(["xsetroot", "-solid", color])
+        if result.returncode != 0:
+            logging.error(f"xsetroot error: {result.stderr.strip()}")
+            return False
+        logging.warning(f"Only a solid colour ({color}) could be set: install python-xlib or feh for image wallpapers")
+        return True
+
+
+# Detection order: desktops recognised by name first, then generic tools.
+# GSettings goes last as well, for unknown desktops that still run GNOME settings.
+BACKENDS = (SwayBackend, GSettingsBackend, CinnamonBackend, PlasmaBackend, XfceBackend,
+            SwaybgBackend, X11RootBackend, FehBackend, XsetrootBackend)
+
+
+def detect_desktop_backend() -> Optional[DesktopBackend]:
+    desktops = _desktop_tokens()
+    for backend in BACKENDS:
+        try:
+            if backend.detect(desktops):
+                return backend()
+        except Exception as e:
+            logging.warning(f"Desktop backend {backend.name} detection failed: {e}")
+
+    if GSettingsBackend.installed():
+        return GSettingsBackend()
+    return None
+
+
+_backend_instance: DesktopBackend | None = None
+_backend_detected = False
+_backend_lock = threading.Lock()
+
+def get_desktop_backend() -> Optional[DesktopBackend]:
+    """
+    The wallpaper backend for this session, cached. The main window detects it
+    at startup on the GUI thread; the lock keeps a concurrent first call (a
+    render worker) from building a second one.
+    """
+    global _backend_instance, _backend_detected
+    if _backend_detected:
+        return _backend_instance
+    with _backend_lock:
+        if not _backend_detected:
+            _backend_instance = detect_desktop_backend()
+            _backend_detected = True
+            logging.info(f"Linux desktop backend: {_backend_instance.name if _backend_instance else 'none found'} "
+                         f"(XDG_CURRENT_DESKTOP={os.environ.get('XDG_CURRENT_DESKTOP', '')})")
+    return _backend_instance
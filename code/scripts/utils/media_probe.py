@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from utils.path_utils import get_tools_path
+from utils.system_utils import which
+from utils.catalog import get_catalog
+from utils.metrics import get_metrics
+
+
+# Container signatures used when ffprobe is not available
+VIDEO_SIGNATURES = (
+    (4, b"ftyp"),                 # mp4 / mov
+    (0, b"\x1a\x45\xdf\xa3"),     # matroska / webm
+    (8, b"AVI "),                 # avi (RIFF....AVI )
+)
+
+
+def find_ffprobe() -> str | None:
+    bundled = get_tools_path() / ("ffprobe.exe" if os.name == "nt" else "ffprobe")
+    if bundled.exists():
+        return str(bundled)
+    return which("ffprobe")
+
+
+def _empty_result(kind: str = "unknown") -> dict:
+    return {
+        "kind": kind, "ok": False, "error": None,
+        "width": None, "height": None, "format": None, "codec": None,
+        "duration": None, "fps": None, "bitrate": None,
+        "probed_at": time.time(),
+    }
+
+
+def probe_image(path: Path) -> dict | None:
+    """
+    Header-only image probe with Pillow. verify() walks the file structure
+    (PNG chunk CRCs, JPEG markers) without decoding pixels.
+    Returns None when Pillow does not recognise the file.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        img = Image.open(path)
+    except UnidentifiedImageError:
+        return None
+
+    result = _empty_result("image")
+    with img:
+        result["width"], result["height"] = img.size
+        result["format"] = img.format
+        result["codec"] = img.format.lower() if img.format else None
+        try:
+            img.verify()
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = f"corrupt image: {e}"
+    return result
+
+
+def _parse_rate(rate: str) -> float | None:
+    try:
+        num, _, den = rate.partition("/")
+        return round(float(num) / float(den or 1), 3) if float(den or 1) else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_video(path: Path, ffprobe: str = None) -> dict:
+    """Container + first video stream facts from ffprobe (reads headers only)"""
+    result = _empty_result("video")
+    ffprobe = ffprobe or find_ffprobe()
+
+    if not ffprobe:
+        # No ffprobe: at least make sure it is a video container and not an HTML error page
+        with open(path, "rb") as f:
+            head = f.read(16)
+        result["ok"] = any(head[offset:offset + len(sig)] == sig for offset, sig in VIDEO_SIGNATURES)
+        if not result["ok"]:
+            result["error"] = "unknown container"
+        return result
+
+    cmd = [
+        ffprobe, "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", "-select_streams", "v:0", str(path),
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=20, creationflags=creationflags)
+    except subprocess.TimeoutExpired:
+        result["error"] = "ffprobe timed out"
+        return result
+
+    if proc.returncode != 0:
+        result["error"] = (proc.stderr or "ffprobe failed").strip()[:200]
+        return result
+
+    data = json.loads(proc.stdout or "{}")
+    streams = data.get("streams") or []
+    fmt = data.get("format") or {}
+    if not streams:
+        result["error"] = "no video stream"
+        return result
+
+    stream = streams[0]
+    result.update({
+        "ok": True,
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "codec": stream.get("codec_name"),
+        "format": fmt.get("format_name"),
+        "fps": _parse_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate") or ""),
+        "duration": float(fmt["duration"]) if fmt.get("duration") else None,
+        "bitrate": int(fmt["bit_rate"]) if fmt.get("bit_rate") else None,
+    })
+    return result
+
+
+def probe_media(path, video_extensions=None) -> dict:
+    """
+    Probe one file: dimensions, duration, codec, frame rate, bitrate and an
+    integrity flag. The kind is decided by content, not by extension.
+    """
+    path = Path(path)
+    video_extensions = tuple(video_extensions or (".mp4", ".mkv", ".webm", ".avi", ".mov"))
+    metrics = get_metrics()
+
+    with metrics.timer("media_probe"):
+        try:
+            if path.stat().st_size == 0:
+                result = _empty_result()
+                result["error"] = "empty file"
+            elif path.suffix.lower() in video_extensions:
+                result = probe_video(path)
+            else:
+                result = probe_image(path)
+                if result is None:
+                    # Not an image: maybe a video with an unusual extension
+                    result = probe_video(path)
+                    if not result["ok"]:
+                        result["kind"] = "unknown"
+        except Exception as e:
+            result = _empty_result()
+            result["error"] = str(e)
+
+    metrics.inc("media_probed_total")
+    if not result["ok"]:
+        metrics.inc("media_probe_failures_total")
+        logging.warning(f"Media probe failed for {path.name}: {result['error']}")
+    return result
+
+
+def get_media_info(path, probe_missing: bool = True) -> dict | None:
+    """Catalog entry for `path`, probing (and recording) it first if needed"""
+    catalog = get_catalog()
+    entry = catalog.get(path)
+    if entry and "media" in entry:
+        return entry["media"]
+    if not probe_missing:
+        return None
+    info = probe_media(path)
+    catalog.update(path, media=info)
+    catalog.save()
+    return info
+
+
+class MediaProber(QObject):
+    """
+    Ingest stage: every file that appears in a watched collection folder is
+    probed once in the background and the result stored in the media catalog.
+    Files already in the catalog (same mtime and size) are skipped.
+    """
+
+    probed = Signal(str, dict)      # path, media info
+
+    def __init__(self, max_workers: int = 2, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+        self.catalog = get_catalog()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def attach(self, index):
+        """Probe whatever a CollectionIndex adds, and backfill what it already lists"""
+        index.delta.connect(self._on_delta)
+        for folder in index.watched_folders():
+            self.submit(index.files(folder))
+
+    def _on_delta(self, folder: str, added: list, removed: list):
+        for name in removed:
+            self.catalog.remove(Path(folder) / name)
+        self.submit([Path(folder) / name for name in added])
+
+    def submit(self, paths):
+        paths = list(paths)
+        if paths:
+            # The catalog lookups stat every file, keep that off the GUI thread too
+            self.pool.submit(self._queue_missing, paths)
+
+    def _queue_missing(self, paths: list):
+        missing = [p for p in paths if not (self.catalog.get(p) or {}).get("media")]
+        if not missing:
+            return
+        with self._lock:
+            self._pending += len(missing)
+        for path in missing:
+            self.pool.submit(self._probe_one, path)
+        logging.info(f"Probing {len(missing)} new collection file(s)")
+
+    def request(self, path):
+        """
+        Media info for one file, delivered by `probed`: from the catalog, else
+        probed on the pool. For callers on the GUI thread (downloads) that used
+        to probe in place; a missing file is reported as a failed probe.
+        """
+        with self._lock:
+            self._pending += 1
+        self.pool.submit(self._probe_one, Path(path), True)
+
+    def _probe_one(self, path: Path, requested: bool = False):
+        try:
+            info = (self.catalog.get(path) or {}).get("media") if requested else None
+            if info is None:
+                if not path.exists():
+                    if requested:
+                        info = _empty_result()
+                        info["error"] = "file not found"
+                        self.probed.emit(str(path), info)
+                    return
+                info = probe_media(path)
+                self.catalog.update(path, media=info)
+            self.probed.emit(str(path), info)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                done = self._pending == 0
+            # One catalog write per batch instead of one per file
+            if done:
+                self.catalog.save()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.catalog.save()
+
+
+_prober_instance: MediaProber | None = None
+
+def get_media_prober() -> MediaProber:
+    global _prober_instance
+    if _prober_instance is None:
+        _prober_instance = MediaProber()
+    return _prober_instance
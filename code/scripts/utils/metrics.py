@@ -0,0 +1,339 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+
+
+# Stages of a single wallpaper change, in the order they normally happen.
+CHANGE_STAGES = ("scan", "select", "download", "decode", "resize", "encode", "os_apply", "player_switch")
+
+
+class TimerStat:
+    """Aggregated timings for one named timer (count / sum / min / max / last)."""
+
+    __slots__ = ("count", "total", "min", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class ChangeSpan:
+    """
+    One wallpaper change with a per-stage time breakdown.
+
+    A span is opened by whoever triggers the change (scheduler, shuffle, drag & drop...)
+    and every instrumented stage running on the same thread adds its duration to it.
+    """
+
+    def __init__(self, trigger: str):
+        self.trigger = trigger
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration = 0.0
+        self.stages = {}
+        self.counts = {}
+        self.ok = True
+        self.detail = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, value: float):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def finish(self, ok: bool = True, detail: str = None):
+        self.duration = time.perf_counter() - self._t0
+        self.ok = ok
+        self.detail = detail
+
+    def as_dict(self) -> dict:
+        return {
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "ok": self.ok,
+            "detail": self.detail,
+            "stages": dict(self.stages),
+            "counts": dict(self.counts),
+        }
+
+
+class MetricsRegistry:
+    """
+    Lightweight, thread-safe counters, timers and change spans.
+
+    Everything is kept in memory; exporters (Prometheus text / JSON / diagnostics
+    dialog) only read snapshots. When disabled every call returns right away.
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 50):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+        self._spans = deque(maxlen=max_spans)
+        self._local = threading.local()
+
+    def set_enabled(self, enabled: bool):
+        logging.info(f"Metrics {'enabled' if enabled else 'disabled'}")
+        self.enabled = bool(enabled)
+
+    # -------------------------------------------------------------------
+    # COUNTERS / GAUGES / TIMERS
+    # -------------------------------------------------------------------
+    def inc(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def count(self, name: str, value: float = 1):
+        """Add to counter `<name>_total` and to the active change span (e.g. bytes written by this change)"""
+        if not self.enabled:
+            return
+        self.inc(f"{name}_total", value)
+        span = self.current_span()
+        if span is not None:
+            span.add_count(name, value)
+
+    def set_gauge(self, name: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self._timers.get(name)
+            if stat is None:
+                stat = self._timers[name] = TimerStat()
+            stat.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    # -------------------------------------------------------------------
+    # SPANS
+    # -------------------------------------------------------------------
+    def current_span(self) -> Optional[ChangeSpan]:
+        return getattr(self._local, "span", None)
+
+    @contextmanager
+    def span(self, trigger: str):
+        """
+        Open a wallpaper-change span on this thread. Nested calls reuse the outer span
+        so a scheduler tick that ends in a manual apply helper is still one change.
+        """
+        if not self.enabled or self.current_span() is not None:
+            yield self.current_span()
+            return
+
+        span = ChangeSpan(trigger)
+        self._local.span = span
+        try:
+            yield span
+        except Exception as e:
+            span.finish(ok=False, detail=str(e))
+            raise
+        else:
+            span.finish()
+        finally:
+            self._local.span = None
+            self._record_span(span)
+
+    def start_span(self, trigger: str) -> Optional[ChangeSpan]:
+        """
+        Open a span bound to no thread, for a change that hops threads (rendered
+        on a worker, applied on the GUI thread). Each side binds it with
+        use_span(); finish_span() records it. None when metrics are disabled.
+        """
+        return ChangeSpan(trigger) if self.enabled else None
+
+    @contextmanager
+    def use_span(self, span: Optional[ChangeSpan]):
+        """Record this thread's stages on `span` for the duration of the block"""
+        if span is None:
+            yield span
+            return
+        previous = self.current_span()
+        self._local.span = span
+        try:
+            yield span
+        finally:
+            self._local.span = previous
+
+    def finish_span(self, span: Optional[ChangeSpan], ok: bool = True, detail: str = None):
+        if span is None:
+            return
+        span.finish(ok=ok, detail=detail)
+        self._record_span(span)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time one stage; recorded as timer `stage_<name>` and on the active span."""
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.observe(f"stage_{name}", elapsed)
+            span = self.current_span()
+            if span is not None:
+                span.add_stage(name, elapsed)
+
+    def _record_span(self, span: ChangeSpan):
+        with self._lock:
+            self._spans.append(span)
+            stat = self._timers.get("wallpaper_change")
+            if stat is None:
+                stat = self._timers["wallpaper_change"] = TimerStat()
+            stat.observe(span.duration)
+            key = "wallpaper_changes_total" if span.ok else "wallpaper_change_failures_total"
+            self._counters[key] = self._counters.get(key, 0) + 1
+        logging.debug(f"Wallpaper change span ({span.trigger}) took {span.duration * 1000:.1f} ms: {span.stages}")
+
+    # -------------------------------------------------------------------
+    # EXPORT
+    # -------------------------------------------------------------------
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timers": {k: v.as_dict() for k, v in self._timers.items()},
+                "spans": [s.as_dict() for s in self._spans],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "tapeciarnia") -> str:
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        for name, stat in sorted(snap["timers"].items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {stat['count']}")
+            lines.append(f"{metric}_sum {stat['sum']:.6f}")
+            lines.append(f'{metric}{{quantile="0"}} {stat["min"]:.6f}')
+            lines.append(f'{metric}{{quantile="1"}} {stat["max"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timers.clear()
+            self._spans.clear()
+
+
+class MetricsServer:
+    """
+    Serves the registry on localhost:
+        /metrics       -> Prometheus text format
+        /metrics.json  -> JSON snapshot
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self) -> bool:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = registry.to_json().encode("utf-8")
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry.to_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Metrics endpoint: {format % args}")
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error(f"Metrics endpoint could not bind {self.host}:{self.port}: {e}")
+            return False
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+_metrics_instance: MetricsRegistry | None = None
+
+def get_metrics() -> MetricsRegistry:
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = MetricsRegistry()
+    return _metrics_instance
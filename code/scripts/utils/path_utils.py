@@ -40,6 +40,19 @@ SAVES_DIR = COLLECTION_DIR / "Saves"
 for d in (COLLECTION_DIR,SAVES_DIR):
     d.mkdir(parents=True, exist_ok=True)
 
+def get_cache_folder() -> Path:
+    """Return the per-user cache folder (rendered wallpapers, thumbnails, media catalog)"""
+    if platform.system() == "Windows":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+        cache_dir = base / "Tapeciarnia" / "cache"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        cache_dir = base / "tapeciarnia"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+CACHE_DIR = get_cache_folder()
+
 TMP_DOWNLOAD_FILE = COLLECTION_DIR / "download_path.tmp"
 TRANSLATIONS_DIR = BASE_DIR / "code" / "scripts" / "translations"
 
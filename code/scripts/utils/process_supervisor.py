@@ -0,0 +1,349 @@
+import os
+import sys
+import time
+import signal
+import logging
+import uuid
+import threading
+import subprocess
+from typing import Optional
+
+from utils.metrics import get_metrics
+from utils.command_handler import CREATE_NO_WINDOW
+from utils.resource_limits import wrap_command, apply_priority, scope_usage
+
+
+# Crashed processes with restart=True come back after 1 s, 2 s, 4 s ... at
+# most RESTART_BACKOFF_MAX. One that stayed up STABLE_SECONDS is healthy
+# again; MAX_RESTARTS crashes in a row and it is given up.
+RESTART_BACKOFF = 1.0
+RESTART_BACKOFF_MAX = 60.0
+STABLE_SECONDS = 30.0
+MAX_RESTARTS = 5
+
+# SIGTERM, then SIGKILL for whatever is left after this many seconds
+STOP_TIMEOUT = 3.0
+
+POLL_INTERVAL = 1.0         # reap / restart check
+SAMPLE_INTERVAL = 5.0       # CPU / RSS gauges
+
+IS_WINDOWS = sys.platform == "win32"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class ManagedProcess:
+    """One supervised command; survives restarts (pid changes, the object does not)"""
+
+    def __init__(self, name: str, args: list, group: str, restart: bool, persist: bool,
+                 cwd=None, env: dict = None, limits: dict = None):
+        self.name = name
+        self.args = [str(a) for a in args]
+        self.group = group
+        self.restart = restart
+        self.persist = persist
+        self.cwd = cwd
+        self.env = env
+        self.limits = limits or {}          # see resource_limits.PLAYER_PROFILES
+        self.unit = None                    # systemd scope, when the limits run in one
+
+        self.popen: Optional[subprocess.Popen] = None
+        self.pgid = None
+        self.started_at = None
+        self.returncode = None
+        self.restarts = 0               # crashes in a row
+        self.restarts_total = 0
+        self.next_restart = None        # monotonic time of the pending restart
+        self.stopping = False
+        self._sample = None             # (cpu ticks, monotonic) of the last CPU reading
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.popen.pid if self.popen is not None else None
+
+    def running(self) -> bool:
+        return self.popen is not None and self.popen.poll() is None
+
+    def __repr__(self):
+        return f"<ManagedProcess {self.name} pid={self.pid} group={self.group} restarts={self.restarts_total}>"
+
+
+class ProcessSupervisor:
+    """
+    Owns every process the app starts (video players, weebp tools, swaybg).
+
+    Each process gets its own process group (session on POSIX), so stopping
+    it also stops whatever it started, and nothing else on the machine is
+    touched. A monitor thread reaps exited processes, restarts those started
+    with restart=True (with backoff) and publishes per-process CPU and RSS
+    from /proc. persist=True processes (the wallpaper itself, e.g. swaybg)
+    are left running when the app exits. `limits` caps a process's CPU,
+    memory and I/O (see resource_limits), again on every restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._procs: list[ManagedProcess] = []
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._last_sample = 0.0
+
+    # -------------------------------------------------------------------
+    # PUBLIC
+    # -------------------------------------------------------------------
+    def spawn(self, name: str, args: list, group: str = "player", restart: bool = False,
+              persist: bool = False, cwd=None, env: dict = None, limits: dict = None) -> ManagedProcess:
+        """Start and supervise a process; raises OSError when it cannot be started"""
+        proc = ManagedProcess(name, args, group, restart, persist, cwd, env, limits)
+        self._launch(proc)
+        with self._lock:
+            self._procs.append(proc)
+        self._ensure_monitor()
+        return proc
+
+    def processes(self, group: str = None) -> list[ManagedProcess]:
+        with self._lock:
+            return [p for p in self._procs if group is None or p.group == group]
+
+    def stop(self, proc: ManagedProcess, timeout: float = STOP_TIMEOUT):
+        self.stop_all([proc], timeout)
+
+    def stop_group(self, group: str, timeout: float = STOP_TIMEOUT):
+        self.stop_all(self.processes(group), timeout)
+
+    def stop_all(self, procs: list[ManagedProcess] = None, timeout: float = STOP_TIMEOUT):
+        """SIGTERM every process (group), SIGKILL what is still alive at the shared deadline"""
+        procs = self.processes() if procs is None else procs
+        with self._lock:
+            for proc in procs:
+                proc.stopping = True
+                proc.next_restart = None
+
+        live = [p for p in procs if p.popen is not None]
+        for proc in live:
+            self._signal(proc)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(self._alive(p) for p in live):
+            time.sleep(0.05)
+
+        for proc in live:
+            if self._alive(proc):
+                logging.warning(f"{proc.name} (pid {proc.pid}) ignored SIGTERM for {timeout:.0f} s, killing it")
+                self._signal(proc, kill=True)
+            try:
+                proc.popen.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                logging.error(f"{proc.name} (pid {proc.pid}) could not be reaped")
+            proc.returncode = proc.popen.returncode
+            logging.info(f"Stopped {proc.name} (pid {proc.pid}, exit {proc.returncode})")
+
+        with self._lock:
+            for proc in procs:
+                if proc in self._procs:
+                    self._procs.remove(proc)
+
+    def shutdown(self, timeout: float = STOP_TIMEOUT):
+        """Stop the monitor and every process that should not outlive the app"""
+        self._closed = True
+        self._wake.set()
+        self.stop_all([p for p in self.processes() if not p.persist], timeout)
+
+    def stats(self) -> list[dict]:
+        """
+        Per-process CPU (percent of one core since the last reading) and RSS,
+        summed over its process group. For capped processes also the CPU
+        quota, the share of it actually used and (in a systemd scope) how long
+        the scope was throttled.
+        """
+        now = time.monotonic()
+        rows = []
+        for proc in self.processes():
+            cpu_percent = rss = scope = None
+            if proc.running() and proc.pgid is not None:
+                usage = _group_usage(proc.pgid)
+                if usage is not None:
+                    ticks, rss = usage
+                    last_ticks, last_time = proc._sample or (0, proc.started_at)
+                    if now > last_time:
+                        cpu_percent = max(0.0, (ticks - last_ticks) / CLOCK_TICKS / (now - last_time) * 100)
+                    proc._sample = (ticks, now)
+                if proc.limits:
+                    scope = scope_usage(proc.pid)
+
+            quota = (scope or {}).get("quota_percent")
+            rows.append({
+                "name": proc.name, "group": proc.group, "pid": proc.pid, "running": proc.running(),
+                "uptime": now - proc.started_at if proc.started_at and proc.running() else 0.0,
+                "restarts": proc.restarts_total, "cpu_percent": cpu_percent, "rss_bytes": rss,
+                "cpu_quota": quota,
+                "quota_used": cpu_percent / quota if quota and cpu_percent is not None else None,
+                "throttled_ms": scope["throttled_usec"] / 1000 if scope and "throttled_usec" in scope else None,
+            })
+        return rows
+
+    # -------------------------------------------------------------------
+    # PROCESSES
+    # -------------------------------------------------------------------
+    def _launch(self, proc: ManagedProcess):
+        kwargs = {"cwd": proc.cwd, "env": proc.env, "stdin": subprocess.DEVNULL,
+                  "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if IS_WINDOWS:
+            kwargs["creationflags"] = CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            # Own session and process group: signals reach its children too, and nothing else
+            kwargs["start_new_session"] = True
+
+        args = proc.args
+        if proc.limits and not IS_WINDOWS:
+            proc.unit = f"tapeciarnia-{proc.name}-{uuid.uuid4().hex[:8]}"
+            args = wrap_command(args, proc.limits, proc.unit)
+
+        proc.popen = subprocess.Popen(args, **kwargs)
+        proc.pgid = proc.popen.pid if not IS_WINDOWS else None
+        if proc.limits and not IS_WINDOWS:
+            apply_priority(proc.pgid, proc.limits)
+        proc.started_at = time.monotonic()
+        proc.returncode = None
+        proc._sample = None
+        get_metrics().inc("processes_started_total")
+        logging.info(f"Started {proc.name} (pid {proc.pid}, group {proc.group})")
+
+    @staticmethod
+    def _signal(proc: ManagedProcess, kill: bool = False):
+        """SIGTERM (or SIGKILL) the whole process group; terminate()/kill() on Windows"""
+        try:
+            if IS_WINDOWS:
+                proc.popen.kill() if kill else proc.popen.terminate()
+            else:
+                os.killpg(proc.pgid, signal.SIGKILL if kill else signal.SIGTERM)
+        except OSError:
+            pass                # already gone
+
+    @staticmethod
+    def _alive(proc: ManagedProcess) -> bool:
+        """Leader still running, or (POSIX) anything left in its process group"""
+        if proc.popen.poll() is None:
+            return True
+        if IS_WINDOWS:
+            return False
+        try:
+            os.killpg(proc.pgid, 0)
+            return True
+        except OSError:
+            return False
+
+    # -------------------------------------------------------------------
+    # MONITOR
+    # -------------------------------------------------------------------
+    def _ensure_monitor(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(target=self._monitor, name="process-supervisor", daemon=True)
+                self._thread.start()
+
+    def _monitor(self):
+        while not self._closed:
+            try:
+                self._check()
+                if time.monotonic() - self._last_sample >= SAMPLE_INTERVAL:
+                    self._publish_stats()
+            except Exception as e:
+                logging.error(f"Process supervisor check failed: {e}", exc_info=True)
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def _check(self):
+        now = time.monotonic()
+        metrics = get_metrics()
+        with self._lock:
+            for proc in list(self._procs):
+                if proc.stopping:
+                    continue
+
+                if proc.popen is not None:
+                    code = proc.popen.poll()            # reaps the zombie
+                    if code is None:
+                        if proc.restarts and now - proc.started_at >= STABLE_SECONDS:
+                            proc.restarts = 0
+                        continue
+
+                    proc.returncode, proc.popen = code, None
+                    if not proc.restart:
+                        logging.debug(f"{proc.name} exited with {code}")
+                        self._procs.remove(proc)
+                        continue
+                    if proc.restarts >= MAX_RESTARTS:
+                        logging.error(f"{proc.name} crashed {proc.restarts + 1} times in a row (exit {code}), giving up")
+                        metrics.inc("process_given_up_total")
+                        self._procs.remove(proc)
+                        continue
+                    delay = min(RESTART_BACKOFF * 2 ** proc.restarts, RESTART_BACKOFF_MAX)
+                    proc.next_restart = now + delay
+                    logging.warning(f"{proc.name} exited unexpectedly (exit {code}), restarting in {delay:.0f} s")
+
+                elif proc.next_restart is not None and now >= proc.next_restart:
+                    proc.restarts += 1
+                    proc.restarts_total += 1
+                    proc.next_restart = None
+                    try:
+                        self._launch(proc)
+                        metrics.inc("process_restarts_total")
+                    except OSError as e:
+                        logging.error(f"Could not restart {proc.name}: {e}")
+                        proc.next_restart = now + min(RESTART_BACKOFF * 2 ** proc.restarts, RESTART_BACKOFF_MAX)
+
+    def _publish_stats(self):
+        self._last_sample = time.monotonic()
+        metrics = get_metrics()
+        for row in self.stats():
+            if row["cpu_percent"] is not None:
+                metrics.set_gauge(f"process_cpu_percent_{row['name']}", round(row["cpu_percent"], 1))
+            if row["rss_bytes"] is not None:
+                metrics.set_gauge(f"process_rss_mb_{row['name']}", round(row["rss_bytes"] / 1024 / 1024, 1))
+            if row["quota_used"] is not None:
+                metrics.set_gauge(f"process_cpu_quota_used_{row['name']}", round(row["quota_used"] * 100, 1))
+
+
+# -------------------------------------------------------------------
+# /proc
+# -------------------------------------------------------------------
+def _read_stat(pid: str) -> Optional[list[str]]:
+    """Fields of /proc/<pid>/stat after the command name (state is [0], pgrp [2], utime [11], stime [12])"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read().decode("ascii", "replace")
+    except OSError:
+        return None
+    return data[data.rfind(")") + 2:].split()
+
+
+def _group_usage(pgid: int) -> Optional[tuple[int, int]]:
+    """(CPU ticks, RSS bytes) summed over every live process of a process group; None without /proc"""
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = rss = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        fields = _read_stat(entry)
+        if not fields or fields[2] != str(pgid):
+            continue
+        ticks += int(fields[11]) + int(fields[12])
+        try:
+            with open(f"/proc/{entry}/statm") as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    return ticks, rss
+
+
+_supervisor_instance: ProcessSupervisor | None = None
+
+def get_process_supervisor() -> ProcessSupervisor:
+    global _supervisor_instance
+    if _supervisor_instance is None:
+        _supervisor_instance = ProcessSupervisor()
+    return _supervisor_instance
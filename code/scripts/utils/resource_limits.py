@@ -0,0 +1,178 @@
+import os
+import sys
+import ctypes
+import shutil
+import logging
+import platform
+import threading
+import subprocess
+from typing import Optional
+
+from utils.metrics import get_metrics
+
+
+# Performance profile -> caps for video players (Linux).
+#   cpu_quota  = CPUQuota, percent of one core            (systemd scope)
+#   memory_max = MemoryMax in MB                           (systemd scope)
+#   io_weight  = IOWeight, 1..10000 (default 100)          (systemd scope)
+#   nice       = niceness                                  (always, setpriority)
+#   ioprio     = (class, level): 2 = best-effort 0..7, 3 = idle   (always, ioprio_set)
+# Without a systemd user manager only nice and ioprio apply.
+PLAYER_PROFILES = {
+    "performance": {},
+    "balanced": {"cpu_quota": 100, "memory_max": 1024, "io_weight": 50, "nice": 5, "ioprio": (2, 6)},
+    "eco": {"cpu_quota": 50, "memory_max": 512, "io_weight": 10, "nice": 15, "ioprio": (3, 0)},
+}
+DEFAULT_PLAYER_PROFILE = "performance"   # no caps unless the user asks for them
+
+# systemd property -> (limits key, format, cgroup controller it needs)
+SCOPE_PROPERTIES = (
+    ("CPUQuota", "cpu_quota", "{}%", "cpu"),
+    ("MemoryMax", "memory_max", "{}M", "memory"),
+    ("IOWeight", "io_weight", "{}", "io"),
+)
+
+IOPRIO_WHO_PGRP = 2
+IOPRIO_CLASS_SHIFT = 13
+# ioprio_set has no libc wrapper: syscall numbers per architecture
+SYS_IOPRIO_SET = {"x86_64": 251, "amd64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289,
+                  "armv7l": 314, "ppc64le": 273, "riscv64": 30}
+
+
+def get_profile_limits(profile: str) -> dict:
+    if profile not in PLAYER_PROFILES:
+        logging.warning(f"Unknown player profile '{profile}', using {DEFAULT_PLAYER_PROFILE}")
+        profile = DEFAULT_PLAYER_PROFILE
+    return dict(PLAYER_PROFILES[profile])
+
+
+# -------------------------------------------------------------------
+# SYSTEMD SCOPES
+# -------------------------------------------------------------------
+_scope_support = None
+_scope_lock = threading.Lock()
+
+def systemd_scope_available(wait: bool = True) -> bool:
+    """
+    Can we start transient user scopes? Probed once with a no-op scope (up to
+    5 s), then cached. With wait=False a probe that has not finished yet counts
+    as unavailable, so callers on the GUI thread never start or wait for it.
+    """
+    global _scope_support
+    if _scope_support is not None or not wait:
+        return bool(_scope_support)
+    with _scope_lock:
+        if _scope_support is None:
+            _scope_support = _probe_scopes()
+            logging.info(f"Player resource caps via {'systemd scopes' if _scope_support else 'nice/ioprio only'}")
+    return _scope_support
+
+
+def _probe_scopes() -> bool:
+    if not sys.platform.startswith("linux") or not shutil.which("systemd-run"):
+        return False
+    try:
+        result = subprocess.run(["systemd-run", "--user", "--scope", "--quiet", "--collect", "--", "true"],
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.info(f"systemd user scopes unavailable: {e}")
+        return False
+    if result.returncode != 0:
+        logging.info(f"systemd user scopes unavailable: {result.stderr.strip()}")
+    return result.returncode == 0
+
+
+def delegated_controllers() -> Optional[set[str]]:
+    """cgroup v2 controllers the user manager may use (None when it cannot be read)"""
+    uid = os.getuid()
+    path = f"/sys/fs/cgroup/user.slice/user-{uid}.slice/user@{uid}.service/cgroup.controllers"
+    try:
+        with open(path) as f:
+            return set(f.read().split())
+    except OSError:
+        return None
+
+
+def wrap_command(args: list, limits: dict, unit: str) -> list:
+    """
+    Prefix args with systemd-run so they start inside a transient scope with
+    the profile's caps. With --scope systemd-run execs the command itself:
+    the pid (and so supervision) is unchanged. Returns args untouched when
+    scopes are unavailable (or not probed yet, see main_window startup) or
+    the profile sets no scope caps.
+    """
+    if not limits or not systemd_scope_available(wait=False):
+        return args
+
+    controllers = delegated_controllers()
+    properties = []
+    for prop, key, fmt, controller in SCOPE_PROPERTIES:
+        if limits.get(key) is None:
+            continue
+        if controllers is not None and controller not in controllers:
+            logging.debug(f"{prop} skipped: the {controller} controller is not delegated to the user")
+            continue
+        properties += ["-p", f"{prop}={fmt.format(limits[key])}"]
+    if not properties:
+        return args
+
+    get_metrics().inc("player_scopes_total")
+    return ["systemd-run", "--user", "--scope", "--quiet", "--collect", f"--unit={unit}", *properties, "--", *args]
+
+
+# -------------------------------------------------------------------
+# NICE / IOPRIO
+# -------------------------------------------------------------------
+def apply_priority(pgid: int, limits: dict):
+    """Lower CPU and I/O priority of a whole process group (inherited by later children and exec)"""
+    nice = limits.get("nice")
+    if nice is not None:
+        try:
+            os.setpriority(os.PRIO_PGRP, pgid, nice)
+        except OSError as e:
+            logging.warning(f"setpriority({nice}) failed for process group {pgid}: {e}")
+
+    ioprio = limits.get("ioprio")
+    if ioprio is not None and not _ioprio_set(pgid, *ioprio):
+        logging.debug(f"ioprio_set{ioprio} not applied to process group {pgid}")
+
+
+def _ioprio_set(pgid: int, io_class: int, level: int) -> bool:
+    # The syscall numbers are Linux's: on macOS arm64, 30 is a different call
+    if not sys.platform.startswith("linux"):
+        return False
+    number = SYS_IOPRIO_SET.get(platform.machine().lower())
+    if number is None:
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(number, IOPRIO_WHO_PGRP, pgid, (io_class << IOPRIO_CLASS_SHIFT) | level) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+# -------------------------------------------------------------------
+# USAGE
+# -------------------------------------------------------------------
+def scope_usage(pid: int) -> Optional[dict]:
+    """CPU accounting of the systemd scope a process runs in: usage and throttling (None outside one)"""
+    try:
+        with open(f"/proc/{pid}/cgroup") as f:
+            path = next((line.split("::", 1)[1].strip() for line in f if line.startswith("0::")), None)
+    except OSError:
+        return None
+    if not path or not path.endswith(".scope") or "tapeciarnia-" not in path:
+        return None
+
+    usage = {}
+    try:
+        with open(f"/sys/fs/cgroup{path}/cpu.stat") as f:
+            for line in f:
+                key, value = line.split()
+                usage[key] = int(value)
+        with open(f"/sys/fs/cgroup{path}/cpu.max") as f:
+            quota, period = f.read().split()
+            usage["quota_percent"] = None if quota == "max" else int(quota) / int(period) * 100
+    except (OSError, ValueError):
+        pass
+    return usage
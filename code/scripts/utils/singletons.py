@@ -9,6 +9,7 @@ from PySide6.QtCore import Signal, QLockFile, QDir
 from PySide6.QtNetwork import QLocalServer, QLocalSocket
 
 from models.config import Config
+from ipc_forward import SERVER_NAME as IPC_SERVER_NAME
 import logging
 import os
 
@@ -16,7 +17,7 @@ import os
 class SingleApplication(QApplication):
     message_received = Signal(str)
 
-    SERVER_NAME = "Tapeciarnia_IPC"
+    SERVER_NAME = IPC_SERVER_NAME         # shared with the pre-Qt forwarder (ipc_forward)
     LOCKFILE_NAME = "Tapeciarnia.lock"
 
     def __init__(self, argv):
@@ -1,5 +1,4 @@
 import sys
-import subprocess
 import locale
 import shutil
 import ctypes
@@ -9,9 +8,15 @@ from typing import Optional
 import socket
 import os
 import logging
-from PySide6.QtWidgets import QApplication
 import tempfile
-from utils.path_utils import FAVS_DIR
+from utils.metrics import get_metrics
+from utils.display_layout import get_display_layout, get_primary_display
+from utils.wallpaper_render import (
+    render_layout, get_decode_cache, render_key, render_output_path, write_render,
+    DEFAULT_FIT_MODE, DEFAULT_OUTPUT_FORMAT, DEFAULT_OUTPUT_QUALITY,
+)
+from utils.cancellation import CancelToken
+from utils.linux_desktop import get_desktop_backend
 
 
 
@@ -98,40 +103,17 @@ def get_current_desktop_wallpaper() -> Optional[str]:
             return None
             
     elif sys.platform.startswith("linux"):
-        logging.debug("Linux platform detected for wallpaper retrieval")
+        backend = get_desktop_backend()
+        if backend is None:
+            logging.error("No supported Linux desktop found for wallpaper retrieval")
+            return None
         try:
-            logging.debug("Attempting to get wallpaper via gsettings")
-            res = subprocess.run(
-                ["gsettings", "get", "org.gnome.desktop.background", "picture-uri"],
-                capture_output=True, 
-                text=True,
-                timeout=10  # Add timeout to prevent hanging
-            )
-            
-            if res.returncode == 0:
-                val = res.stdout.strip().strip("'\"")
-                logging.debug(f"Raw gsettings output: {val}")
-                
-                if val.startswith("file://"):
-                    wallpaper_path = val[7:]
-                    logging.info(f"Current Linux wallpaper: {wallpaper_path}")
-                    return wallpaper_path
-                elif val:
-                    logging.info(f"Current Linux wallpaper (non-file URI): {val}")
-                    return val
-                else:
-                    logging.warning("gsettings returned empty wallpaper URI")
-                    return None
+            wallpaper_path = backend.get_wallpaper()
+            if wallpaper_path:
+                logging.info(f"Current Linux wallpaper ({backend.name}): {wallpaper_path}")
             else:
-                logging.error(f"gsettings command failed - returncode: {res.returncode}, stderr: {res.stderr.strip()}")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            logging.error("gsettings command timed out while retrieving wallpaper")
-            return None
-        except FileNotFoundError:
-            logging.error("gsettings command not found - likely not running on GNOME desktop")
-            return None
+                logging.warning(f"{backend.name} did not report a current wallpaper")
+            return wallpaper_path
         except Exception as e:
             logging.error(f"Error retrieving Linux wallpaper: {e}", exc_info=True)
             return None
@@ -140,68 +122,111 @@ def get_current_desktop_wallpaper() -> Optional[str]:
         return None
     
     
-def set_static_desktop_wallpaper(path: str) -> bool:
+def render_stitched_wallpaper(source_img, monitors, fit_mode: str = DEFAULT_FIT_MODE):
     """
-    Set wallpaper on Windows (multi-monitor supported via stitching)
-    and on Linux GNOME. The wallpaper is resized to completely fill
-    each monitor (no empty space). This function is self-contained.
+    Build one canvas holding the source image rendered for every monitor,
+    each monitor placed at its real position on the virtual desktop.
     """
-    wallpaper_path = Path(path)
+    return render_layout(monitors, source_img, mode=fit_mode)
+
+
+class RenderedWallpaper:
+    """A static wallpaper prepared for a display layout, ready to be handed to the desktop"""
+
+    def __init__(self, source: Path, displays: list, per_display: dict = None, fit_mode: str = DEFAULT_FIT_MODE):
+        self.source = source
+        self.displays = displays
+        self.per_display = per_display
+        self.fit_mode = fit_mode
+        self.file = None            # Windows: the stitched render in the render cache
+        self.canvas = None          # bare X11: the stitched image for the root pixmap
+
 
-    # Validate the path
+def render_static_wallpaper(path, displays: list = None, per_display: dict = None,
+                            fit_mode: str = DEFAULT_FIT_MODE, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                            quality: int = DEFAULT_OUTPUT_QUALITY, token: CancelToken = None) -> RenderedWallpaper:
+    """
+    The slow half of set_static_desktop_wallpaper: decode, resize and encode
+    the wallpaper for the display layout. Touches no Qt object once `displays`
+    is given (read it with get_display_layout() on the GUI thread), so it can
+    run on a worker.
+
+    On Windows the stitched image is encoded as output_format (jpeg/png/bmp)
+    into the render cache; an identical earlier render is reused as is. On
+    bare X11 the stitched image is kept in memory. Desktops that scale the
+    image themselves need no render.
+
+    A cancelled `token` (the user already asked for another wallpaper) stops
+    the render with OperationCancelled. Other failures raise too.
+    """
+    wallpaper_path = Path(path)
     if not wallpaper_path.exists():
-        logging.error("Wallpaper file not found: %s", wallpaper_path)
-        return False
+        raise FileNotFoundError(f"Wallpaper file not found: {wallpaper_path}")
 
+    if sys.platform.startswith("win"):
+        displays = displays or get_display_layout()
+        if not displays:
+            raise RuntimeError("No monitors detected")
+        rendered = RenderedWallpaper(wallpaper_path, displays, per_display, fit_mode)
+
+        metrics = get_metrics()
+        key = render_key(displays, wallpaper_path, per_display, fit_mode, output_format, quality)
+        final_path = render_output_path(key, output_format)
+
+        if final_path.exists():
+            logging.info(f"Reusing cached render: {final_path.name}")
+            metrics.inc("render_cache_hits_total")
+            # Keep it at the front of the render cache
+            os.utime(final_path)
+        else:
+            cache = get_decode_cache()
+            with metrics.stage("decode"):
+                # Warm the decode cache; render_layout reads the same entries
+                for source_path in [wallpaper_path, *(per_display or {}).values()]:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    cache.get(source_path)
+
+            # Build stitched wallpaper, one display per worker
+            with metrics.stage("resize"):
+                stitched_wallpaper = render_layout(displays, wallpaper_path, per_display=per_display,
+                                                   cache=cache, mode=fit_mode, token=token)
+
+            # JPEG/PNG are accepted by SystemParametersInfoW since Windows 8
+            with metrics.stage("encode"):
+                written = write_render(stitched_wallpaper, final_path, output_format, quality, token)
+            metrics.count("render_bytes_written", written)
+            logging.info(f"Rendered wallpaper written: {final_path.name} ({written / 1024 / 1024:.1f} MB)")
+        rendered.file = final_path
+        return rendered
+
+    rendered = RenderedWallpaper(wallpaper_path, displays, per_display, fit_mode)
+    if sys.platform.startswith("linux"):
+        backend = get_desktop_backend()
+        if backend is not None and backend.renders:
+            rendered.displays = displays or get_display_layout()
+            rendered.canvas = backend.render(wallpaper_path, rendered.displays, fit_mode, per_display, token)
+    return rendered
+
+
+def apply_rendered_wallpaper(rendered: RenderedWallpaper) -> bool:
+    """
+    The quick half of set_static_desktop_wallpaper: hand a rendered wallpaper
+    to the desktop. Runs where the caller decides which wallpaper wins (the
+    GUI thread), so a stale render is never applied over a newer one.
+    """
     try:
         # === WINDOWS ===
         if sys.platform.startswith("win"):
             try:
                 import ctypes
-                from PIL import Image
-                from screeninfo import get_monitors
 
                 logging.info("Applying Windows multi-monitor wallpaper")
-
-                # Get monitor information
-                monitors = get_monitors()
-                if not monitors:
-                    logging.error("No monitors detected")
-                    return False
-
-                # Calculate full stitched wallpaper size
-                total_width = sum(m.width for m in monitors)
-                max_height = max(m.height for m in monitors)
-
-                stitched_wallpaper = Image.new("RGB", (total_width, max_height))
-                source_img = Image.open(wallpaper_path)
-
-                # Helper: Resize image to cover target area like CSS "background-size: cover"
-                def resize_cover(img, target_w, target_h):
-                    src_w, src_h = img.size
-                    scale = max(target_w / src_w, target_h / src_h)
-                    new_size = (int(src_w * scale), int(src_h * scale))
-                    resized = img.resize(new_size, Image.LANCZOS)
-                    # Center crop
-                    x1 = (resized.width - target_w) // 2
-                    y1 = (resized.height - target_h) // 2
-                    return resized.crop((x1, y1, x1 + target_w, y1 + target_h))
-
-                # Build stitched wallpaper
-                offset_x = 0
-                for m in monitors:
-                    img_resized = resize_cover(source_img, m.width, m.height)
-                    stitched_wallpaper.paste(img_resized, (offset_x, 0))
-                    offset_x += m.width
-
-                # Save stitched wallpaper as BMP (required by Windows API)
-                final_path = wallpaper_path.parent / "wallpaper_stitched.bmp"
-                stitched_wallpaper.save(final_path, format="BMP")
-
                 SPI_SETDESKWALLPAPER = 20
-                result = ctypes.windll.user32.SystemParametersInfoW(
-                    SPI_SETDESKWALLPAPER, 0, str(final_path), 3
-                )
+                with get_metrics().stage("os_apply"):
+                    result = ctypes.windll.user32.SystemParametersInfoW(
+                        SPI_SETDESKWALLPAPER, 0, str(rendered.file), 3
+                    )
 
                 if result:
                     logging.info("Wallpaper successfully applied (Windows)")
@@ -214,30 +239,28 @@ def set_static_desktop_wallpaper(path: str) -> bool:
                 logging.error("Windows wallpaper error: %s", e, exc_info=True)
                 return False
 
-        # === LINUX (GNOME) ===
+        # === LINUX ===
         elif sys.platform.startswith("linux"):
-            import subprocess
-
-            logging.info("Applying Linux GNOME wallpaper")
+            # The desktop scales the image itself (except on bare X11), with no process spawn where the backend allows
+            backend = get_desktop_backend()
+            if backend is None:
+                logging.error("No supported Linux desktop found - unsupported desktop environment")
+                return False
 
-            uri = f"file://{wallpaper_path.resolve()}"
+            logging.info(f"Applying Linux wallpaper via {backend.name}")
+            if rendered.per_display and not backend.per_display:
+                logging.warning(f"Per-display wallpapers are not supported by {backend.name}, using one image for all displays")
 
             try:
-                result = subprocess.run(
-                    ["gsettings", "set", "org.gnome.desktop.background", "picture-uri", uri],
-                    capture_output=True, text=True
-                )
-
-                if result.returncode != 0:
-                    logging.error("gsettings error: %s", result.stderr.strip())
-                    return False
-
-                logging.info("Linux wallpaper applied successfully")
-                return True
+                with get_metrics().stage("os_apply"):
+                    if rendered.canvas is not None:
+                        applied = backend.show(rendered.canvas, rendered.displays, rendered.source)
+                    else:
+                        applied = backend.set_wallpaper(rendered.source, rendered.fit_mode, rendered.per_display)
+                if applied:
+                    logging.info("Linux wallpaper applied successfully")
+                return applied
 
-            except FileNotFoundError:
-                logging.error("gsettings not found - unsupported desktop environment")
-                return False
             except Exception as e:
                 logging.error("Linux wallpaper error: %s", e, exc_info=True)
                 return False
@@ -249,23 +272,33 @@ def set_static_desktop_wallpaper(path: str) -> bool:
     except Exception as e:
         logging.error("Unexpected wallpaper error: %s", e, exc_info=True)
         return False
-    
-def conver_bytes_to_tmp_path(img_bytes: bytes, filename: str = "current_wallpaper.jpg") -> bool:
-    """
-    Save image bytes to a temporary file and return it's path.
-    """
-
-    # Create temporary file
-    path = FAVS_DIR / filename
-
-    # Save image
-    with open(path, "wb") as f:
-        f.write(img_bytes)
 
 
-    return path
+def set_static_desktop_wallpaper(path: str, per_display: dict = None, fit_mode: str = DEFAULT_FIT_MODE,
+                                 output_format: str = DEFAULT_OUTPUT_FORMAT,
+                                 quality: int = DEFAULT_OUTPUT_QUALITY) -> bool:
+    """
+    Set wallpaper on Windows (multi-monitor supported via stitching)
+    and on Linux GNOME. fit_mode is one of FIT_MODES; the default "fill"
+    resizes the wallpaper to completely fill each monitor (no empty space).
 
+    per_display optionally maps display names (see get_display_layout) to a
+    different, separately sized image for that display.
 
+    Renders and applies in one go on the calling thread (the GUI thread: the
+    display layout comes from Qt). Interactive applies render on a worker
+    instead, see render_static_wallpaper / apply_rendered_wallpaper.
+    """
+    try:
+        rendered = render_static_wallpaper(path, None, per_display, fit_mode, output_format, quality)
+    except FileNotFoundError as e:
+        logging.error("%s", e)
+        return False
+    except Exception as e:
+        logging.error("Wallpaper render error: %s", e, exc_info=True)
+        return False
+    return apply_rendered_wallpaper(rendered)
+    
 def get_system_info() -> dict:
     """
     Get comprehensive system information for debugging
@@ -288,6 +321,8 @@ def get_system_info() -> dict:
             # Try to detect desktop environment
             de = os.environ.get('XDG_CURRENT_DESKTOP', 'Unknown')
             system_info['desktop_environment'] = de
+            backend = get_desktop_backend()
+            system_info['wallpaper_backend'] = backend.name if backend else None
             system_info['current_wallpaper'] = get_current_desktop_wallpaper()
             
         logging.debug(f"System information collected: {system_info}")
@@ -312,18 +347,12 @@ def verify_wallpaper_access() -> bool:
         logging.debug("Windows platform supports wallpaper operations")
         return True
     elif sys.platform.startswith("linux"):
-        # Check if gsettings is available
-        try:
-            result = subprocess.run(["which", "gsettings"], capture_output=True, text=True)
-            if result.returncode == 0:
-                logging.debug("Linux system supports wallpaper operations via gsettings")
-                return True
-            else:
-                logging.warning("Linux system does not have gsettings - wallpaper operations may not work")
-                return False
-        except Exception as e:
-            logging.error(f"Error verifying Linux wallpaper access: {e}")
-            return False
+        backend = get_desktop_backend()
+        if backend is not None:
+            logging.debug(f"Linux system supports wallpaper operations via {backend.name}")
+            return True
+        logging.warning("No supported Linux desktop found - wallpaper operations may not work")
+        return False
     else:
         logging.warning(f"Wallpaper operations not supported on platform: {sys.platform}")
         return False
@@ -368,31 +397,18 @@ def is_connected_to_internet(host="8.8.8.8", port=53, timeout=3):
 
 def get_primary_screen_dimensions() -> tuple[int, int]:
     """
-    Retrieves the width and height of the primary screen using PySide6's 
-    QApplication and QScreen methods.
+    Retrieves the width and height of the primary screen in device pixels
+    from the display layout (screeninfo + QScreen).
 
     Returns:
         tuple[int, int]: (width, height) of the primary screen in pixels.
-                         Returns (1920, 1080) as a safe fallback if QApplication is not running.
+                         Returns (1920, 1080) as a safe fallback if no screen can be detected.
     """
     try:
-        # Get the running QApplication instance
-        app = QApplication.instance()
-        if not app:
-            logging.warning("QApplication instance not found. Returning fallback dimensions.")
-            return 1920, 1080
-            
-        # Get the primary screen object
-        screen = app.primaryScreen()
-        if screen:
-            size = screen.size()
-            width = size.width()
-            height = size.height()
-            logging.info(f"Primary screen dimensions retrieved: {width}x{height}")
-            return width, height
-        
-        logging.warning("Primary screen object not found. Returning fallback dimensions.")
-        return 1920, 1080
+        # Device pixels, so HiDPI screens ask for full-resolution wallpapers
+        primary = get_primary_display()
+        logging.info(f"Primary screen dimensions retrieved: {primary.width}x{primary.height}")
+        return primary.width, primary.height
 
     except Exception as e:
         logging.error(f"Failed to get screen dimensions: {e}")
@@ -0,0 +1,256 @@
+import os
+import hashlib
+import logging
+import threading
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from utils.path_utils import CACHE_DIR, get_tools_path
+from utils.system_utils import which
+from utils.metrics import get_metrics
+
+
+THUMBS_DIR = CACHE_DIR / "thumbs"
+THUMB_SIZE = 256
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+VIDEO_SUFFIXES = (".mp4", ".mkv", ".webm", ".avi", ".mov")
+
+# Bytes read from the head and the tail of a file for its content fingerprint
+FINGERPRINT_CHUNK = 64 * 1024
+
+
+def content_key(path: Path) -> str:
+    """
+    Cache key from size, mtime and a sample of the content (head + tail).
+    Cheap enough for 50k files, yet a re-encoded file with the same name misses.
+    """
+    st = path.stat()
+    digest = hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if st.st_size > FINGERPRINT_CHUNK * 2:
+            f.seek(-FINGERPRINT_CHUNK, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+
+def find_ffmpeg() -> str | None:
+    bundled = get_tools_path() / ("ffmpeg.exe" if os.name == "nt" else "ffmpeg")
+    if bundled.exists():
+        return str(bundled)
+    return which("ffmpeg")
+
+
+# -------------------------------------------------------------------
+# WORKER PROCESS JOBS (top level so they can be pickled)
+# -------------------------------------------------------------------
+def make_image_thumbnail(source: str, target: str, size: int = THUMB_SIZE) -> int:
+    from PIL import Image
+
+    with Image.open(source) as img:
+        # JPEG: let the decoder scale by 1/2..1/8 instead of decoding full size
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size), Image.BILINEAR)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        img.save(tmp, format="JPEG", quality=80)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+def make_video_poster(source: str, target: str, ffmpeg: str, size: int = THUMB_SIZE) -> int:
+    tmp = f"{target}.{os.getpid()}.tmp.jpg"
+    cmd = [
+        ffmpeg, "-v", "error", "-y",
+        "-ss", "1", "-i", source,           # seek before -i: fast keyframe seek
+        "-frames:v", "1",
+        "-vf", f"scale={size}:{size}:force_original_aspect_ratio=decrease",
+        "-q:v", "5", tmp,
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    subprocess.run(cmd, check=True, timeout=30, capture_output=True, creationflags=creationflags)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+class ThumbnailCache:
+    """
+    Size-bounded folder of thumbnails named by content key. When the total grows
+    past max_bytes the least recently used files (by mtime, refreshed on hit) go.
+    """
+
+    def __init__(self, folder: Path = THUMBS_DIR, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = sum(f.stat().st_size for f in self.folder.glob("*.jpg"))
+
+    def path_for(self, key: str) -> Path:
+        return self.folder / f"{key}.jpg"
+
+    def lookup(self, key: str) -> Path | None:
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def added(self, size: int):
+        with self._lock:
+            self._total += size
+            over = self._total > self.max_bytes
+        if over:
+            self.prune()
+
+    def prune(self):
+        files = sorted(self.folder.glob("*.jpg"), key=lambda f: f.stat().st_mtime)
+        with self._lock:
+            # Trim down to 90% so a full cache does not prune on every new thumbnail
+            target = int(self.max_bytes * 0.9)
+            for f in files:
+                if self._total <= target:
+                    break
+                try:
+                    size = f.stat().st_size
+                    f.unlink()
+                    self._total -= size
+                except OSError:
+                    continue
+        logging.debug(f"Thumbnail cache pruned to {self._total / 1024 / 1024:.1f} MB")
+
+
+class ThumbnailService(QObject):
+    """
+    Generates thumbnails in a background process pool and reports them with
+    `ready(source, thumbnail)`. request() does no disk I/O, so it is safe to
+    call while painting: a worker thread keys the file (stat + content
+    sample) and either answers from the cache or queues a generation job.
+    Keys are remembered by (path, size, mtime), so a file seen before is not
+    read again. Files with the same content share one generation job, and
+    each of them gets its own `ready`.
+    """
+
+    ready = Signal(str, str)       # source path, thumbnail path
+    failed = Signal(str, str)      # source path, error
+
+    def __init__(self, max_workers: int = None, max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES, parent=None):
+        super().__init__(parent)
+        self.cache = ThumbnailCache(max_bytes=max_cache_bytes)
+        self.ffmpeg = find_ffmpeg()
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.pool = None
+        self.key_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumb-key")
+        self._keys = {}                 # (path, size, mtime_ns) -> content key
+        self._requested = set()         # sources being keyed
+        self._in_flight = {}            # content key being generated -> sources waiting for it
+        self._lock = threading.Lock()
+        if not self.ffmpeg:
+            logging.info("ffmpeg not found, videos will have no poster thumbnails")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Called from the key threads: create the process pool only once
+        with self._lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self.pool
+
+    def request(self, source):
+        """Ask for the thumbnail of `source`; `ready` (or `failed`) fires once it is known"""
+        source = str(source)
+        with self._lock:
+            if source in self._requested:
+                return
+            self._requested.add(source)
+        self.key_pool.submit(self._resolve, source)
+
+    def _key_for(self, source: Path) -> str:
+        st = source.stat()
+        stamp = (str(source), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            key = self._keys.get(stamp)
+        if key is None:
+            key = content_key(source)
+            with self._lock:
+                self._keys[stamp] = key
+        return key
+
+    def _resolve(self, source: str):
+        try:
+            self._lookup_or_generate(Path(source))
+        except Exception as e:
+            logging.debug(f"Thumbnail lookup failed for {source}: {e}")
+            self.failed.emit(source, str(e))
+        finally:
+            with self._lock:
+                self._requested.discard(source)
+
+    def _lookup_or_generate(self, source: Path):
+        key = self._key_for(source)
+        cached = self.cache.lookup(key)
+        if cached:
+            get_metrics().inc("thumbnail_cache_hits_total")
+            self.ready.emit(str(source), str(cached))
+            return
+
+        is_video = source.suffix.lower() in VIDEO_SUFFIXES
+        if is_video and not self.ffmpeg:
+            return
+
+        with self._lock:
+            waiting = self._in_flight.get(key)
+            if waiting is not None:
+                waiting.append(str(source))
+                return
+            self._in_flight[key] = [str(source)]
+
+        target = str(self.cache.path_for(key))
+        if is_video:
+            future = self._get_pool().submit(make_video_poster, str(source), target, self.ffmpeg)
+        else:
+            future = self._get_pool().submit(make_image_thumbnail, str(source), target)
+        future.add_done_callback(lambda f: self._on_done(f, key, target))
+
+    def _on_done(self, future, key: str, target: str):
+        with self._lock:
+            sources = self._in_flight.pop(key, [])
+        try:
+            size = future.result()
+        except Exception as e:
+            logging.debug(f"Thumbnail failed for {', '.join(sources)}: {e}")
+            for source in sources:
+                self.failed.emit(source, str(e))
+            return
+        get_metrics().inc("thumbnails_generated_total")
+        self.cache.added(size)
+        # Emitted from a pool thread; Qt queues it to the receivers' thread
+        for source in sources:
+            self.ready.emit(source, target)
+
+    def shutdown(self):
+        self.key_pool.shutdown(wait=False, cancel_futures=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+_thumbnail_service: ThumbnailService | None = None
+
+def get_thumbnail_service() -> ThumbnailService:
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        _thumbnail_service = ThumbnailService()
+    return _thumbnail_service
+
+def shutdown_thumbnail_service():
+    """Stop the worker processes, if the service was ever started"""
+    if _thumbnail_service is not None:
+        _thumbnail_service.shutdown()
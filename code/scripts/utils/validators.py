@@ -8,6 +8,7 @@ import re
 from urllib.parse import urlparse, parse_qs
 import requests
 from utils.singletons import get_config
+from utils.catalog import get_catalog
 
 
 # scheduler modes
@@ -207,6 +208,13 @@ def is_tapeciarnia_redirect_url(url: str):
 
 def get_media_type(s: str) -> str:
     """Determine media type (image, video, or unknown)"""
+    # Local files already probed at ingest: trust the content, not the extension
+    if not s.lower().startswith("http"):
+        entry = get_catalog().get(s)
+        media = entry.get("media") if entry else None
+        if media and media.get("ok") and media.get("kind") in ("image", "video"):
+            return media["kind"]
+
     if is_image_url_or_path(s):
         return "image"
     elif is_video_url_or_path(s):
@@ -0,0 +1,386 @@
+import os
+import uuid
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from utils.display_layout import Display, layout_bounds
+from utils.path_utils import CACHE_DIR
+from utils.cancellation import CancelToken
+
+
+# -------------------------------------------------------------------
+# FIT MODES
+# -------------------------------------------------------------------
+FIT_MODES = ("fill", "fit", "center", "smart")
+DEFAULT_FIT_MODE = "fill"
+
+# Focus point as fractions of the source width / height
+CENTER_FOCUS = (0.5, 0.5)
+
+# Decoded sources kept in memory (RGB bytes): about two 6000x4000 photos
+DECODE_CACHE_BYTES = 160 * 1024 * 1024
+
+
+def resample_args(src_size: tuple[int, int], target_size: tuple[int, int]) -> dict:
+    """
+    Pick resize() arguments from the scale factor.
+
+    Large downscales let Pillow reduce() by an integer factor first and only run
+    the filter on the small result (reducing_gap); upscales do not benefit from
+    LANCZOS' extra lobes and use BICUBIC.
+    """
+    from PIL import Image
+
+    scale = max(target_size[0] / src_size[0], target_size[1] / src_size[1])
+    if scale >= 1.0:
+        return {"resample": Image.BICUBIC}
+    if scale < 0.25:
+        return {"resample": Image.BICUBIC, "reducing_gap": 2.0}
+    if scale < 0.5:
+        return {"resample": Image.LANCZOS, "reducing_gap": 3.0}
+    return {"resample": Image.LANCZOS}
+
+
+def resize_cover(img, target_w: int, target_h: int, focus: tuple[float, float] = CENTER_FOCUS):
+    """
+    Resize image to cover target area like CSS "background-size: cover".
+
+    The crop window is chosen in source coordinates around `focus` first, so only
+    the visible part of the source is resampled.
+    """
+    src_w, src_h = img.size
+    scale = max(target_w / src_w, target_h / src_h)
+    crop_w = min(src_w, target_w / scale)
+    crop_h = min(src_h, target_h / scale)
+
+    left = min(max(focus[0] * src_w - crop_w / 2, 0), src_w - crop_w)
+    top = min(max(focus[1] * src_h - crop_h / 2, 0), src_h - crop_h)
+    box = (left, top, left + crop_w, top + crop_h)
+    return img.resize((target_w, target_h), box=box, **resample_args((crop_w, crop_h), (target_w, target_h)))
+
+
+def resize_fit(img, target_w: int, target_h: int):
+    """Scale the whole image into the target area and letterbox the rest in black"""
+    from PIL import Image
+
+    src_w, src_h = img.size
+    scale = min(target_w / src_w, target_h / src_h)
+    new_size = (max(1, round(src_w * scale)), max(1, round(src_h * scale)))
+    resized = img.resize(new_size, **resample_args(img.size, new_size))
+
+    canvas = Image.new("RGB", (target_w, target_h))
+    canvas.paste(resized, ((target_w - new_size[0]) // 2, (target_h - new_size[1]) // 2))
+    return canvas
+
+
+def place_center(img, target_w: int, target_h: int):
+    """No scaling: crop or pad (black) the image around its center"""
+    left = (img.width - target_w) // 2
+    top = (img.height - target_h) // 2
+    return img.crop((left, top, left + target_w, top + target_h))
+
+
+def compute_focus(img) -> tuple[float, float]:
+    """
+    Entropy-weighted focus point of an image, as fractions of width / height.
+
+    The image is reduced to at most 256px, split into 16px tiles and each tile's
+    grey-level entropy is measured; the focus is the centroid of tiles busier than
+    average. Needs NumPy; without it the center is used.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        logging.debug("NumPy not available, smart crop falls back to center")
+        return CENTER_FOCUS
+
+    small = img.convert("L")
+    small.thumbnail((256, 256))
+    pixels = np.asarray(small, dtype=np.uint8) >> 4     # 16 grey levels
+
+    tile = 16
+    rows, cols = pixels.shape[0] // tile, pixels.shape[1] // tile
+    if rows == 0 or cols == 0:
+        return CENTER_FOCUS
+
+    tiles = pixels[:rows * tile, :cols * tile].reshape(rows, tile, cols, tile).swapaxes(1, 2).reshape(rows, cols, -1)
+    hist = (tiles[..., None] == np.arange(16, dtype=np.uint8)).sum(axis=2) / float(tile * tile)
+    log = np.log2(hist, out=np.zeros_like(hist), where=hist > 0)
+    entropy = -(hist * log).sum(axis=2)
+
+    weights = np.clip(entropy - entropy.mean(), 0, None)
+    total = weights.sum()
+    if total <= 0:
+        return CENTER_FOCUS
+
+    ys = (np.arange(rows) + 0.5) / rows
+    xs = (np.arange(cols) + 0.5) / cols
+    return float((weights.sum(axis=0) * xs).sum() / total), float((weights.sum(axis=1) * ys).sum() / total)
+
+
+def get_focus(path, img) -> tuple[float, float]:
+    """Smart-crop focus for a file, computed once and kept in the media catalog"""
+    from utils.catalog import get_catalog
+
+    catalog = get_catalog()
+    entry = catalog.get(path)
+    if entry and "focus" in entry:
+        return tuple(entry["focus"])
+
+    focus = compute_focus(img)
+    # Only marks the catalog dirty: it is written with the prober's next batch or at shutdown
+    catalog.update(path, focus=list(focus))
+    logging.debug(f"Smart crop focus for {path}: {focus[0]:.2f}, {focus[1]:.2f}")
+    return focus
+
+
+def render_display(img, target_w: int, target_h: int, mode: str = DEFAULT_FIT_MODE,
+                   focus: tuple[float, float] = CENTER_FOCUS):
+    """Render one display-sized image in the given fit mode"""
+    if mode == "fit":
+        return resize_fit(img, target_w, target_h)
+    if mode == "center":
+        return place_center(img, target_w, target_h)
+    if mode == "smart":
+        return resize_cover(img, target_w, target_h, focus)
+    return resize_cover(img, target_w, target_h)
+
+
+class DecodeCache:
+    """
+    Small LRU of decoded source images keyed by path + mtime + size.
+
+    Several displays fed by the same file share one decode, and a file that is
+    applied again (scheduler cycling through a small folder) is not decoded twice.
+    Concurrent requests for the same key wait for the first decode. The cache is
+    bounded by decoded size: a full-resolution photo is tens of MB, so only a
+    few recent ones are kept, and one larger than the whole budget is not kept.
+    """
+
+    def __init__(self, max_bytes: int = DECODE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def _key(path: Path):
+        st = path.stat()
+        return str(path.resolve()), st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _size(img) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, path):
+        from PIL import Image
+
+        path = Path(path)
+        key = self._key(path)
+
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                with self._lock:
+                    if key in self._items:
+                        return self._items[key]
+
+                img = Image.open(path)
+                img.load()
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGB")
+
+                with self._lock:
+                    self._store(key, img)
+                return img
+        finally:
+            # Also after a failed decode, so a broken file does not leave its lock behind
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def _store(self, key, img):
+        size = self._size(img)
+        if size > self.max_bytes:
+            return
+        self._items[key] = img
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self._bytes -= self._size(old)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_decode_cache: DecodeCache | None = None
+
+def get_decode_cache() -> DecodeCache:
+    global _decode_cache
+    if _decode_cache is None:
+        _decode_cache = DecodeCache()
+    return _decode_cache
+
+
+def _load_source(source, cache: DecodeCache):
+    """A source is either an already decoded PIL image or a path"""
+    if hasattr(source, "size") and hasattr(source, "resize"):
+        return source
+    return cache.get(source)
+
+
+def render_layout(displays: list[Display], source, per_display: dict = None,
+                  cache: DecodeCache = None, max_workers: int = None, mode: str = DEFAULT_FIT_MODE,
+                  token: CancelToken = None):
+    """
+    Render one canvas covering the whole virtual desktop.
+
+    Each display gets its own image, rendered in `mode` and placed at its real
+    position. `per_display` maps display names to a different source for that
+    display; all other displays use `source`. Displays are rendered in parallel
+    (Pillow releases the GIL while resampling) and every distinct source is
+    decoded once. A cancelled `token` stops the render between decodes and
+    between displays (OperationCancelled).
+    """
+    from PIL import Image
+
+    cache = cache or get_decode_cache()
+    per_display = per_display or {}
+    if mode not in FIT_MODES:
+        logging.warning(f"Unknown fit mode '{mode}', using {DEFAULT_FIT_MODE}")
+        mode = DEFAULT_FIT_MODE
+
+    min_x, min_y, width, height = layout_bounds(displays)
+    canvas = Image.new("RGB", (width, height))
+
+    # Decode every distinct source once, up front
+    sources = {d.name: per_display.get(d.name, source) for d in displays}
+    decoded, focus = {}, {}
+    for src in sources.values():
+        key = id(src) if hasattr(src, "resize") else str(src)
+        if key in decoded:
+            continue
+        if token is not None:
+            token.raise_if_cancelled()
+        decoded[key] = _load_source(src, cache)
+        if mode == "smart":
+            focus[key] = compute_focus(src) if key == id(src) else get_focus(src, decoded[key])
+
+    def render_one(display: Display):
+        if token is not None:
+            token.raise_if_cancelled()
+        src = sources[display.name]
+        key = id(src) if hasattr(src, "resize") else str(src)
+        return display, render_display(decoded[key], display.width, display.height, mode, focus.get(key, CENTER_FOCUS))
+
+    workers = max_workers or min(len(displays), os.cpu_count() or 1)
+    if workers <= 1 or len(displays) == 1:
+        rendered = [render_one(d) for d in displays]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render") as pool:
+            rendered = list(pool.map(render_one, displays))
+
+    for display, img in rendered:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        canvas.paste(img, (display.x - min_x, display.y - min_y))
+
+    logging.debug(f"Rendered {len(displays)} display(s) onto {width}x{height} canvas")
+    return canvas
+
+
+# -------------------------------------------------------------------
+# RENDER OUTPUT CACHE
+# -------------------------------------------------------------------
+RENDER_DIR = CACHE_DIR / "render"
+
+# format name -> (Pillow format, extension, save options builder)
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", lambda quality: {"quality": quality, "subsampling": 0 if quality >= 90 else 2}),
+    "png": ("PNG", ".png", lambda quality: {"compress_level": 1}),
+    "bmp": ("BMP", ".bmp", lambda quality: {}),
+}
+DEFAULT_OUTPUT_FORMAT = "jpeg"
+DEFAULT_OUTPUT_QUALITY = 92
+
+# Rendered files kept around, so switching back to a recent wallpaper is free
+RENDER_CACHE_KEEP = 8
+
+
+def _source_stamp(source) -> list:
+    path = Path(source)
+    st = path.stat()
+    return [str(path.resolve()), st.st_mtime_ns, st.st_size]
+
+
+def render_key(displays: list[Display], source, per_display: dict = None, mode: str = DEFAULT_FIT_MODE,
+               output_format: str = DEFAULT_OUTPUT_FORMAT, quality: int = DEFAULT_OUTPUT_QUALITY) -> str:
+    """Identity of a rendered output: layout, source files (path + mtime + size) and encode settings"""
+    per_display = per_display or {}
+    payload = {
+        "displays": [[d.name, d.x, d.y, d.width, d.height] for d in displays],
+        "sources": [_source_stamp(per_display.get(d.name, source)) for d in displays],
+        "mode": mode,
+        "format": output_format,
+        "quality": quality if output_format == "jpeg" else None,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_output_path(key: str, output_format: str = DEFAULT_OUTPUT_FORMAT) -> Path:
+    _, ext, _ = OUTPUT_FORMATS.get(output_format, OUTPUT_FORMATS[DEFAULT_OUTPUT_FORMAT])
+    return RENDER_DIR / f"wallpaper_{key[:16]}{ext}"
+
+
+def write_render(img, final_path: Path, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                 quality: int = DEFAULT_OUTPUT_QUALITY, token: CancelToken = None) -> int:
+    """
+    Encode `img` to `final_path` atomically (temp file + os.replace) and return
+    the number of bytes written. Cancelled before the rename, nothing is left behind.
+    """
+    pil_format, _, options = OUTPUT_FORMATS.get(output_format, OUTPUT_FORMATS[DEFAULT_OUTPUT_FORMAT])
+    final_path = Path(final_path)
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        img.save(tmp_path, format=pil_format, **options(quality))
+        size = tmp_path.stat().st_size
+        if token is not None:
+            token.raise_if_cancelled()
+        os.replace(tmp_path, final_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    if final_path.parent == RENDER_DIR:
+        prune_render_cache(keep=final_path)
+    return size
+
+
+def prune_render_cache(keep: Path = None, max_files: int = RENDER_CACHE_KEEP):
+    """Drop the oldest rendered outputs beyond max_files (never the one just written)"""
+    try:
+        files = sorted((f for f in RENDER_DIR.glob("wallpaper_*") if f.is_file()),
+                       key=lambda f: f.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for old in files[max_files:]:
+        if keep is not None and old == keep:
+            continue
+        try:
+            old.unlink()
+        except OSError as e:
+            logging.debug(f"Could not remove cached render {old}: {e}")
@@ -0,0 +1,171 @@
+import os
+import logging
+from typing import Optional
+
+try:
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+except ImportError:
+    X = Xatom = xdisplay = None
+
+
+# Properties pointing at the root pixmap: read by compositors and terminals
+# for pseudo-transparency, and (ESETROOT) used to free the previous wallpaper
+ROOT_PMAP_ATOMS = ("_XROOTPMAP_ID", "ESETROOT_PMAP_ID")
+
+# Room left in each PutImage request for its header
+REQUEST_HEADER_BYTES = 64
+
+
+class X11Unsupported(RuntimeError):
+    """The X server's pixel format is not one we upload directly"""
+
+
+def available() -> bool:
+    """python-xlib is installed and this is an X11 session (not Wayland with XWayland)"""
+    return xdisplay is not None and bool(os.environ.get("DISPLAY")) and not os.environ.get("WAYLAND_DISPLAY")
+
+
+def _ignore_errors(error, request):
+    # Freeing an already gone wallpaper owner fails asynchronously; nothing to do about it
+    logging.debug(f"X error ignored: {error}")
+
+
+# -------------------------------------------------------------------
+# ROOT PIXMAP
+# -------------------------------------------------------------------
+def set_root_pixmap(img, origin: tuple[int, int] = (0, 0), display_name: str = None) -> int:
+    """
+    Make a Pillow RGB image the X root window background, the way esetroot,
+    feh and hsetroot do, without spawning any of them.
+
+    The image is uploaded into a new pixmap (placed at `origin` on a black
+    root-sized canvas), published through _XROOTPMAP_ID / ESETROOT_PMAP_ID and
+    set as the root background. The connection closes with RetainPermanent so
+    the pixmap outlives it; the previous setter's pixmap is freed. Returns the
+    pixmap id.
+    """
+    from PIL import Image
+
+    disp = xdisplay.Display(display_name)
+    disp.set_error_handler(_ignore_errors)
+    try:
+        screen = disp.screen()
+        root = screen.root
+        width, height, depth = screen.width_in_pixels, screen.height_in_pixels, screen.root_depth
+
+        info = disp.display.info
+        fmt = next((f for f in info.pixmap_formats if f.depth == depth), None)
+        if depth not in (24, 32) or fmt is None or fmt.bits_per_pixel != 32 or info.image_byte_order != X.LSBFirst:
+            raise X11Unsupported(f"Unsupported root visual: depth {depth}, "
+                                 f"{fmt.bits_per_pixel if fmt else '?'} bpp, byte order {info.image_byte_order}")
+
+        if img.size != (width, height) or origin != (0, 0):
+            canvas = Image.new("RGB", (width, height))
+            canvas.paste(img, origin)
+            img = canvas
+        # 32 bpp little-endian ZPixmap is BGRX in memory
+        data = img.tobytes("raw", "BGRX")
+
+        pixmap = root.create_pixmap(width, height, depth)
+        gc = pixmap.create_gc()
+        # python-xlib does not split large images: send bands that fit one request each
+        stride = width * 4
+        rows = max(1, (info.max_request_length * 4 - REQUEST_HEADER_BYTES) // stride)
+        for y in range(0, height, rows):
+            band = min(rows, height - y)
+            pixmap.put_image(gc, 0, y, width, band, X.ZPixmap, depth, 0, data[y * stride:(y + band) * stride])
+        gc.free()
+
+        _free_previous(disp, root)
+        for name in ROOT_PMAP_ATOMS:
+            root.change_property(disp.intern_atom(name), Xatom.PIXMAP, 32, [pixmap.id])
+        root.change_attributes(background_pixmap=pixmap)
+        root.clear_area()
+
+        disp.set_close_down_mode(X.RetainPermanent)
+        disp.sync()
+        logging.debug(f"Root pixmap 0x{pixmap.id:x} set ({width}x{height}, bands of {rows} rows)")
+        return pixmap.id
+    finally:
+        disp.close()
+
+
+def _free_previous(disp, root):
+    """Free the last esetroot-style wallpaper: its owner left it behind with RetainPermanent"""
+    ids = []
+    for name in ROOT_PMAP_ATOMS:
+        prop = root.get_full_property(disp.intern_atom(name), Xatom.PIXMAP)
+        ids.append(prop.value[0] if prop is not None and len(prop.value) else None)
+    # Only when both agree: otherwise the pixmap may belong to a setter that still uses it
+    if ids[0] and ids[0] == ids[1]:
+        disp.create_resource_object("pixmap", ids[0]).kill_client()
+
+
+def get_root_pixmap(display_name: str = None) -> Optional[int]:
+    disp = xdisplay.Display(display_name)
+    try:
+        root = disp.screen().root
+        prop = root.get_full_property(disp.intern_atom(ROOT_PMAP_ATOMS[0]), Xatom.PIXMAP)
+        return prop.value[0] if prop is not None and len(prop.value) else None
+    finally:
+        disp.close()
+
+
+# -------------------------------------------------------------------
+# DESKTOP WINDOW (VIDEO WALLPAPERS)
+# -------------------------------------------------------------------
+class DesktopWindow:
+    """
+    A borderless window covering the whole root, kept below every other
+    window, for a video player to draw into (`mpv --wid`). Does what
+    `xwinwrap -ov -fs` did, in-process. The X connection stays open while
+    the window exists.
+    """
+
+    def __init__(self, display_name: str = None):
+        self.display_name = display_name
+        self.display = None
+        self.window = None
+
+    @property
+    def id(self) -> Optional[int]:
+        return self.window.id if self.window is not None else None
+
+    def create(self) -> int:
+        if self.window is not None:
+            return self.window.id
+
+        disp = xdisplay.Display(self.display_name)
+        screen = disp.screen()
+        window = screen.root.create_window(
+            0, 0, screen.width_in_pixels, screen.height_in_pixels, 0, screen.root_depth,
+            X.InputOutput, X.CopyFromParent,
+            # Not managed by the window manager (-ov): no decorations, no taskbar entry
+            override_redirect=True,
+            background_pixel=screen.black_pixel,
+            event_mask=0,
+        )
+        window.set_wm_name("Tapeciarnia")
+        window.set_wm_class("tapeciarnia", "Tapeciarnia")
+        window.change_property(disp.intern_atom("_NET_WM_WINDOW_TYPE"), Xatom.ATOM, 32,
+                               [disp.intern_atom("_NET_WM_WINDOW_TYPE_DESKTOP")])
+        window.map()
+        window.configure(stack_mode=X.Below)
+        disp.sync()
+
+        self.display, self.window = disp, window
+        logging.info(f"Desktop window 0x{window.id:x} created ({screen.width_in_pixels}x{screen.height_in_pixels})")
+        return window.id
+
+    def destroy(self):
+        if self.window is None:
+            return
+        try:
+            self.window.destroy()
+            self.display.sync()
+        except Exception as e:
+            logging.debug(f"Desktop window already gone: {e}")
+        finally:
+            self.display.close()
+            self.display = self.window = None